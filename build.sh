@@ -16,7 +16,7 @@ python manage.py migrate --no-input
 python manage.py migrate generator --no-input
 
 echo "Loading initial data..."
-python manage.py load_initial_data || {
+python manage.py load_initial_data --keep-popularity || {
   echo "Warning: Initial data load failed, but continuing deployment"
 }
 
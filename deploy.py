@@ -82,7 +82,7 @@ def main():
     else:
         print("\nLocal deployment preparation complete!")
         print("To start the production server locally, run:")
-        print("    gunicorn prompt_generator.wsgi")
+        print("    gunicorn -c gunicorn.conf.py prompt_generator.wsgi")
     
     print("\n=== Deployment process completed ===")
     return 0
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Keyword, PromptTemplate
+from .models import Category, Keyword, PromptTemplate, QuestionTemplate
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -8,12 +8,18 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Keyword)
 class KeywordAdmin(admin.ModelAdmin):
-    list_display = ('text', 'category', 'popularity')
-    list_filter = ('category',)
-    search_fields = ('text',)
+    list_display = ('text', 'category', 'popularity', 'curated')
+    list_filter = ('category', 'curated')
+    search_fields = ('text', 'related_terms__term')
 
 @admin.register(PromptTemplate)
 class PromptTemplateAdmin(admin.ModelAdmin):
     list_display = ('name', 'category')
     list_filter = ('category',)
     search_fields = ('name', 'template')
+
+@admin.register(QuestionTemplate)
+class QuestionTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'order')
+    list_filter = ('category',)
+    search_fields = ('name', 'template')
@@ -0,0 +1,202 @@
+"""Native async versions of the JSON API views.
+
+These mirror the views in ``generator.views`` but use the async ORM, so under
+an ASGI server a request waiting on the database or on a slow client does not
+hold a thread. CPU-bound work that can take more than a moment (rendering
+uncached prompts, building and searching suggestion indexes, rebuilding the
+topic classifier) runs in worker threads so it does not stall the event loop.
+They are routed instead of the sync views when ``ASYNC_API_VIEWS`` is
+enabled; see DEPLOYMENT.md.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import OperationalError, ProgrammingError
+
+from .classifier import topic_classifier
+from .http import JsonResponse, conditional_on_catalog
+from .leaderboard import leaderboard
+from .metrics import record_fallback
+from .models import Category, Keyword
+from .popularity import popularity_buffer
+from .prompt_cache import normalize_topic
+from .replicas import reads_from_replica
+from .suggestions import suggestion_index
+from .template_cache import DEFAULT_QUESTION_TEMPLATES, template_cache
+from .views import (
+    _cached_prompts,
+    _default_prompts,
+    _default_suggestions,
+    _default_trending_topics,
+    _first_category_query,
+    _is_short_query,
+    _question_prompts,
+    _request_seed,
+    _search_keywords_in_db,
+    _topic_category_query,
+)
+
+
+@conditional_on_catalog()
+@reads_from_replica()
+async def get_trending_topics(request):
+    """API endpoint to get trending topics across all categories or for a specific category"""
+    category_slug = request.GET.get('category')
+
+    try:
+        try:
+            topics = await leaderboard.atop(category_slug)
+        except (OperationalError, ProgrammingError):
+            record_fallback('trending_topics')
+            topics = _default_trending_topics(category_slug)
+
+        return JsonResponse({'topics': topics})
+    except Category.DoesNotExist:
+        return JsonResponse({'error': 'Category not found'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@conditional_on_catalog(etag_if=_is_short_query)
+@reads_from_replica(when=_is_short_query)
+async def get_keywords_by_category(request):
+    """API endpoint to get keywords suggestions based on selected category and optional query"""
+    category_slug = request.GET.get('category')
+    query = request.GET.get('query', '').strip().lower()
+
+    if not category_slug:
+        return JsonResponse({'error': 'Category is required'}, status=400)
+
+    try:
+        try:
+            category = await Category.objects.aget(slug=category_slug)
+
+            # If query is empty or too short, return most popular keywords
+            if len(query) < 3:
+                suggestions = [
+                    {'text': keyword.text, 'popularity': keyword.popularity}
+                    async for keyword in Keyword.objects.filter(category=category).order_by('-popularity')[:10]
+                ]
+                return JsonResponse({'suggestions': suggestions})
+
+            if suggestion_index.enabled:
+                suggestions = [
+                    {'text': text, 'popularity': popularity}
+                    for text, popularity in await suggestion_index.asearch(category.id, query)
+                ]
+            else:
+                suggestions = [
+                    {'text': keyword.text, 'popularity': keyword.popularity}
+                    for keyword in (await sync_to_async(_search_keywords_in_db)(category, query))[:10]
+                ]
+
+            # Nothing contains the query; it may be a typo of an existing keyword
+            if not suggestions and query and suggestion_index.enabled:
+                suggestions = [
+                    {'text': text, 'popularity': popularity}
+                    for text, popularity in await suggestion_index.afuzzy_search(category.id, query)
+                ]
+                if suggestions:
+                    await popularity_buffer.arecord(category.id, suggestions[0]['text'])
+
+            # If we still don't have enough suggestions, create one from the query
+            if not suggestions and query:
+                text = query.capitalize()
+                await popularity_buffer.arecord(category.id, text)
+                popularity = await popularity_buffer.apopularity(category.id, text)
+                suggestions = [{'text': text, 'popularity': popularity}]
+        except (OperationalError, ProgrammingError):
+            record_fallback('get_keywords')
+            suggestions = _default_suggestions(category_slug, query)
+
+        return JsonResponse({'suggestions': suggestions})
+    except Category.DoesNotExist:
+        return JsonResponse({'error': 'Category not found'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def generate_prompts(request):
+    """API endpoint to generate prompts based on topic and category"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        topic = data.get('topic')
+        category_slug = data.get('category')
+        if isinstance(topic, str):
+            topic = normalize_topic(topic)
+
+        if not topic or not category_slug:
+            return JsonResponse({'error': 'Both topic and category are required'}, status=400)
+
+        try:
+            seed, seeded = _request_seed(data)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid seed'}, status=400)
+
+        try:
+            compiled = await template_cache.aget(category_slug)
+            await popularity_buffer.arecord(compiled.category_id, topic)
+            prompts = []
+            if compiled.templates:
+                # Pure CPU work, so it need not wait for the ORM's thread
+                prompts = await sync_to_async(_cached_prompts, thread_sensitive=False)(compiled, topic, seed, seeded)
+        except (OperationalError, ProgrammingError):
+            record_fallback('generate_prompts')
+            prompts = _default_prompts(category_slug, topic, seed)
+
+        if not prompts:
+            return JsonResponse({'error': 'No templates found for this category'}, status=404)
+        return JsonResponse({'prompts': prompts, 'seed': seed})
+    except Category.DoesNotExist:
+        return JsonResponse({'error': 'Category not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def generate_question_prompts(request):
+    """API endpoint to generate multiple question-based prompts for a given keyword"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        topic = data.get('topic')
+        category_slug = data.get('category')
+
+        if not topic or not isinstance(topic, str):
+            return JsonResponse({'error': 'Topic is required'}, status=400)
+        topic = normalize_topic(topic)
+
+        try:
+            if category_slug:
+                category_id = (await template_cache.aget(category_slug)).category_id
+            else:
+                # Guess the category from the topic's words. With the classifier
+                # disabled, use the most popular exact match or the first one
+                category_id = (
+                    await topic_classifier.aclassify(topic)
+                    or await _topic_category_query(topic).afirst()
+                    or await _first_category_query().afirst()
+                )
+
+            templates = (await template_cache.aquestions()).for_category(category_id)
+
+            # Track keyword usage
+            if category_id:
+                await popularity_buffer.arecord(category_id, topic)
+        except (OperationalError, ProgrammingError):
+            record_fallback('generate_question_prompts')
+            templates = DEFAULT_QUESTION_TEMPLATES.for_category(None)
+
+        return JsonResponse({'prompts': _question_prompts(templates, topic)})
+    except Category.DoesNotExist:
+        return JsonResponse({'error': 'Category not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,139 @@
+"""Bulk upserts of catalog rows keyed on their natural keys.
+
+Categories are matched on slug, prompt templates on (category, name) and
+keywords on (category, text). Existing rows are fetched once per batch, new
+rows are inserted with ``bulk_create`` and only rows whose values differ are
+written back with ``bulk_update``, so reloading unchanged data issues nothing
+but SELECTs. Model signals are bypassed; callers should run
+``generator.signals.invalidate_catalog_caches()`` once they are done.
+"""
+from itertools import islice
+
+from .models import Category, Keyword, PromptTemplate, RelatedTerm
+
+BATCH_SIZE = 1000
+
+
+def _batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def upsert_categories(rows):
+    """Upsert (name, slug) rows and return ({slug: id}, created, updated)"""
+    names = {slug: name for name, slug in rows}
+    existing = {category.slug: category for category in Category.objects.filter(slug__in=names)}
+
+    new = [Category(name=name, slug=slug) for slug, name in names.items() if slug not in existing]
+    changed = []
+    for slug, category in existing.items():
+        if category.name != names[slug]:
+            category.name = names[slug]
+            changed.append(category)
+
+    Category.objects.bulk_create(new, batch_size=BATCH_SIZE)
+    Category.objects.bulk_update(changed, ['name'], batch_size=BATCH_SIZE)
+    ids = dict(Category.objects.filter(slug__in=names).values_list('slug', 'id'))
+    return ids, len(new), len(changed)
+
+
+def upsert_templates(rows):
+    """Upsert (category_id, name, template) rows and return (created, updated)"""
+    created = updated = 0
+    for batch in _batches(rows):
+        wanted = {(category_id, name): template for category_id, name, template in batch}
+        existing = {}
+        candidates = PromptTemplate.objects.filter(
+            category_id__in={key[0] for key in wanted},
+            name__in={key[1] for key in wanted},
+        )
+        for template in candidates:
+            existing.setdefault((template.category_id, template.name), template)
+
+        new = []
+        changed = []
+        for (category_id, name), text in wanted.items():
+            template = existing.get((category_id, name))
+            if template is None:
+                new.append(PromptTemplate(category_id=category_id, name=name, template=text))
+            elif template.template != text:
+                template.template = text
+                changed.append(template)
+
+        PromptTemplate.objects.bulk_create(new)
+        PromptTemplate.objects.bulk_update(changed, ['template'])
+        created += len(new)
+        updated += len(changed)
+    return created, updated
+
+
+def upsert_keywords(rows, keep_popularity=False):
+    """Upsert (category_id, text, popularity, related_keywords, curated) rows
+
+    With ``keep_popularity`` the popularity of existing keywords is left
+    alone and the given value only seeds new keywords. Returns
+    (created, updated).
+    """
+    created = updated = 0
+    for batch in _batches(rows):
+        wanted = {
+            (category_id, text): (popularity, related, curated)
+            for category_id, text, popularity, related, curated in batch
+        }
+        existing = {}
+        candidates = Keyword.objects.filter(
+            category_id__in={key[0] for key in wanted},
+            text__in={key[1] for key in wanted},
+        )
+        for keyword in candidates:
+            existing.setdefault((keyword.category_id, keyword.text), keyword)
+
+        new = []
+        changed = []
+        for (category_id, text), (popularity, related, curated) in wanted.items():
+            keyword = existing.get((category_id, text))
+            if keyword is None:
+                new.append(Keyword(
+                    category_id=category_id, text=text, popularity=popularity, related_keywords=related, curated=curated,
+                ))
+                continue
+            dirty = keyword.related_keywords != related or keyword.curated != curated
+            keyword.related_keywords = related
+            keyword.curated = curated
+            if not keep_popularity and keyword.popularity != popularity:
+                keyword.popularity = popularity
+                dirty = True
+            if dirty:
+                changed.append(keyword)
+
+        Keyword.objects.bulk_create(new)
+        if any(keyword.pk is None for keyword in new):
+            # Backends that can't return ids from bulk inserts
+            ids = {
+                (category_id, text): keyword_id
+                for keyword_id, category_id, text in Keyword.objects.filter(
+                    category_id__in={keyword.category_id for keyword in new},
+                    text__in={keyword.text for keyword in new},
+                ).values_list('id', 'category_id', 'text')
+            }
+            for keyword in new:
+                keyword.pk = ids[(keyword.category_id, keyword.text)]
+        Keyword.objects.bulk_update(changed, ['popularity', 'related_keywords', 'curated'])
+        replace_related_terms(new + changed)
+        created += len(new)
+        updated += len(changed)
+    return created, updated
+
+
+def replace_related_terms(keywords):
+    """Rewrite the RelatedTerm rows of the given keywords from related_keywords"""
+    if not keywords:
+        return
+    RelatedTerm.objects.filter(keyword_id__in=[keyword.pk for keyword in keywords]).delete()
+    terms = []
+    for keyword in keywords:
+        normalized = {RelatedTerm.normalize(term) for term in keyword.get_related_keywords_list()}
+        normalized.discard('')
+        terms.extend(RelatedTerm(keyword_id=keyword.pk, term=term) for term in normalized)
+    RelatedTerm.objects.bulk_create(terms, batch_size=BATCH_SIZE, ignore_conflicts=True)
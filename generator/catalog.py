@@ -0,0 +1,105 @@
+"""Cached reads of catalog data used on hot paths.
+
+Entries live in the configured Django cache and are dropped by the signal
+handlers in ``generator.signals`` when the underlying rows change. The
+timeout bounds staleness for caches that are not shared between workers.
+
+The catalog version is an opaque stamp that changes whenever Category,
+Keyword or PromptTemplate data changes. It is stored in the CatalogVersion
+table, so every worker and management command sees the same stamp whatever
+cache backend is configured, and each process re-reads it at most every
+``CATALOG_VERSION_TTL`` seconds.
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from .models import Category, CatalogVersion
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES_CACHE_KEY = 'generator:categories'
+
+# Names of the stamps in the CatalogVersion table
+CATALOG = 'catalog'
+# Bumped to have every worker rebuild its trending boards
+LEADERBOARD = 'leaderboard'
+# Changes with the set of URLs in the sitemap, not with popularity
+SITEMAP = 'sitemap'
+
+# name -> (version, monotonic time it was read or written in this process)
+_versions = {}
+
+
+def _load_categories():
+    return [{'name': name, 'slug': slug} for name, slug in Category.objects.order_by('id').values_list('name', 'slug')]
+
+
+def get_categories():
+    """Return the categories shown on the home page as a list of dicts"""
+    timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+    return cache.get_or_set(CATEGORIES_CACHE_KEY, _load_categories, timeout)
+
+
+def invalidate_categories():
+    cache.delete(CATEGORIES_CACHE_KEY)
+
+
+def _fresh(name):
+    known = _versions.get(name)
+    if known is not None and time.monotonic() - known[1] < getattr(settings, 'CATALOG_VERSION_TTL', 2.0):
+        return known[0]
+    return None
+
+
+def _remember(name, version):
+    _versions[name] = (version, time.monotonic())
+    return version
+
+
+def _unavailable(name, e):
+    # Without the table no stamp is shared; a random one never matches an ETag
+    logger.warning('Could not read the %s version: %s', name, e)
+    known = _versions.get(name)
+    return known[0] if known is not None else uuid.uuid4().hex
+
+
+def _rows():
+    # Always the primary: a lagging replica would hand out an old stamp
+    return CatalogVersion.objects.db_manager(DEFAULT_DB_ALIAS)
+
+
+def get_catalog_version(name=CATALOG):
+    version = _fresh(name)
+    if version is not None:
+        return version
+    try:
+        row, _ = _rows().get_or_create(name=name, defaults={'version': uuid.uuid4().hex})
+    except DatabaseError as e:
+        return _unavailable(name, e)
+    return _remember(name, row.version)
+
+
+async def aget_catalog_version(name=CATALOG):
+    """Async variant of get_catalog_version() for the ASGI views"""
+    version = _fresh(name)
+    if version is not None:
+        return version
+    try:
+        row, _ = await _rows().aget_or_create(name=name, defaults={'version': uuid.uuid4().hex})
+    except DatabaseError as e:
+        return _unavailable(name, e)
+    return _remember(name, row.version)
+
+
+def bump_catalog_version(name=CATALOG):
+    version = uuid.uuid4().hex
+    try:
+        _rows().update_or_create(name=name, defaults={'version': version})
+    except DatabaseError as e:
+        logger.warning('Could not store the %s version: %s', name, e)
+    _remember(name, version)
@@ -0,0 +1,252 @@
+"""In-process naive Bayes classifier guessing the category of a topic.
+
+Every keyword (its text and related terms) and every prompt template is a
+document of its category. The model keeps per-token weights for each
+category, so classifying a topic is one pass over its tokens with a
+dictionary lookup each and no query. The model is built lazily on first use
+and kept up to date by the signal handlers in ``generator.signals``; it is
+rebuilt after ``TOPIC_CLASSIFIER_MAX_AGE`` seconds to pick up changes made by
+other workers. Rebuilds run outside the lock classifications take, which
+keep using the previous model until the new one is swapped in.
+"""
+import math
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .fuzzy import words
+from .metrics import record_cache
+from .models import Keyword, PromptTemplate
+from .template_cache import PLACEHOLDER
+
+# Laplace smoothing of the token counts
+ALPHA = 1.0
+# A keyword's own text says more about its category than its related terms
+TEXT_WEIGHT = 2.0
+RELATED_WEIGHT = 1.0
+TEMPLATE_WEIGHT = 1.0
+
+STOP_WORDS = frozenset(
+    'a about an and are as at be by can do for from how i in is it its me my of on or that the this '
+    'to what when where which who why with you your'.split()
+)
+
+
+def tokens(text):
+    return [word for word in words(text) if word not in STOP_WORDS]
+
+
+class TopicModel:
+    """Token weights per category, updated one document at a time"""
+
+    def __init__(self):
+        self.built_at = time.monotonic()
+        # Tokens are interned to small ints, so documents only hold numbers
+        self._token_ids = {}
+        # token id -> {category_id: weight}
+        self._weights = {}
+        # category_id -> total token weight and number of documents
+        self._totals = defaultdict(float)
+        self._documents = Counter()
+        # document key -> (category_id, token ids, weights), to undo it on change
+        self._contents = {}
+
+    def add(self, key, category_id, weighted_texts):
+        """Insert or replace a document from (text, weight) pairs"""
+        self.remove(key)
+        content = defaultdict(float)
+        for text, weight in weighted_texts:
+            for token in tokens(text):
+                content[self._token_ids.setdefault(token, len(self._token_ids))] += weight
+        self._contents[key] = (category_id, array('l', content), array('d', content.values()))
+        self._documents[category_id] += 1
+        for token_id, weight in content.items():
+            by_category = self._weights.setdefault(token_id, {})
+            by_category[category_id] = by_category.get(category_id, 0.0) + weight
+            self._totals[category_id] += weight
+
+    def remove(self, key):
+        document = self._contents.pop(key, None)
+        if document is None:
+            return
+        category_id, token_ids, weights = document
+        self._documents[category_id] -= 1
+        if not self._documents[category_id]:
+            del self._documents[category_id]
+            self._totals.pop(category_id, None)
+        else:
+            self._totals[category_id] -= sum(weights)
+        for token_id, weight in zip(token_ids, weights):
+            by_category = self._weights[token_id]
+            by_category[category_id] -= weight
+            if by_category[category_id] <= 1e-9:
+                del by_category[category_id]
+                if not by_category:
+                    del self._weights[token_id]
+
+    def remove_category(self, category_id):
+        for key in [key for key, (owner, *_) in self._contents.items() if owner == category_id]:
+            self.remove(key)
+
+    def classify(self, text):
+        """Return the most likely category id for ``text``, or None without evidence
+
+        Categories are equally likely up front: a category with many
+        keywords is not a better guess for a topic about something else.
+        Tokens the model has never seen carry no evidence and are skipped.
+        """
+        token_ids = (self._token_ids.get(token) for token in tokens(text))
+        known = [self._weights[token_id] for token_id in token_ids if token_id in self._weights]
+        if not known:
+            return None
+        vocabulary = len(self._weights)
+
+        # The sum over tokens of log((n(t, c) + a) / (n(c) + a * V)), where
+        # only the categories that have seen a token differ from log(a)
+        penalty = len(known)
+        scores = {
+            category_id: -penalty * (math.log(self._totals[category_id] + ALPHA * vocabulary) - math.log(ALPHA))
+            for category_id in self._documents
+        }
+        for by_category in known:
+            for category_id, weight in by_category.items():
+                scores[category_id] += math.log1p(weight / ALPHA)
+        return max(scores, key=scores.get)
+
+
+class TopicClassifier:
+    """Per-process TopicModel built lazily from the database"""
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.RLock()
+        # Held for a whole rebuild; _lock only guards swapping and updates
+        self._build_lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'TOPIC_CLASSIFIER_ENABLED', True)
+
+    def _loaded(self):
+        model = self._model
+        max_age = getattr(settings, 'TOPIC_CLASSIFIER_MAX_AGE', 300)
+        if model is not None and not (max_age and time.monotonic() - model.built_at > max_age):
+            return model
+        return None
+
+    @staticmethod
+    def _keyword_rows():
+        return Keyword.objects.values_list('id', 'category_id', 'text', 'related_keywords')
+
+    @staticmethod
+    def _template_rows():
+        return PromptTemplate.objects.values_list('id', 'category_id', 'template')
+
+    @staticmethod
+    def _keyword_document(text, related_keywords):
+        return [(text, TEXT_WEIGHT), (related_keywords.replace(',', ' '), RELATED_WEIGHT)]
+
+    @staticmethod
+    def _template_document(template):
+        return [(template.replace(PLACEHOLDER, ' '), TEMPLATE_WEIGHT)]
+
+    def _build(self, keyword_rows, template_rows):
+        model = TopicModel()
+        for keyword_id, category_id, text, related_keywords in keyword_rows:
+            model.add(('keyword', keyword_id), category_id, self._keyword_document(text, related_keywords))
+        for template_id, category_id, template in template_rows:
+            model.add(('template', template_id), category_id, self._template_document(template))
+        return model
+
+    def _rebuild(self):
+        # Only one rebuild at a time; while one runs, others use the expired
+        # model if there is one rather than wait
+        previous = self._model
+        if not self._build_lock.acquire(blocking=previous is None):
+            return previous
+        try:
+            model = self._loaded()
+            if model is not None:
+                return model
+            generation = self._generation
+            model = self._build(
+                self._keyword_rows().iterator(chunk_size=2000),
+                self._template_rows().iterator(chunk_size=2000),
+            )
+            with self._lock:
+                # Don't store a model that was invalidated while it was building
+                if generation == self._generation:
+                    self._model = model
+            return model
+        finally:
+            self._build_lock.release()
+
+    def model(self):
+        model = self._loaded()
+        record_cache('topic_classifier', model is not None)
+        if model is not None:
+            return model
+        return self._rebuild()
+
+    async def amodel(self):
+        """Async variant of model(); a rebuild runs in a worker thread"""
+        model = self._loaded()
+        record_cache('topic_classifier', model is not None)
+        if model is not None:
+            return model
+        return await sync_to_async(self._rebuild)()
+
+    def classify(self, topic):
+        """Return the id of the category a topic most likely belongs to, or None"""
+        if not self.enabled:
+            return None
+        model = self.model()
+        with self._lock:
+            return model.classify(topic)
+
+    async def aclassify(self, topic):
+        """Async variant of classify() for the ASGI views"""
+        if not self.enabled:
+            return None
+        model = await self.amodel()
+        with self._lock:
+            return model.classify(topic)
+
+    def _update(self, apply):
+        with self._lock:
+            if self._model is not None:
+                apply(self._model)
+
+    def keyword_saved(self, keyword):
+        self._update(lambda model: model.add(
+            ('keyword', keyword.id), keyword.category_id,
+            self._keyword_document(keyword.text, keyword.related_keywords),
+        ))
+
+    def keyword_deleted(self, keyword):
+        self._update(lambda model: model.remove(('keyword', keyword.id)))
+
+    def template_saved(self, template):
+        self._update(lambda model: model.add(
+            ('template', template.id), template.category_id, self._template_document(template.template),
+        ))
+
+    def template_deleted(self, template):
+        self._update(lambda model: model.remove(('template', template.id)))
+
+    def category_deleted(self, category_id):
+        self._update(lambda model: model.remove_category(category_id))
+
+    def invalidate(self):
+        """Drop the model so it is rebuilt on next use"""
+        with self._lock:
+            self._generation += 1
+            self._model = None
+
+
+topic_classifier = TopicClassifier()
@@ -0,0 +1,133 @@
+"""Typo-tolerant word lookup for keyword suggestions.
+
+A SymSpell-style deletion index: every vocabulary word is stored under all
+strings reachable by deleting up to ``MAX_DISTANCE`` characters from its
+first ``PREFIX_LENGTH`` characters. A misspelled word generates the same
+deletes, so the candidates sharing one of them are the only words whose
+distance has to be computed. Distances are optimal string alignment (OSA),
+where a transposition of adjacent characters ("pyhton") counts as one edit.
+"""
+import re
+import time
+from collections import defaultdict
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+# Shorter words are only matched exactly; at this length almost anything is
+# one or two edits away from something
+MIN_FUZZY_LENGTH = 3
+
+
+def words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def allowed_distance(word):
+    if len(word) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(word) <= 4 else MAX_DISTANCE
+
+
+def osa_distance(a, b, max_distance):
+    """Return the OSA distance between a and b, or max_distance + 1 if larger"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+def deletes(word, max_distance=MAX_DISTANCE):
+    prefix = word[:PREFIX_LENGTH]
+    result = {prefix}
+    frontier = {prefix}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+class FuzzyVocabulary:
+    """Words of a set of keywords, looked up within a small edit distance"""
+
+    def __init__(self):
+        self._keywords = defaultdict(set)
+        self._deletes = defaultdict(set)
+
+    def add(self, keyword_id, vocabulary):
+        for word in vocabulary:
+            if not self._keywords[word]:
+                for delete in deletes(word):
+                    self._deletes[delete].add(word)
+            self._keywords[word].add(keyword_id)
+
+    def remove(self, keyword_id, vocabulary):
+        for word in vocabulary:
+            ids = self._keywords.get(word)
+            if ids is None:
+                continue
+            ids.discard(keyword_id)
+            if ids:
+                continue
+            del self._keywords[word]
+            for delete in deletes(word):
+                candidates = self._deletes.get(delete)
+                if candidates is not None:
+                    candidates.discard(word)
+                    if not candidates:
+                        del self._deletes[delete]
+
+    def lookup(self, word, deadline):
+        """Return [(vocabulary word, distance)] within the word's allowed distance"""
+        if word in self._keywords:
+            return [(word, 0)]
+        max_distance = allowed_distance(word)
+        if not max_distance:
+            return []
+        checked = set()
+        found = []
+        for delete in deletes(word, max_distance):
+            for candidate in self._deletes.get(delete, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                distance = osa_distance(word, candidate, max_distance)
+                if distance <= max_distance:
+                    found.append((candidate, distance))
+            if time.perf_counter() > deadline:
+                break
+        return found
+
+    def match(self, query, deadline):
+        """Score keywords against the words of ``query``
+
+        Returns {keyword_id: (words matched, total distance)}. Keywords that
+        only share words too short to be fuzzy-matched are left out.
+        """
+        best = defaultdict(dict)
+        for word in set(words(query)):
+            for candidate, distance in self.lookup(word, deadline):
+                for keyword_id in self._keywords[candidate]:
+                    current = best[keyword_id].get(word)
+                    if current is None or distance < current:
+                        best[keyword_id][word] = distance
+            if time.perf_counter() > deadline:
+                break
+        return {
+            keyword_id: (len(matched), sum(matched.values()))
+            for keyword_id, matched in best.items()
+            if any(len(word) >= MIN_FUZZY_LENGTH for word in matched)
+        }
@@ -0,0 +1,83 @@
+"""HTTP helpers shared by the generator views."""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django import http
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .catalog import aget_catalog_version, get_catalog_version
+from .timing import record_serialization
+
+
+class JsonResponse(http.JsonResponse):
+    """JsonResponse that reports its encoding time to the request's Server-Timing"""
+
+    def __init__(self, *args, **kwargs):
+        started = time.perf_counter()
+        super().__init__(*args, **kwargs)
+        record_serialization(time.perf_counter() - started)
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts, from an Accept-Encoding header"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        try:
+            quality = float(params.strip()[2:]) if params.strip().startswith('q=') else 1.0
+        except ValueError:
+            quality = 1.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def conditional_on_catalog(etag_if=None, private=False):
+    """Answer GET/HEAD with a catalog-versioned ETag and 304 on a match
+
+    The ETag is derived from the catalog version and the full request path,
+    so a matching ``If-None-Match`` short-circuits before the view touches
+    the ORM. ``etag_if`` can restrict this to some requests. Views whose body
+    embeds a CSRF token pass ``private=True``, which mixes the CSRF cookie
+    into the ETag and keeps shared caches out.
+    """
+    def etag_func(request, *args, **kwargs):
+        if etag_if is not None and not etag_if(request):
+            return None
+        # Async views read it beforehand, as the ORM cannot run synchronously there
+        version = getattr(request, 'catalog_version', None) or get_catalog_version()
+        parts = [version, request.get_full_path()]
+        if private:
+            parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+        return hashlib.sha1(':'.join(parts).encode()).hexdigest()
+
+    def finalize(response):
+        if not response.has_header('ETag'):
+            return response
+        if response.status_code >= 400:
+            del response.headers['ETag']
+            return response
+        patch_cache_control(
+            response,
+            max_age=getattr(settings, 'CATALOG_HTTP_MAX_AGE', 0),
+            must_revalidate=True,
+            **({'private': True} if private else {'public': True}),
+        )
+        return response
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        if iscoroutinefunction(view):
+            async def inner(request, *args, **kwargs):
+                request.catalog_version = await aget_catalog_version()
+                return finalize(await conditional_view(request, *args, **kwargs))
+        else:
+            def inner(request, *args, **kwargs):
+                return finalize(conditional_view(request, *args, **kwargs))
+        return wraps(view)(inner)
+    return decorator
@@ -0,0 +1,207 @@
+"""Materialized trending leaderboard for /api/trending/.
+
+A global top-N board and one board per category are kept in memory and
+updated incrementally from keyword saves and popularity flushes. Because
+popularity only grows on the request path, a keyword that rises above the
+lowest entry can simply replace it; anything that could lower a ranking
+(edits, deletes, reseeding) marks the board dirty and it is rebuilt with a
+single ``ORDER BY popularity LIMIT N`` query on next use.
+
+Boards only see the writes of their own process, so they are also rebuilt
+once older than ``LEADERBOARD_MAX_AGE`` seconds. ``manage.py
+rebuild_leaderboard`` bumps the ``LEADERBOARD`` stamp of the catalog
+versions so that every worker rebuilds its boards on its next request.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .catalog import LEADERBOARD, aget_catalog_version, bump_catalog_version, get_catalog_version
+from .metrics import record_cache
+from .models import Category, Keyword
+
+GLOBAL_SIZE = 12
+CATEGORY_SIZE = 8
+
+
+class Board:
+    """Top-``size`` keywords by popularity, keyed by keyword id"""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = {}
+        self.dirty = True
+        self.loaded_at = 0.0
+
+    def load(self, rows):
+        self.entries = {keyword_id: (popularity, category_id, text) for keyword_id, category_id, text, popularity in rows}
+        self.dirty = False
+        self.loaded_at = time.monotonic()
+
+    def needs_rebuild(self):
+        max_age = getattr(settings, 'LEADERBOARD_MAX_AGE', 300)
+        return self.dirty or bool(max_age and time.monotonic() - self.loaded_at > max_age)
+
+    def offer(self, keyword_id, category_id, text, popularity):
+        current = self.entries.get(keyword_id)
+        if current is not None:
+            if popularity < current[0] or (category_id, text) != current[1:]:
+                self.dirty = True
+            else:
+                self.entries[keyword_id] = (popularity, category_id, text)
+            return
+        if len(self.entries) < self.size:
+            self.entries[keyword_id] = (popularity, category_id, text)
+            return
+        lowest = min(self.entries, key=self._rank)
+        if (popularity, -keyword_id) > self._rank(lowest):
+            del self.entries[lowest]
+            self.entries[keyword_id] = (popularity, category_id, text)
+
+    def discard(self, keyword_id):
+        if keyword_id in self.entries:
+            self.dirty = True
+
+    def _rank(self, keyword_id):
+        return (self.entries[keyword_id][0], -keyword_id)
+
+    def ranked(self):
+        return sorted(self.entries.items(), key=lambda item: (-item[1][0], item[0]))
+
+
+class Leaderboard:
+    def __init__(self):
+        self._global = Board(GLOBAL_SIZE)
+        self._boards = {}
+        self._categories = None
+        self._generation = None
+        self._lock = threading.RLock()
+
+    def _set_generation(self, generation):
+        if generation != self._generation:
+            self._generation = generation
+            self.invalidate()
+
+    def _check_generation(self):
+        self._set_generation(get_catalog_version(LEADERBOARD))
+
+    @staticmethod
+    def _category_rows():
+        return Category.objects.values_list('id', 'name', 'slug')
+
+    def _load_categories(self):
+        if self._categories is None:
+            self._categories = {category_id: (name, slug) for category_id, name, slug in self._category_rows()}
+        return self._categories
+
+    def _board(self, category_id):
+        board = self._boards.get(category_id)
+        if board is None:
+            board = self._boards[category_id] = Board(CATEGORY_SIZE)
+        return board
+
+    def _select(self, categories, category_slug):
+        if not category_slug:
+            return None, self._global
+        category_id = next((cid for cid, (_, slug) in categories.items() if slug == category_slug), None)
+        if category_id is None:
+            raise Category.DoesNotExist(category_slug)
+        return category_id, self._board(category_id)
+
+    @staticmethod
+    def _board_rows(board, category_id):
+        keywords = Keyword.objects.all()
+        if category_id is not None:
+            keywords = keywords.filter(category_id=category_id)
+        return keywords.order_by('-popularity', 'id').values_list('id', 'category_id', 'text', 'popularity')[:board.size]
+
+    def _rebuild(self, board, category_id=None):
+        board.load(self._board_rows(board, category_id))
+
+    @staticmethod
+    def _format(board, categories):
+        return [
+            {
+                'text': text,
+                'category': categories[cid][0],
+                'category_slug': categories[cid][1],
+                'popularity': popularity,
+            }
+            for _, (popularity, cid, text) in board.ranked()
+            if cid in categories
+        ]
+
+    def top(self, category_slug=None):
+        """Return trending topics overall or for one category
+
+        Raises Category.DoesNotExist for unknown slugs.
+        """
+        with self._lock:
+            self._check_generation()
+            categories = self._load_categories()
+            category_id, board = self._select(categories, category_slug)
+            stale = board.needs_rebuild()
+            record_cache('leaderboard', not stale)
+            if stale:
+                self._rebuild(board, category_id)
+            return self._format(board, categories)
+
+    async def atop(self, category_slug=None):
+        """Async variant of top() for the ASGI views"""
+        generation = await aget_catalog_version(LEADERBOARD)
+        with self._lock:
+            self._set_generation(generation)
+            categories = self._categories
+        if categories is None:
+            categories = {category_id: (name, slug) async for category_id, name, slug in self._category_rows()}
+            with self._lock:
+                self._categories = categories
+        with self._lock:
+            category_id, board = self._select(categories, category_slug)
+            stale = board.needs_rebuild()
+        record_cache('leaderboard', not stale)
+        if stale:
+            rows = [row async for row in self._board_rows(board, category_id)]
+            with self._lock:
+                board.load(rows)
+        with self._lock:
+            return self._format(board, categories)
+
+    def rebuild_all(self):
+        """Rebuild every board from the database and return the global one"""
+        with self._lock:
+            self.invalidate()
+            for category_id in self._load_categories():
+                self._rebuild(self._board(category_id), category_id)
+            return self.top()
+
+    def offer(self, keyword_id, category_id, text, popularity):
+        with self._lock:
+            for cid, board in self._boards.items():
+                if cid != category_id:
+                    board.discard(keyword_id)
+            self._board(category_id).offer(keyword_id, category_id, text, popularity)
+            self._global.offer(keyword_id, category_id, text, popularity)
+
+    def discard(self, keyword_id):
+        with self._lock:
+            self._global.discard(keyword_id)
+            for board in self._boards.values():
+                board.discard(keyword_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._categories = None
+            self._global.dirty = True
+            for board in self._boards.values():
+                board.dirty = True
+
+    def bump_generation(self):
+        """Tell every worker to rebuild its boards"""
+        bump_catalog_version(LEADERBOARD)
+        with self._lock:
+            self._generation = get_catalog_version(LEADERBOARD)
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,271 @@
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from generator.bulk import upsert_categories, upsert_keywords, upsert_templates
+from generator.models import Category, Keyword
+from generator.popularity import popularity_buffer
+from generator.signals import invalidate_catalog_caches
+
+SCENARIOS = ('home', 'keywords', 'trending', 'generate', 'question')
+
+WORDS = (
+    'ai art blog brand budget business campaign career chatbot code content course data design '
+    'diet email essay fitness finance funnel game garden growth habit health hiring image interview '
+    'invoice javascript journal landing launch leadership learning logo marketing meditation '
+    'meeting mobile music newsletter novel onboarding outline photo pitch plan podcast poem '
+    'portfolio pricing product productivity python recipe research resume review sales script '
+    'seo social startup story strategy study survey team testing travel tutorial video website '
+    'wellness workflow writing youtube'
+).split()
+
+TEMPLATES = (
+    ('Overview', 'Write a detailed overview of {topic} for beginners.'),
+    ('Checklist', 'Create a step-by-step checklist for {topic} with common pitfalls.'),
+    ('Comparison', 'Compare the main approaches to {topic} and recommend one.'),
+    ('Ideas', 'List 10 creative ideas related to {topic} with a short explanation each.'),
+)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a synthetic catalog into a throwaway test database and benchmarks the main pages and API '
+        'endpoints against it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=12, help='Synthetic categories to seed')
+        parser.add_argument('--keywords', type=int, default=10000, help='Synthetic keywords to seed across them')
+        parser.add_argument('--no-seed', action='store_true', help='Benchmark the configured database and its catalog as they are')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per scenario')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'Comma-separated subset of: {", ".join(SCENARIOS)}')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the catalog and the request mix')
+        parser.add_argument('--output', help='Where to save the JSON results (default: benchmarks/benchmark-<timestamp>.json)')
+        parser.add_argument('--compare', help='Earlier results file to print the changes against')
+
+    def seed_catalog(self, categories, keywords, rng):
+        started = time.perf_counter()
+        self.stdout.write(f'Seeding {categories} categories and {keywords} keywords...')
+        with transaction.atomic():
+            category_ids, _, _ = upsert_categories(
+                (f'Benchmark {n}', f'benchmark-{n}') for n in range(1, categories + 1)
+            )
+            ids = list(category_ids.values())
+            upsert_templates(
+                (category_id, name, template) for category_id in ids for name, template in TEMPLATES
+            )
+
+            def rows():
+                base = len(WORDS)
+                for i in range(keywords):
+                    # Distinct word combinations for the first len(WORDS) ** 3 keywords
+                    words = [WORDS[i % base], WORDS[i // base % base], WORDS[i // base ** 2 % base]]
+                    text = ' '.join(words) if i < base ** 3 else f'{" ".join(words)} {i // base ** 3}'
+                    related = ', '.join(rng.sample(WORDS, 3))
+                    yield ids[i % len(ids)], text, int(rng.paretovariate(1.2)), related, True
+
+            upsert_keywords(rows())
+            transaction.on_commit(invalidate_catalog_caches)
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+        return list(category_ids)
+
+    def sample_topics(self, slugs):
+        # Popular keywords are the ones users actually pick
+        keywords = Keyword.objects.order_by('-popularity')
+        if slugs:
+            keywords = keywords.filter(category__slug__in=slugs)
+        return list(keywords.values_list('category__slug', 'text')[:2000])
+
+    def make_request(self, scenario, rng, topics, slugs):
+        slug, text = rng.choice(topics)
+        if scenario == 'home':
+            return 'get', '/', None
+        if scenario == 'keywords':
+            words = text.split()
+            query = rng.choice([
+                '',
+                text[:rng.randint(3, max(3, len(text)))].lower(),
+                rng.choice(words),
+                # Two letters swapped
+                words[0][0] + words[0][2] + words[0][1] + words[0][3:] if len(words[0]) > 3 else words[0],
+            ])
+            return 'get', '/api/keywords/', {'category': slug, 'query': query}
+        if scenario == 'trending':
+            return 'get', '/api/trending/', {'category': rng.choice(slugs)} if rng.random() < 0.7 else {}
+        if scenario == 'generate':
+            return 'post', '/api/generate-prompts/', {'topic': text, 'category': slug}
+        return 'post', '/api/generate-question-prompts/', {'topic': text}
+
+    def run_scenario(self, scenario, total, concurrency, warmup, rng_seed, topics, slugs):
+        counter = itertools.count()
+        lock = threading.Lock()
+        results = []
+
+        def worker(worker_id):
+            rng = random.Random(f'{rng_seed}:{scenario}:{worker_id}')
+            client = Client(enforce_csrf_checks=False)
+            queries = [0]
+
+            def count_queries(execute, sql, params, many, context):
+                queries[0] += 1
+                return execute(sql, params, many, context)
+
+            local = []
+            try:
+                with connection.execute_wrapper(count_queries):
+                    while (n := next(counter)) < warmup + total:
+                        method, path, data = self.make_request(scenario, rng, topics, slugs)
+                        before = queries[0]
+                        started = time.perf_counter()
+                        if method == 'get':
+                            response = client.get(path, data, secure=True)
+                        else:
+                            response = client.post(path, json.dumps(data), content_type='application/json', secure=True)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                        elapsed = time.perf_counter() - started
+                        if n >= warmup:
+                            local.append((elapsed, response.status_code, queries[0] - before))
+            finally:
+                connection.close()
+            with lock:
+                results.extend(local)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        wall = time.perf_counter() - started
+
+        latencies = sorted(elapsed * 1000 for elapsed, _, _ in results)
+        errors = sum(1 for _, status, _ in results if status >= 400)
+        return {
+            'requests': len(results),
+            'errors': errors,
+            'throughput_rps': round(len(results) / wall, 1) if wall else 0.0,
+            'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+            'queries_per_request': round(sum(q for _, _, q in results) / len(results), 2) if results else 0.0,
+        }
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def print_comparison(self, results, path):
+        try:
+            with open(path) as f:
+                previous = json.load(f)['scenarios']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+        self.stdout.write(f'\nChange against {path}:')
+        for scenario, current in results.items():
+            before = previous.get(scenario)
+            if not before:
+                continue
+            changes = []
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_per_request'):
+                if before.get(metric):
+                    changes.append(f'{metric} {(current[metric] - before[metric]) / before[metric] * 100:+.1f}%')
+            self.stdout.write(f'  {scenario:<10} ' + ', '.join(changes))
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+        rng = random.Random(options['seed'])
+
+        if options['no_seed']:
+            report = self.benchmark(options, scenarios, rng, None)
+        else:
+            # The synthetic catalog goes into a test database that is dropped
+            # afterwards, never into the live one
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS})
+            try:
+                slugs = self.seed_catalog(options['categories'], options['keywords'], rng)
+                report = self.benchmark(options, scenarios, rng, slugs)
+            finally:
+                # Pending points belong to the test database
+                popularity_buffer.flush()
+                teardown_databases(old_config, verbosity=0)
+
+        output = options['output']
+        if not output:
+            # Kept out of the working tree; the directory is git-ignored
+            directory = os.path.join(settings.BASE_DIR, 'benchmarks')
+            os.makedirs(directory, exist_ok=True)
+            output = os.path.join(directory, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        if options['compare']:
+            self.print_comparison(report['scenarios'], options['compare'])
+        self.stdout.write(self.style.SUCCESS(f'Results saved to {output}'))
+
+    def benchmark(self, options, scenarios, rng, slugs):
+        """Run the scenarios against the current database and return the report"""
+        topics = self.sample_topics(slugs)
+        if not topics:
+            raise CommandError('The catalog has no keywords to benchmark with')
+        slugs = slugs or list(Category.objects.values_list('slug', flat=True))
+
+        results = {}
+        # Admission control would reject most of the load from one address
+        with override_settings(ALLOWED_HOSTS=['*'], ADMISSION_CONTROL_ENABLED=False):
+            for scenario in scenarios:
+                self.stdout.write(f'Running {scenario}...')
+                results[scenario] = self.run_scenario(
+                    scenario, options['requests'], options['concurrency'], options['warmup'], options['seed'], topics, slugs,
+                )
+                r = results[scenario]
+                self.stdout.write(
+                    f"  {r['throughput_rps']:>8.1f} req/s  p50 {r['p50_ms']:.2f}ms  p95 {r['p95_ms']:.2f}ms  "
+                    f"p99 {r['p99_ms']:.2f}ms  {r['queries_per_request']:.2f} queries/req  {r['errors']} errors"
+                )
+
+        report = {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': self.git_commit(),
+            'database': connection.vendor,
+            'options': {
+                key: options[key]
+                for key in ('categories', 'keywords', 'no_seed', 'requests', 'concurrency', 'warmup', 'seed')
+            },
+            'catalog': {
+                'categories': Category.objects.count(),
+                'keywords': Keyword.objects.count(),
+            },
+            'scenarios': results,
+        }
+        return report
@@ -0,0 +1,61 @@
+import gzip
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from generator.models import Category, Keyword, PromptTemplate
+
+
+class Command(BaseCommand):
+    help = 'Exports categories, prompt templates and keywords as JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, '-' for stdout. A .gz suffix enables gzip compression")
+        parser.add_argument('--gzip', action='store_true', help='Gzip-compress the output regardless of suffix')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time')
+
+    def records(self, chunk_size):
+        for name, slug in Category.objects.order_by('id').values_list('name', 'slug').iterator(chunk_size):
+            yield {'type': 'category', 'name': name, 'slug': slug}
+
+        templates = PromptTemplate.objects.order_by('id').values_list('category__slug', 'name', 'template')
+        for category, name, template in templates.iterator(chunk_size):
+            yield {'type': 'template', 'category': category, 'name': name, 'template': template}
+
+        keywords = Keyword.objects.order_by('id').values_list(
+            'category__slug', 'text', 'popularity', 'related_keywords', 'curated',
+        )
+        for category, text, popularity, related, curated in keywords.iterator(chunk_size):
+            yield {
+                'type': 'keyword', 'category': category, 'text': text, 'popularity': popularity, 'related': related,
+                'curated': curated,
+            }
+
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = options['gzip'] or path.endswith('.gz')
+        # Keep stdout clean for the data when exporting to it
+        log = self.stderr if path == '-' else self.stdout
+
+        if path == '-':
+            out = gzip.open(sys.stdout.buffer, 'wt', encoding='utf-8') if compress else sys.stdout
+        else:
+            out = gzip.open(path, 'wt', encoding='utf-8') if compress else open(path, 'w', encoding='utf-8')
+
+        started = time.perf_counter()
+        count = 0
+        try:
+            for record in self.records(options['chunk_size']):
+                out.write(json.dumps(record, ensure_ascii=False))
+                out.write('\n')
+                count += 1
+                if count % 50000 == 0:
+                    log.write(f'{count} rows exported ({count / (time.perf_counter() - started):.0f} rows/s)')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        elapsed = time.perf_counter() - started
+        log.write(self.style.SUCCESS(f'Exported {count} rows in {elapsed:.2f}s'))
@@ -0,0 +1,140 @@
+import gzip
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from generator.bulk import upsert_categories, upsert_keywords, upsert_templates
+from generator.models import Category
+from generator.signals import invalidate_catalog_caches
+
+
+class Command(BaseCommand):
+    help = 'Imports categories, prompt templates and keywords from JSON lines written by export_catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, '-' for stdin. Files starting with the gzip magic bytes are decompressed")
+        parser.add_argument('--batch-size', type=int, default=5000, help='Lines committed per transaction')
+        parser.add_argument(
+            '--keep-popularity',
+            action='store_true',
+            help='Leave the popularity of existing keywords untouched and only seed new ones',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the lines committed by a previous, interrupted run of the same file',
+        )
+
+    @staticmethod
+    def open(path):
+        if path == '-':
+            return sys.stdin
+        with open(path, 'rb') as f:
+            compressed = f.read(2) == b'\x1f\x8b'
+        return gzip.open(path, 'rt', encoding='utf-8') if compressed else open(path, encoding='utf-8')
+
+    @staticmethod
+    def checkpoint_path(path):
+        return f'{path}.progress'
+
+    def read_checkpoint(self, path):
+        try:
+            with open(self.checkpoint_path(path)) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, path, line_number):
+        tmp = f'{self.checkpoint_path(path)}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(line_number))
+        os.replace(tmp, self.checkpoint_path(path))
+
+    def resolve_categories(self, category_ids, slugs):
+        missing = set(slugs) - set(category_ids)
+        if missing:
+            category_ids.update(Category.objects.filter(slug__in=missing).values_list('slug', 'id'))
+
+    def import_batch(self, batch, category_ids, keep_popularity):
+        categories = []
+        templates = []
+        keywords = []
+        for line_number, line in batch:
+            try:
+                record = json.loads(line)
+                kind = record['type']
+                if kind == 'category':
+                    categories.append((record['name'], record['slug']))
+                elif kind == 'template':
+                    templates.append((record['category'], record['name'], record['template']))
+                elif kind == 'keyword':
+                    keywords.append((
+                        record['category'], record['text'], record.get('popularity', 0), record.get('related', ''),
+                        bool(record.get('curated', True)),
+                    ))
+                else:
+                    raise CommandError(f'Line {line_number}: unknown record type {kind!r}')
+            except (ValueError, KeyError, TypeError) as e:
+                raise CommandError(f'Line {line_number}: invalid record ({e})')
+
+        if categories:
+            ids, _, _ = upsert_categories(categories)
+            category_ids.update(ids)
+        self.resolve_categories(category_ids, [row[0] for row in templates + keywords])
+        unknown = {row[0] for row in templates + keywords} - set(category_ids)
+        if unknown:
+            raise CommandError(f'Unknown categories in lines {batch[0][0]}-{batch[-1][0]}: {", ".join(sorted(unknown))}')
+
+        upsert_templates((category_ids[slug], name, template) for slug, name, template in templates)
+        upsert_keywords(
+            ((category_ids[slug], text, popularity, related, curated) for slug, text, popularity, related, curated in keywords),
+            keep_popularity=keep_popularity,
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if options['resume'] and path == '-':
+            raise CommandError('--resume needs a file path')
+
+        skip = self.read_checkpoint(path) if options['resume'] else 0
+        if skip:
+            self.stdout.write(f'Resuming after line {skip}')
+
+        started = time.perf_counter()
+        category_ids = {}
+        imported = 0
+        line_number = skip
+        source = self.open(path)
+        try:
+            lines = ((number, line) for number, line in enumerate(source, start=1) if line.strip())
+            lines = ((number, line) for number, line in lines if number > skip)
+            while batch := list(islice(lines, batch_size)):
+                with transaction.atomic():
+                    self.import_batch(batch, category_ids, options['keep_popularity'])
+                line_number = batch[-1][0]
+                imported += len(batch)
+                if path != '-':
+                    self.write_checkpoint(path, line_number)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{imported} rows imported, up to line {line_number} ({imported / elapsed:.0f} rows/s)')
+        except Exception:
+            if imported:
+                self.stderr.write(f'Lines up to {line_number} were committed; re-run with --resume to continue')
+            raise
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if imported:
+                # Bulk writes skip the model signals
+                invalidate_catalog_caches()
+
+        if path != '-' and os.path.exists(self.checkpoint_path(path)):
+            os.remove(self.checkpoint_path(path))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} rows in {elapsed:.2f}s'))
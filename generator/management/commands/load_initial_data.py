@@ -1,18 +1,42 @@
+import time
+
 from django.core.management.base import BaseCommand
-from generator.models import Category, PromptTemplate, Keyword
+from django.db import transaction
 from django.utils.text import slugify
 
+from generator.bulk import upsert_categories, upsert_keywords, upsert_templates
+from generator.models import Category
+from generator.signals import invalidate_catalog_caches
+
+
 class Command(BaseCommand):
     help = 'Loads initial categories and prompt templates'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-popularity',
+            action='store_true',
+            help='Leave the popularity of existing keywords untouched and only seed new ones',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete all categories, templates and keywords before loading',
+        )
+
+    @staticmethod
+    def _find_category(slugs, key):
+        # Data keys are matched loosely against category slugs, e.g. 'blogging' -> 'blogging-seo'
+        for slug in slugs:
+            if key in slug or slug in key:
+                return slug
+        return None
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
         self.stdout.write('Loading initial data...')
-        
-        # Clear existing data
-        self.stdout.write('Clearing existing data...')
-        Category.objects.all().delete()
-        
-        # Create categories
+
+        # Categories
         categories_data = [
             "ChatGPT",
             "Midjourney",
@@ -27,13 +51,8 @@ class Command(BaseCommand):
             "E-commerce",
             "Personal Development"
         ]
-        
-        categories = {}
-        for category_name in categories_data:
-            slug = slugify(category_name)
-            category = Category.objects.create(name=category_name, slug=slug)
-            categories[slug] = category
-            self.stdout.write(f'Created category: {category_name}')
+        category_rows = [(name, slugify(name)) for name in categories_data]
+        category_slugs = [slug for _, slug in category_rows]
         
         # Create templates for each category
         prompt_templates = {
@@ -234,40 +253,14 @@ class Command(BaseCommand):
         # Merge the additional templates into the prompt_templates dictionary
         prompt_templates.update(additional_templates)
         
-        # Map dictionary to normalize slug names
-        slug_mapping = {
-            'blogging-seo': 'blogging-seo',
-            'social-media': 'social-media',
-        }
-        
-        template_count = 0
+        template_rows = []
         for template_category, templates in prompt_templates.items():
-            # Get the correct category slug mapping
-            if template_category in slug_mapping:
-                category_slug = slug_mapping[template_category]
-            else:
-                category_slug = template_category
-                
-            # Find the category in our categories
-            category = None
-            for cat_slug, cat in categories.items():
-                if template_category in cat_slug or cat_slug in template_category:
-                    category = cat
-                    break
-                    
-            if not category:
+            category_slug = self._find_category(category_slugs, template_category)
+            if not category_slug:
                 self.stdout.write(self.style.WARNING(f'Category not found for slug: {template_category}'))
                 continue
-                
             for template_data in templates:
-                PromptTemplate.objects.create(
-                    name=template_data['name'],
-                    template=template_data['template'],
-                    category=category
-                )
-                template_count += 1
-        
-        self.stdout.write(f'Created {template_count} prompt templates')
+                template_rows.append((category_slug, template_data['name'], template_data['template']))
         
         # Add expanded keywords with related terms for each category
         keywords_data = {
@@ -417,32 +410,16 @@ class Command(BaseCommand):
             ]
         }
         
-        keyword_count = 0
+        keyword_rows = []
         for keyword_category, keywords in keywords_data.items():
-            # Find the category in our categories
-            category = None
-            for cat_slug, cat in categories.items():
-                if keyword_category in cat_slug or cat_slug in keyword_category:
-                    category = cat
-                    break
-                    
-            if not category:
+            category_slug = self._find_category(category_slugs, keyword_category)
+            if not category_slug:
                 self.stdout.write(self.style.WARNING(f'Category not found for slug: {keyword_category}'))
                 continue
-                
             for i, keyword_data in enumerate(keywords):
                 # Give some keywords higher popularity
                 popularity = 10 - i if i < 5 else 5
-                
-                Keyword.objects.create(
-                    text=keyword_data['text'],
-                    category=category,
-                    popularity=popularity,
-                    related_keywords=keyword_data['related']
-                )
-                keyword_count += 1
-        
-        self.stdout.write(f'Created {keyword_count} initial keywords')
+                keyword_rows.append((category_slug, keyword_data['text'], popularity, keyword_data['related']))
         
         # Add some additional common search terms
         additional_terms = [
@@ -455,20 +432,34 @@ class Command(BaseCommand):
             {'category': 'chatgpt', 'text': 'write a poem about', 'related': 'poetry, creative writing, verses, rhymes, sonnet', 'popularity': 9},
         ]
         
-        add_count = 0
         for term in additional_terms:
-            try:
-                category = Category.objects.get(slug__icontains=term['category'])
-                Keyword.objects.create(
-                    text=term['text'],
-                    category=category,
-                    popularity=term['popularity'],
-                    related_keywords=term['related']
-                )
-                add_count += 1
-            except Category.DoesNotExist:
+            category_slug = self._find_category(category_slugs, term['category'])
+            if not category_slug:
                 self.stdout.write(self.style.WARNING(f"Category not found for: {term['category']}"))
-        
-        self.stdout.write(f'Added {add_count} common search terms')
-        
-        self.stdout.write(self.style.SUCCESS('Successfully loaded initial data')) 
\ No newline at end of file
+                continue
+            keyword_rows.append((category_slug, term['text'], term['popularity'], term['related']))
+
+        with transaction.atomic():
+            if options['reset']:
+                self.stdout.write('Clearing existing data...')
+                Category.objects.all().delete()
+
+            category_ids, created, updated = upsert_categories(category_rows)
+            self.stdout.write(f'Categories: {created} created, {updated} updated')
+
+            created, updated = upsert_templates(
+                (category_ids[slug], name, template) for slug, name, template in template_rows
+            )
+            self.stdout.write(f'Prompt templates: {created} created, {updated} updated')
+
+            created, updated = upsert_keywords(
+                ((category_ids[slug], text, popularity, related, True) for slug, text, popularity, related in keyword_rows),
+                keep_popularity=options['keep_popularity'],
+            )
+            self.stdout.write(f'Keywords: {created} created, {updated} updated')
+
+            # Bulk writes skip the model signals
+            transaction.on_commit(invalidate_catalog_caches)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Successfully loaded initial data in {elapsed:.2f}s'))
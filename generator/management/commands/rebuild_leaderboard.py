@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from generator.leaderboard import leaderboard
+
+class Command(BaseCommand):
+    help = 'Rebuilds the trending leaderboard from scratch'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write('Rebuilding trending leaderboard...')
+        topics = leaderboard.rebuild_all()
+        leaderboard.bump_generation()
+        
+        for position, topic in enumerate(topics, start=1):
+            self.stdout.write(f"{position:>3}. {topic['text']} ({topic['category']}) - {topic['popularity']}")
+        
+        self.stdout.write(self.style.SUCCESS('Successfully rebuilt trending leaderboard'))
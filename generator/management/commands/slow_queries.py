@@ -0,0 +1,90 @@
+import json
+import os
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ORDERINGS = ('total', 'max', 'mean', 'count')
+
+# Placeholder lists of any length, string and numeric literals
+IN_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """The statement with literals and IN lists collapsed, so repeats group together"""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = IN_LIST.sub('(...)', sql)
+    return SPACE.sub(' ', sql).strip()
+
+
+class Command(BaseCommand):
+    help = 'Summarizes the slow query log written when SLOW_QUERY_LOG_ENABLED is on'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Log file (default: SLOW_QUERY_LOG_PATH). Rotated backups (.1, .2, ...) are read too')
+        parser.add_argument('--top', type=int, default=10, help='Statements to show')
+        parser.add_argument('--order-by', choices=ORDERINGS, default='total', help='Rank statements by this')
+        parser.add_argument('--view', help='Only queries run while serving this view')
+        parser.add_argument('--plans', action='store_true', help='Show the plan and parameters of the slowest sample')
+
+    def entries(self, path):
+        # Oldest rotated backup first
+        paths = [p for p in [path] + [f'{path}.{n}' for n in range(1, 100)] if os.path.exists(p)]
+        if not paths:
+            raise CommandError(f'No slow query log at {path}')
+        for p in reversed(paths):
+            with open(p, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash or rotation
+                        continue
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.SLOW_QUERY_LOG_PATH
+        groups = {}
+        for entry in self.entries(path):
+            if options['view'] and entry.get('view') != options['view']:
+                continue
+            key = fingerprint(entry['sql'])
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'views': set(), 'slowest': entry}
+            duration = entry['duration_ms']
+            group['count'] += 1
+            group['total'] += duration
+            if duration >= group['max']:
+                group['max'] = duration
+                group['slowest'] = entry
+            group['views'].add(entry.get('view') or '-')
+
+        if not groups:
+            self.stdout.write('No slow queries recorded')
+            return
+
+        for group in groups.values():
+            group['mean'] = group['total'] / group['count']
+        order = options['order_by']
+        ranked = sorted(groups.items(), key=lambda item: item[1][order], reverse=True)
+
+        total_count = sum(group['count'] for group in groups.values())
+        self.stdout.write(f'{total_count} slow queries in {len(groups)} distinct statements, by {order}:\n')
+        for rank, (sql, group) in enumerate(ranked[:options['top']], 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank}  {group['count']}x  total {group['total']:.1f}ms  "
+                f"mean {group['mean']:.1f}ms  max {group['max']:.1f}ms"
+            ))
+            self.stdout.write(f"    views: {', '.join(sorted(group['views']))}")
+            self.stdout.write(f'    {sql}')
+            if options['plans']:
+                slowest = group['slowest']
+                self.stdout.write(f"    slowest at {slowest.get('time')} with params {json.dumps(slowest.get('params'))}")
+                for row in slowest.get('plan') or ['(no plan)']:
+                    self.stdout.write(f'      {row}')
+            self.stdout.write('')
@@ -0,0 +1,81 @@
+"""Prometheus metrics served at /metrics.
+
+Under gunicorn every worker keeps its own counters, so the exposition must
+merge them: set ``PROMETHEUS_MULTIPROC_DIR`` (see settings.py) to a
+directory shared by the workers of a host and prometheus_client keeps each
+worker's values in mmap'd files there, which ``render()`` aggregates. The
+directory has to be emptied whenever the server (re)starts.
+"""
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+REQUESTS = Counter(
+    'generator_requests_total',
+    'HTTP requests by view, method and status',
+    ['view', 'method', 'status'],
+)
+REQUEST_DURATION = Histogram(
+    'generator_request_duration_seconds',
+    'Request latency by view and status',
+    ['view', 'status'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    'generator_db_queries_per_request',
+    'Database queries per request by view',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_DURATION = Histogram(
+    'generator_db_duration_seconds',
+    'Database time per request by view',
+    ['view'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_REQUESTS = Counter(
+    'generator_cache_requests_total',
+    'In-process cache lookups by cache and result (hit or miss)',
+    ['cache', 'result'],
+)
+FALLBACKS = Counter(
+    'generator_fallback_total',
+    'Requests answered from hardcoded defaults because the database failed',
+    ['view'],
+)
+KEYWORDS_CREATED = Counter(
+    'generator_keywords_created_total',
+    'Keywords created from user input',
+)
+
+
+def observe_request(view, method, status, durations, queries):
+    """Record a finished request; ``durations`` are milliseconds as in generator.timing"""
+    REQUESTS.labels(view, method, status).inc()
+    REQUEST_DURATION.labels(view, status).observe(durations['total'] / 1000)
+    DB_QUERIES.labels(view).observe(queries)
+    DB_DURATION.labels(view).observe(durations['db'] / 1000)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_fallback(view):
+    FALLBACKS.labels(view).inc()
+
+
+def record_keywords_created(count):
+    if count:
+        KEYWORDS_CREATED.inc(count)
+
+
+def render():
+    """Return (body, content type) of the exposition for every worker"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
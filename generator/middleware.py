@@ -0,0 +1,128 @@
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics, timing
+from .replicas import PIN_COOKIE, replica_aliases
+from .throttle import get_backend
+
+
+class ServerTimingMiddleware:
+    """Break each request down into view, database and JSON encoding time
+
+    The breakdown is sent as a ``Server-Timing`` header when
+    ``SERVER_TIMING_HEADER`` is on, logged as one JSON line per request to
+    the ``generator.timing`` logger when ``SERVER_TIMING_LOG`` is on, and
+    always added to the per-view totals served by /internal/timings/.
+    Should be first in MIDDLEWARE so the total covers everything else.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request_timing, token = timing.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.finish(token)
+        return self.finish(request, response, request_timing)
+
+    async def __acall__(self, request):
+        request_timing, token = timing.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.finish(token)
+        return self.finish(request, response, request_timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request_timing = timing.current()
+        if request_timing is not None:
+            match = request.resolver_match
+            request_timing.view_name = match.view_name if match else None
+            request_timing.view_started = time.perf_counter()
+
+    def finish(self, request, response, request_timing):
+        now = time.perf_counter()
+        if request_timing.view_started is not None:
+            request_timing.view_time = now - request_timing.view_started
+        durations = request_timing.durations(now - request_timing.started)
+        view_name = request_timing.view_name or '<unresolved>'
+        timing.timing_stats.add(view_name, durations, request_timing.queries, response.status_code)
+        metrics.observe_request(view_name, request.method, response.status_code, durations, request_timing.queries)
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = timing.server_timing_header(durations, request_timing.queries)
+        if getattr(settings, 'SERVER_TIMING_LOG', False):
+            timing.log_request(request, response, request_timing, durations)
+        return response
+
+
+class AdmissionControlMiddleware(MiddlewareMixin):
+    """Reject requests over the per-client or global rate of an endpoint with a 429
+
+    Limits are looked up by URL name in ``ADMISSION_CONTROL_RATES``. The check
+    runs in process_view, after URL resolution but before the view, so a
+    rejected request never reaches the ORM.
+    """
+
+    def client_id(self, request):
+        header = getattr(settings, 'ADMISSION_CONTROL_CLIENT_IP_HEADER', '')
+        if header and request.META.get(header):
+            # The address appended by our own proxy is the last one
+            return request.META[header].split(',')[-1].strip()
+        return request.META.get('REMOTE_ADDR', '')
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, 'ADMISSION_CONTROL_ENABLED', True):
+            return None
+        match = request.resolver_match
+        limits = getattr(settings, 'ADMISSION_CONTROL_RATES', {}).get(match.url_name if match else None)
+        if not limits:
+            return None
+
+        buckets = []
+        if 'client' in limits:
+            rate, burst = limits['client']
+            buckets.append((f'{match.url_name}:client:{self.client_id(request)}', rate, burst))
+        if 'global' in limits:
+            rate, burst = limits['global']
+            buckets.append((f'{match.url_name}:global', rate, burst))
+
+        retry_after = get_backend().take(buckets)
+        if not retry_after:
+            return None
+        response = JsonResponse({'error': 'Too many requests'}, status=429)
+        response['Retry-After'] = str(max(1, math.ceil(min(retry_after, 3600))))
+        return response
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """Keep a client's reads on the primary for a while after it writes
+
+    Any successful request with an unsafe method may have written, so its
+    response sets a cookie holding the time until which the client's reads
+    skip the replicas (see ``generator.replicas``).
+    """
+
+    def process_response(self, request, response):
+        if not replica_aliases() or request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            return response
+        if response.status_code < 400:
+            seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+            response.set_cookie(
+                PIN_COOKIE, f'{time.time() + seconds:.3f}', max_age=seconds,
+                secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0002_keyword_related_keywords'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, help_text='Lower-cased related keyword or synonym', max_length=200)),
+                ('keyword', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_terms', to='generator.keyword')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('keyword', 'term'), name='unique_related_term_per_keyword')],
+            },
+        ),
+    ]
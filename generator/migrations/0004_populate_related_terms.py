@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def populate_related_terms(apps, schema_editor):
+    Keyword = apps.get_model('generator', 'Keyword')
+    RelatedTerm = apps.get_model('generator', 'RelatedTerm')
+
+    batch = []
+    keywords = Keyword.objects.exclude(related_keywords='').values_list('id', 'related_keywords')
+    for keyword_id, related_keywords in keywords.iterator(chunk_size=2000):
+        terms = {' '.join(kw.split()).lower()[:200] for kw in related_keywords.split(',')}
+        terms.discard('')
+        batch.extend(RelatedTerm(keyword_id=keyword_id, term=term) for term in terms)
+        if len(batch) >= 5000:
+            RelatedTerm.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        RelatedTerm.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def clear_related_terms(apps, schema_editor):
+    apps.get_model('generator', 'RelatedTerm').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0003_relatedterm'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_related_terms, clear_related_terms),
+    ]
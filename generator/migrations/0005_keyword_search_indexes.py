@@ -0,0 +1,91 @@
+# Generated by Django 5.1 on 2026-10-18 19:59
+
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+# Keep in sync with generator.search
+FTS_TABLE = 'generator_keyword_fts'
+TRGM_INDEX = 'generator_keyword_text_trgm'
+TRGM_TERM_INDEX = 'generator_relatedterm_term_trgm'
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    # Matches the UPPER("text"::text) LIKE UPPER(...) that icontains generates
+    f'CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON generator_keyword USING gin ((UPPER(text::text)) gin_trgm_ops)',
+    f'CREATE INDEX IF NOT EXISTS {TRGM_TERM_INDEX} ON generator_relatedterm USING gin ((term::text) gin_trgm_ops)',
+]
+
+POSTGRES_BACKWARD = [
+    f'DROP INDEX IF EXISTS {TRGM_TERM_INDEX}',
+    f'DROP INDEX IF EXISTS {TRGM_INDEX}',
+]
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        text, related_keywords, content='generator_keyword', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON generator_keyword BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text, related_keywords) VALUES (new.id, new.text, new.related_keywords);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON generator_keyword BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text, related_keywords)
+        VALUES ('delete', old.id, old.text, old.related_keywords);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF text, related_keywords ON generator_keyword BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text, related_keywords)
+        VALUES ('delete', old.id, old.text, old.related_keywords);
+        INSERT INTO {FTS_TABLE}(rowid, text, related_keywords) VALUES (new.id, new.text, new.related_keywords);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def create_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}.get(vendor)
+    if statements is None:
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            _run(schema_editor, statements)
+    except DatabaseError as e:
+        # Missing pg_trgm privileges or an SQLite build without FTS5 trigram
+        # support; keyword search falls back to LIKE scans.
+        logger.warning('Skipping keyword search backend: %s', e)
+
+
+def drop_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(vendor)
+    if statements is not None:
+        _run(schema_editor, statements)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0004_populate_related_terms'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='keyword',
+            index=models.Index(fields=['category', '-popularity'], name='keyword_category_popularity'),
+        ),
+        migrations.RunPython(create_search_backend, drop_search_backend),
+    ]
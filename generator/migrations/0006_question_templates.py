@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-18 20:10
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0005_keyword_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('template', models.TextField(help_text='Use {topic} where the topic should go')),
+                ('order', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['order', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='keyword',
+            index=models.Index(django.db.models.functions.text.Lower('text'), name='keyword_text_lower'),
+        ),
+        migrations.AddField(
+            model_name='questiontemplate',
+            name='category',
+            field=models.ForeignKey(blank=True, help_text='Leave empty to use for every category without question templates of its own', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='question_templates', to='generator.category'),
+        ),
+    ]
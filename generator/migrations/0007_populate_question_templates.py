@@ -0,0 +1,37 @@
+from django.db import migrations
+
+DEFAULT_QUESTION_TEMPLATES = [
+    ('What is', 'What is {topic}? Provide a detailed explanation with examples.'),
+    ('Why important', 'Why is {topic} important or significant? Explain its relevance and impact.'),
+    ('How to use', 'How to use {topic} effectively? Provide practical steps and best practices.'),
+    ('Compare', 'Compare {topic} with its alternatives. What are the advantages and disadvantages?'),
+    ('History', 'What is the history and evolution of {topic}? How has it developed over time?'),
+    ('Future trends', 'What are the future trends and developments in {topic}? How might it evolve?'),
+    ('Common misconceptions', 'What are common misconceptions about {topic}? Clarify these with accurate information.'),
+    ('For beginners', 'Explain {topic} for complete beginners. Use simple language and analogies.'),
+]
+
+
+def populate_question_templates(apps, schema_editor):
+    QuestionTemplate = apps.get_model('generator', 'QuestionTemplate')
+    if QuestionTemplate.objects.filter(category__isnull=True).exists():
+        return
+    QuestionTemplate.objects.bulk_create([
+        QuestionTemplate(name=name, template=template, order=order)
+        for order, (name, template) in enumerate(DEFAULT_QUESTION_TEMPLATES)
+    ])
+
+
+def clear_question_templates(apps, schema_editor):
+    apps.get_model('generator', 'QuestionTemplate').objects.filter(category__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0006_question_templates'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_question_templates, clear_question_templates),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+from ._sqlite_fts import restore_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0008_catalog_version'),
+    ]
+
+    operations = [
+        # Existing keywords cannot be told apart, so they start out uncurated;
+        # the next load_initial_data or import_catalog marks the ones it loads
+        migrations.AddField(
+            model_name='keyword',
+            name='curated',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='keyword',
+            name='curated',
+            field=models.BooleanField(default=True, help_text="Added by an editor or a catalog import rather than from a user's search; only these are listed in the sitemap"),
+        ),
+        # Both operations rebuild generator_keyword on SQLite
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_keywords(apps, schema_editor):
+    """Fold keywords sharing a category and text into the oldest of them"""
+    Keyword = apps.get_model('generator', 'Keyword')
+    RelatedTerm = apps.get_model('generator', 'RelatedTerm')
+
+    duplicates = (
+        Keyword.objects.values('category_id', 'text')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    for group in duplicates.iterator():
+        keywords = list(
+            Keyword.objects.filter(category_id=group['category_id'], text=group['text']).order_by('id')
+        )
+        kept, others = keywords[0], keywords[1:]
+        related = []
+        for keyword in keywords:
+            for kw in keyword.related_keywords.split(','):
+                kw = kw.strip()
+                if kw and kw not in related:
+                    related.append(kw)
+        kept.popularity = sum(keyword.popularity for keyword in keywords)
+        kept.curated = any(keyword.curated for keyword in keywords)
+        kept.related_keywords = ', '.join(related)
+        kept.save(update_fields=['popularity', 'curated', 'related_keywords'])
+
+        other_ids = [keyword.id for keyword in others]
+        terms = RelatedTerm.objects.filter(keyword_id__in=other_ids).values_list('term', flat=True)
+        RelatedTerm.objects.bulk_create(
+            [RelatedTerm(keyword_id=kept.id, term=term) for term in set(terms)], ignore_conflicts=True,
+        )
+        Keyword.objects.filter(id__in=other_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0009_keyword_curated'),
+    ]
+
+    operations = [
+        # Kept apart from the unique constraint in 0011: PostgreSQL cannot
+        # alter a table with foreign key checks still pending from rows
+        # changed in the same transaction
+        migrations.RunPython(merge_duplicate_keywords, migrations.RunPython.noop),
+    ]
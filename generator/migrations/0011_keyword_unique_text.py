@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+from ._sqlite_fts import restore_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0010_merge_duplicate_keywords'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='keyword',
+            constraint=models.UniqueConstraint(fields=('category', 'text'), name='unique_keyword_per_category'),
+        ),
+        # AddConstraint rebuilds generator_keyword on SQLite
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
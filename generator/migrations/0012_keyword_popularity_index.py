@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0011_keyword_unique_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='keyword',
+            index=models.Index(fields=['-popularity', 'id'], name='keyword_popularity_id'),
+        ),
+    ]
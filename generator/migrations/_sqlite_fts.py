@@ -0,0 +1,36 @@
+"""Restores the FTS5 keyword search triggers of migration 0005 on SQLite.
+
+SQLite cannot alter most columns in place, so Django rebuilds
+``generator_keyword`` for such changes and its triggers are dropped with the
+old table. Migrations that rebuild it run ``restore_fts_triggers`` after.
+Keep in sync with 0005_keyword_search_indexes.
+"""
+
+FTS_TABLE = 'generator_keyword_fts'
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON generator_keyword BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text, related_keywords) VALUES (new.id, new.text, new.related_keywords);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON generator_keyword BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text, related_keywords)
+        VALUES ('delete', old.id, old.text, old.related_keywords);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text, related_keywords ON generator_keyword BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text, related_keywords)
+        VALUES ('delete', old.id, old.text, old.related_keywords);
+        INSERT INTO {FTS_TABLE}(rowid, text, related_keywords) VALUES (new.id, new.text, new.related_keywords);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if FTS_TABLE not in connection.introspection.table_names(cursor):
+            return
+    for statement in SQLITE_TRIGGERS:
+        schema_editor.execute(statement, params=None)
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 # Create your models here.
 
@@ -34,6 +35,24 @@ class Keyword(models.Model):
     category = models.ForeignKey(Category, related_name='keywords', on_delete=models.CASCADE)
     popularity = models.IntegerField(default=0)
     related_keywords = models.TextField(blank=True, help_text="Comma-separated related keywords or synonyms")
+    curated = models.BooleanField(
+        default=True,
+        help_text="Added by an editor or a catalog import rather than from a user's search; only these are listed in the sitemap"
+    )
+    
+    class Meta:
+        indexes = [
+            # Suggestions and trending filter on category and rank by popularity
+            models.Index(fields=['category', '-popularity'], name='keyword_category_popularity'),
+            # The global trending board is the top of this order
+            models.Index(fields=['-popularity', 'id'], name='keyword_popularity_id'),
+            # Case-insensitive exact lookups of a topic
+            models.Index(Lower('text'), name='keyword_text_lower'),
+        ]
+        constraints = [
+            # Popularity flushes create missing keywords concurrently from several workers
+            models.UniqueConstraint(fields=['category', 'text'], name='unique_keyword_per_category'),
+        ]
     
     def __str__(self):
         return self.text
@@ -44,6 +63,18 @@ class Keyword(models.Model):
             return []
         return [kw.strip() for kw in self.related_keywords.split(',')]
     
+    def sync_related_terms(self):
+        """Mirror the comma-separated related_keywords into RelatedTerm rows"""
+        terms = {RelatedTerm.normalize(kw) for kw in self.get_related_keywords_list()}
+        terms.discard('')
+        existing = set(self.related_terms.values_list('term', flat=True))
+        if existing - terms:
+            self.related_terms.filter(term__in=existing - terms).delete()
+        if terms - existing:
+            RelatedTerm.objects.bulk_create(
+                [RelatedTerm(keyword=self, term=term) for term in terms - existing]
+            )
+    
     @classmethod
     def get_default_keywords(cls):
         return [
@@ -54,6 +85,22 @@ class Keyword(models.Model):
             {"id": 5, "text": "Instagram", "category_id": 5, "popularity": 10}
         ]
 
+class RelatedTerm(models.Model):
+    keyword = models.ForeignKey(Keyword, related_name='related_terms', on_delete=models.CASCADE)
+    term = models.CharField(max_length=200, db_index=True, help_text="Lower-cased related keyword or synonym")
+    
+    def __str__(self):
+        return self.term
+    
+    @staticmethod
+    def normalize(term):
+        return ' '.join(term.split()).lower()[:200]
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['keyword', 'term'], name='unique_related_term_per_keyword'),
+        ]
+
 class PromptTemplate(models.Model):
     name = models.CharField(max_length=200)
     template = models.TextField()
@@ -96,3 +143,39 @@ class PromptTemplate(models.Model):
                 "category_id": 5
             }
         ]
+
+class QuestionTemplate(models.Model):
+    name = models.CharField(max_length=200)
+    template = models.TextField(help_text="Use {topic} where the topic should go")
+    category = models.ForeignKey(
+        Category, related_name='question_templates', on_delete=models.CASCADE, null=True, blank=True,
+        help_text="Leave empty to use for every category without question templates of its own"
+    )
+    order = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['order', 'id']
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def get_default_templates(cls):
+        return [
+            {"name": "What is", "template": "What is {topic}? Provide a detailed explanation with examples."},
+            {"name": "Why important", "template": "Why is {topic} important or significant? Explain its relevance and impact."},
+            {"name": "How to use", "template": "How to use {topic} effectively? Provide practical steps and best practices."},
+            {"name": "Compare", "template": "Compare {topic} with its alternatives. What are the advantages and disadvantages?"},
+            {"name": "History", "template": "What is the history and evolution of {topic}? How has it developed over time?"},
+            {"name": "Future trends", "template": "What are the future trends and developments in {topic}? How might it evolve?"},
+            {"name": "Common misconceptions", "template": "What are common misconceptions about {topic}? Clarify these with accurate information."},
+            {"name": "For beginners", "template": "Explain {topic} for complete beginners. Use simple language and analogies."}
+        ]
+
+class CatalogVersion(models.Model):
+    """Opaque stamp that changes with the data behind cached catalog responses"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.CharField(max_length=32)
+    
+    def __str__(self):
+        return f'{self.name}: {self.version}'
@@ -0,0 +1,204 @@
+"""Write-behind accumulator for keyword popularity.
+
+Views call ``popularity_buffer.record()`` instead of doing a read-modify-write
+on the Keyword row. Increments are coalesced per (category, text) in memory
+and written by a background thread every ``POPULARITY_FLUSH_INTERVAL``
+seconds as batched ``popularity = popularity + n`` updates. Keywords that do
+not exist yet are inserted in bulk first; the (category, text) unique
+constraint makes a concurrent insert from another worker a no-op. Pending
+increments are also flushed when the buffer reaches ``POPULARITY_BUFFER_SIZE``
+distinct keys and at interpreter exit.
+
+Texts are cut to the length of ``Keyword.text`` when recorded. Each batch is
+written in its own transaction. When the database is unreachable the batch
+is queued again; when a batch is rejected, its keys are written one at a
+time and those that still fail (e.g. their category was deleted) are dropped,
+so one bad key cannot hold back the others.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, InterfaceError, OperationalError, close_old_connections, transaction
+from django.db.models import Case, F, Q, Value, When
+
+from .metrics import record_keywords_created
+from .models import Category, Keyword
+from .signals import popularity_flushed
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+TEXT_MAX_LENGTH = Keyword._meta.get_field('text').max_length
+
+# Errors after which writing the same rows later may succeed
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+class PopularityBuffer:
+    """Coalesces popularity increments and flushes them in batches"""
+
+    def __init__(self):
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'POPULARITY_FLUSH_INTERVAL', 5.0)
+
+    @property
+    def max_keys(self):
+        return getattr(settings, 'POPULARITY_BUFFER_SIZE', 10000)
+
+    def _add(self, category_id, text, n):
+        self._ensure_flusher()
+        key = (category_id, text[:TEXT_MAX_LENGTH])
+        with self._lock:
+            self._pending[key] += n
+            full = len(self._pending) >= self.max_keys
+        return full or not self.flush_interval
+
+    def record(self, category_id, text, n=1):
+        """Queue ``n`` popularity points for the keyword"""
+        if self._add(category_id, text, n):
+            self.flush()
+
+    async def arecord(self, category_id, text, n=1):
+        """Async variant of record(); an inline flush runs in a worker thread"""
+        if self._add(category_id, text, n):
+            await sync_to_async(self.flush)()
+
+    def pending(self, category_id, text):
+        with self._lock:
+            return self._pending.get((category_id, text[:TEXT_MAX_LENGTH]), 0)
+
+    def popularity(self, category_id, text):
+        """The keyword's stored popularity plus the points not flushed yet"""
+        stored = (
+            Keyword.objects.filter(category_id=category_id, text=text[:TEXT_MAX_LENGTH])
+            .values_list('popularity', flat=True).first()
+        )
+        return (stored or 0) + self.pending(category_id, text)
+
+    async def apopularity(self, category_id, text):
+        stored = await (
+            Keyword.objects.filter(category_id=category_id, text=text[:TEXT_MAX_LENGTH])
+            .values_list('popularity', flat=True).afirst()
+        )
+        return (stored or 0) + self.pending(category_id, text)
+
+    def flush(self):
+        """Write all pending increments to the database"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return
+        updated, created, totals = {}, [], []
+        items = list(pending.items())
+        with self._flush_lock:
+            for start in range(0, len(items), BATCH_SIZE):
+                batch = items[start:start + BATCH_SIZE]
+                try:
+                    written = self._write(batch)
+                except TRANSIENT_ERRORS:
+                    logger.exception('Failed to flush %d popularity counters', len(items) - start)
+                    self._requeue(dict(items[start:]))
+                    break
+                except DatabaseError:
+                    logger.exception('Rejected batch of %d popularity counters; writing them one by one', len(batch))
+                    written = self._write_each(batch)
+                updated.update(written[0])
+                created.extend(written[1])
+                totals.extend(written[2])
+        if updated or created:
+            popularity_flushed.send(sender=Keyword, deltas=updated, totals=totals, created=created)
+
+    def _write_each(self, batch):
+        updated, created, totals = {}, [], []
+        for index, (key, n) in enumerate(batch):
+            try:
+                written = self._write([(key, n)])
+            except TRANSIENT_ERRORS:
+                logger.exception('Failed to flush %d popularity counters', len(batch) - index)
+                self._requeue(dict(batch[index:]))
+                break
+            except DatabaseError:
+                logger.exception('Dropped %d popularity points for %r', n, key)
+                continue
+            updated.update(written[0])
+            created.extend(written[1])
+            totals.extend(written[2])
+        return updated, created, totals
+
+    def _write(self, batch):
+        """Write one batch in a transaction; returns (updated deltas, created rows, totals)"""
+        match = reduce(or_, (Q(category_id=category_id, text=text) for (category_id, text), _ in batch))
+        with transaction.atomic():
+            existing = set(Keyword.objects.filter(match).values_list('category_id', 'text'))
+
+            missing = [key for key, _ in batch if key not in existing]
+            if missing:
+                # Points for a deleted category have nowhere to go
+                live = set(
+                    Category.objects.filter(id__in={category_id for category_id, _ in missing})
+                    .values_list('id', flat=True)
+                )
+                Keyword.objects.bulk_create(
+                    [
+                        Keyword(category_id=category_id, text=text, popularity=0, curated=False)
+                        for category_id, text in missing if category_id in live
+                    ],
+                    ignore_conflicts=True,
+                )
+
+            increments = [
+                When(category_id=category_id, text=text, then=Value(n))
+                for (category_id, text), n in batch
+            ]
+            Keyword.objects.filter(match).update(
+                popularity=F('popularity') + Case(*increments, default=Value(0))
+            )
+            totals = list(Keyword.objects.filter(match).values_list('id', 'category_id', 'text', 'popularity'))
+        updated = {key: n for key, n in batch if key in existing}
+        created = [row for row in totals if row[1:3] not in existing]
+        record_keywords_created(len(created))
+        return updated, created, totals
+
+    def _requeue(self, pending):
+        with self._lock:
+            for key, n in pending.items():
+                if key in self._pending or len(self._pending) < self.max_keys:
+                    self._pending[key] += n
+
+    def _ensure_flusher(self):
+        # Threads do not survive fork(), so every worker process starts its own
+        if self._pid == os.getpid() or not self.flush_interval:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        thread = threading.Thread(target=self._run, name='popularity-flusher', daemon=True)
+        thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Popularity flusher failed')
+
+
+popularity_buffer = PopularityBuffer()
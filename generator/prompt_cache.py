@@ -0,0 +1,66 @@
+"""Size-bounded LRU cache of rendered prompt payloads.
+
+Template selection is deterministic for a given seed, so the prompts for
+(category, topic, seed) only change when the category's templates do. Keys
+include a digest of the compiled templates, which makes entries for edited
+templates unreachable however the edit was picked up; they age out like any
+other entry. Only requests that name a seed are cached: the others draw a
+random one from a large range, as before seeds existed.
+"""
+import json
+import random
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .metrics import record_cache
+
+def random_seed():
+    return random.getrandbits(32)
+
+
+def normalize_topic(topic):
+    return ' '.join(topic.split())
+
+
+class PromptCache:
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'PROMPT_CACHE_MAX_BYTES', 8 * 1024 * 1024)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache('prompts', entry is not None)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, prompts):
+        max_bytes = self.max_bytes
+        size = len(json.dumps(prompts))
+        if size > max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (prompts, size)
+            self._size += size
+            while self._size > max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+prompt_cache = PromptCache()
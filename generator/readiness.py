@@ -0,0 +1,91 @@
+"""Schema and seed readiness checks.
+
+The check runs once per worker at startup (see ``prompt_generator.wsgi`` and
+``prompt_generator.asgi``) and behind ``/readyz``, so request handlers only
+consult the cached result instead of probing the schema themselves. While
+the worker is not ready the check is retried at most every
+``RETRY_INTERVAL`` seconds.
+"""
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, connection, connections
+
+from .catalog import SITEMAP, bump_catalog_version, invalidate_categories
+from .models import Category, Keyword, PromptTemplate, QuestionTemplate, RelatedTerm
+
+logger = logging.getLogger(__name__)
+
+RETRY_INTERVAL = 5.0
+
+
+class Readiness:
+    def __init__(self):
+        self._status = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        return self._status or {'ready': False, 'checked': False}
+
+    def is_ready(self):
+        if self._status and self._status['ready']:
+            return True
+        if time.monotonic() - self._checked_at >= RETRY_INTERVAL:
+            self.check()
+        return self.status['ready']
+
+    def check(self):
+        """Verify the schema and seed default categories if the table is empty"""
+        with self._lock:
+            try:
+                status = self._check()
+            except DatabaseError as e:
+                logger.warning('Readiness check failed: %s', e)
+                status = {'ready': False, 'checked': True, 'error': str(e)}
+            self._status = status
+            self._checked_at = time.monotonic()
+            return status
+
+    def check_at_startup(self):
+        """Run check() in a short-lived thread
+
+        ASGI servers may import the application from inside their event loop,
+        where the synchronous ORM refuses to run. The thread also closes its
+        connection, so none is inherited by forked workers.
+        """
+        def run():
+            try:
+                self.check()
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=run, name='readiness-check')
+        thread.start()
+        thread.join()
+
+    def _check(self):
+        tables = set(connection.introspection.table_names())
+        required = [model._meta.db_table for model in (Category, Keyword, PromptTemplate, QuestionTemplate, RelatedTerm)]
+        missing = [table for table in required if table not in tables]
+        if missing:
+            return {'ready': False, 'checked': True, 'missing_tables': missing}
+
+        seeded = 0
+        if not Category.objects.exists():
+            Category.objects.bulk_create(
+                [Category(name=cat['name'], slug=cat['slug']) for cat in Category.get_default_categories()],
+                ignore_conflicts=True,
+            )
+            seeded = Category.objects.count()
+            # bulk_create sends no post_save, so do what category_saved would
+            invalidate_categories()
+            bump_catalog_version()
+            bump_catalog_version(SITEMAP)
+            logger.info('Seeded %d default categories', seeded)
+        return {'ready': True, 'checked': True, 'seeded_categories': seeded}
+
+
+readiness = Readiness()
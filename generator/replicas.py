@@ -0,0 +1,165 @@
+"""Routing of read-only views to the read replicas in DATABASE_REPLICA_URLS.
+
+Views wrapped in ``reads_from_replica`` read from a healthy replica, picked
+once per request; every other read and every write goes to the primary.
+Reads inside a transaction on the primary also stay there, so an inline
+popularity flush sees its own writes. Replicas are probed at most every
+``REPLICA_HEALTH_CHECK_INTERVAL`` seconds and skipped while unreachable or
+more than ``REPLICA_MAX_LAG`` seconds behind.
+
+After a client's write, ``ReplicaPinMiddleware`` sets a cookie that keeps its
+reads on the primary for ``REPLICA_PIN_SECONDS``, so it sees its own writes.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_pin'
+
+_request_state = ContextVar('generator_replica_state', default=None)
+
+# Seconds a PostgreSQL standby is behind; 0 when it has replayed all it received
+POSTGRES_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+class ReplicaHealth:
+    """Last probe result of each replica, refreshed when older than the interval"""
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def probe(alias):
+        """Return whether a replica answers and is within REPLICA_MAX_LAG"""
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(POSTGRES_LAG_SQL)
+                    lag = cursor.fetchone()[0] or 0
+                else:
+                    cursor.execute('SELECT 1')
+                    lag = 0
+        except DatabaseError as e:
+            logger.warning('Replica %s is unavailable: %s', alias, e)
+            connection.close()
+            return False
+        if lag > getattr(settings, 'REPLICA_MAX_LAG', 10):
+            logger.warning('Replica %s is %.1fs behind', alias, lag)
+            return False
+        return True
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 10)
+        healthy, checked_at = self._checked.get(alias, (None, 0.0))
+        if healthy is not None and time.monotonic() - checked_at < interval:
+            return healthy
+        # One thread probes while the others go on with the last result
+        if not self._lock.acquire(blocking=healthy is None):
+            return healthy
+        try:
+            healthy = self.probe(alias)
+            self._checked[alias] = (healthy, time.monotonic())
+            return healthy
+        finally:
+            self._lock.release()
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+class _RequestState:
+    __slots__ = ('alias', 'chosen')
+
+    def __init__(self):
+        self.alias = None
+        self.chosen = False
+
+    def replica(self):
+        # Chosen on the first read, which always runs in a sync context
+        if not self.chosen:
+            self.chosen = True
+            healthy = [alias for alias in replica_aliases() if replica_health.is_healthy(alias)]
+            self.alias = random.choice(healthy) if healthy else None
+        return self.alias
+
+
+def is_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def reads_from_replica(when=None):
+    """Let a view read from a replica, unless ``when`` says otherwise or the client is pinned"""
+    def use_replica(request):
+        return bool(replica_aliases()) and (when is None or when(request)) and not is_pinned(request)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            async def inner(request, *args, **kwargs):
+                if not use_replica(request):
+                    return await view(request, *args, **kwargs)
+                token = _request_state.set(_RequestState())
+                try:
+                    return await view(request, *args, **kwargs)
+                finally:
+                    _request_state.reset(token)
+        else:
+            def inner(request, *args, **kwargs):
+                if not use_replica(request):
+                    return view(request, *args, **kwargs)
+                token = _request_state.set(_RequestState())
+                try:
+                    return view(request, *args, **kwargs)
+                finally:
+                    _request_state.reset(token)
+        return wraps(view)(inner)
+    return decorator
+
+
+class ReplicaRouter:
+    """Database router sending the reads of replica-enabled views to a replica"""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication; local SQLite copies
+        # are made by copying the primary's file
+        return db not in replica_aliases()
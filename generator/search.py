@@ -0,0 +1,141 @@
+"""Database-side keyword search used when the in-process suggestion index is off.
+
+Suggestions are ranked in three groups, each ordered by popularity: keywords
+whose text contains the query, keywords with a related term containing it,
+and keywords whose text contains any single word of the query.
+
+The substring lookups are served by whatever the database offers:
+
+* PostgreSQL: GIN trigram indexes (pg_trgm) on ``UPPER(text)`` and on
+  ``RelatedTerm.term``, which the planner uses for the ``icontains`` and
+  ``contains`` lookups Django already generates.
+* SQLite: an FTS5 table with the trigram tokenizer, kept in sync with
+  ``generator_keyword`` by triggers. Note that Django rebuilds SQLite tables
+  for some schema changes, which drops their triggers; a migration that
+  rebuilds ``generator_keyword`` has to recreate them.
+
+Both are created by migration 0005 when the database supports them. Without
+them keyword text is matched with a plain ``LIKE '%query%'`` scan, and
+related terms only from their start, which the B-tree index on
+``RelatedTerm.term`` can serve; a substring of a related term is not found.
+"""
+import re
+from functools import reduce
+
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Keyword, RelatedTerm
+
+FTS_TABLE = 'generator_keyword_fts'
+TRGM_INDEX = 'generator_keyword_text_trgm'
+# FTS5 trigram queries need at least one full trigram
+FTS_MIN_LENGTH = 3
+
+
+class KeywordSearch:
+    """Plain ORM lookups, used on any database"""
+    name = 'like'
+
+    def text_contains(self, query):
+        return Q(text__icontains=query)
+
+    def related_contains(self, query):
+        """Keywords with a related term starting with the query"""
+        prefix = RelatedTerm.normalize(query)
+        if connection.vendor == 'sqlite':
+            # SQLite only uses an index for LIKE on NOCASE columns; terms are
+            # lower-cased, so a range over the BINARY index finds the prefix
+            return Q(related_terms__term__gte=prefix, related_terms__term__lt=prefix + '\U0010ffff')
+        # PostgreSQL serves LIKE 'prefix%' from the pattern_ops index Django adds
+        return Q(related_terms__term__startswith=prefix)
+
+    def search(self, category, query):
+        """Return the matching keywords of a category, best first"""
+        exact_keywords = Keyword.objects.filter(category=category).filter(
+            self.text_contains(query)
+        ).order_by('-popularity')
+
+        related_matches = Keyword.objects.filter(category=category).filter(
+            self.related_contains(query)
+        ).exclude(
+            id__in=exact_keywords.values('id')
+        ).distinct().order_by('-popularity')
+
+        # Partial word matches (e.g., "python code" should match "code")
+        words = re.findall(r'\w+', query)
+        partial_matches = Keyword.objects.filter(
+            category=category
+        ).exclude(
+            id__in=exact_keywords.values('id')
+        ).exclude(
+            id__in=related_matches.values('id')
+        ).filter(
+            reduce(lambda x, y: x | y, [self.text_contains(word) for word in words])
+        ).order_by('-popularity') if words else Keyword.objects.none()
+
+        unique_keywords = []
+        seen_ids = set()
+        for keyword in list(exact_keywords) + list(related_matches) + list(partial_matches):
+            if keyword.id not in seen_ids:
+                seen_ids.add(keyword.id)
+                unique_keywords.append(keyword)
+        return unique_keywords
+
+
+class TrigramSearch(KeywordSearch):
+    """PostgreSQL with pg_trgm; the ORM lookups are index-backed as they are"""
+    name = 'pg_trgm'
+
+    def related_contains(self, query):
+        return Q(related_terms__term__contains=query)
+
+
+class FTS5Search(KeywordSearch):
+    """SQLite FTS5 trigram table over keyword text and related keywords"""
+    name = 'fts5'
+
+    @staticmethod
+    def _match(column, query):
+        phrase = '"%s"' % query.replace('"', '""')
+        return Q(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [f'{column} : {phrase}'],
+        ))
+
+    def text_contains(self, query):
+        if len(query) < FTS_MIN_LENGTH:
+            return super().text_contains(query)
+        return self._match('text', query)
+
+    def related_contains(self, query):
+        if len(query) < FTS_MIN_LENGTH:
+            return super().related_contains(query)
+        return self._match('related_keywords', query)
+
+
+_backend = None
+
+
+def _detect():
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                if TRGM_INDEX in connection.introspection.get_constraints(cursor, Keyword._meta.db_table):
+                    return TrigramSearch()
+            elif connection.vendor == 'sqlite':
+                if FTS_TABLE in connection.introspection.table_names(cursor):
+                    return FTS5Search()
+    except DatabaseError:
+        # Not migrated yet; detect again on the next call
+        return None
+    return KeywordSearch()
+
+
+def keyword_search():
+    """Return the best search backend for the default database, detected once"""
+    global _backend
+    if _backend is None:
+        _backend = _detect()
+    return _backend or KeywordSearch()
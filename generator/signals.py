@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .catalog import SITEMAP, bump_catalog_version, invalidate_categories
+from .classifier import topic_classifier
+from .leaderboard import leaderboard
+from .models import Category, Keyword, PromptTemplate, QuestionTemplate
+from .slow_queries import record_slow_query
+from .suggestions import suggestion_index
+from .template_cache import template_cache
+from .timing import record_query
+
+# Sent after buffered popularity increments have been written with
+# bulk_create() and queryset.update(), which bypass post_save. ``deltas`` maps
+# the (category_id, text) of keywords that already existed to the number of
+# points added, ``created`` lists (id, category_id, text, popularity) for the
+# keywords inserted by the flush and ``totals`` does so for every written row.
+popularity_flushed = Signal()
+
+
+def invalidate_catalog_caches():
+    """Drop every derived cache after bulk writes that skip the model signals"""
+    invalidate_categories()
+    template_cache.invalidate()
+    suggestion_index.invalidate()
+    topic_classifier.invalidate()
+    leaderboard.invalidate()
+    leaderboard.bump_generation()
+    bump_catalog_version()
+    bump_catalog_version(SITEMAP)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Attribute query time to the request being timed, if any
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+    if settings.SLOW_QUERY_LOG_ENABLED and record_slow_query not in connection.execute_wrappers:
+        # Outermost, so the EXPLAIN it runs after a slow query is not timed
+        connection.execute_wrappers.insert(0, record_slow_query)
+
+
+@receiver(post_save, sender=Keyword)
+def keyword_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or 'related_keywords' in update_fields:
+        instance.sync_related_terms()
+    suggestion_index.keyword_saved(instance)
+    topic_classifier.keyword_saved(instance)
+    bump_catalog_version()
+    # New keywords from users' searches are not listed in the sitemap
+    if instance.curated or not created:
+        bump_catalog_version(SITEMAP)
+    leaderboard.offer(instance.id, instance.category_id, instance.text, instance.popularity)
+
+
+@receiver(post_delete, sender=Keyword)
+def keyword_deleted(sender, instance, **kwargs):
+    suggestion_index.keyword_deleted(instance)
+    topic_classifier.keyword_deleted(instance)
+    bump_catalog_version()
+    if instance.curated:
+        bump_catalog_version(SITEMAP)
+    leaderboard.discard(instance.id)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    invalidate_categories()
+    template_cache.invalidate()
+    bump_catalog_version()
+    bump_catalog_version(SITEMAP)
+    leaderboard.invalidate()
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    invalidate_categories()
+    template_cache.invalidate()
+    bump_catalog_version()
+    bump_catalog_version(SITEMAP)
+    leaderboard.invalidate()
+    suggestion_index.invalidate(instance.id)
+    topic_classifier.category_deleted(instance.id)
+
+
+@receiver(post_save, sender=PromptTemplate)
+@receiver(post_delete, sender=PromptTemplate)
+@receiver(post_save, sender=QuestionTemplate)
+@receiver(post_delete, sender=QuestionTemplate)
+def prompt_template_changed(sender, instance, **kwargs):
+    template_cache.invalidate()
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=PromptTemplate)
+def prompt_template_saved(sender, instance, **kwargs):
+    topic_classifier.template_saved(instance)
+
+
+@receiver(post_delete, sender=PromptTemplate)
+def prompt_template_deleted(sender, instance, **kwargs):
+    topic_classifier.template_deleted(instance)
+
+
+@receiver(popularity_flushed)
+def popularity_changed(sender, deltas, totals, created=(), **kwargs):
+    suggestion_index.add_popularity(deltas)
+    for keyword_id, category_id, text, popularity in created:
+        keyword = Keyword(id=keyword_id, category_id=category_id, text=text, popularity=popularity, curated=False)
+        suggestion_index.keyword_saved(keyword)
+        topic_classifier.keyword_saved(keyword)
+    for keyword_id, category_id, text, popularity in totals:
+        leaderboard.offer(keyword_id, category_id, text, popularity)
+    bump_catalog_version()
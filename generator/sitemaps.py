@@ -0,0 +1,137 @@
+"""Sitemap index and sitemaps generated from the catalog.
+
+The URLs are the home page, one per category and one per curated keyword
+(keywords created from users' searches are left out), in id order and split
+into sitemaps of at most ``SITEMAP_URLS_PER_FILE`` (50,000, the protocol's
+limit). Ordering by id keeps every URL in the same sitemap as keywords are
+added. The first keyword id of each sitemap is found once, in one pass over
+the ids, so each sitemap is a single ``id >= n LIMIT size`` query.
+
+Each document is written while iterating over its query, straight into a
+gzip stream, and cached compressed in the default cache together with an
+ETag. Entries are keyed on the ``SITEMAP`` catalog version, which only moves
+when the set of URLs changes, so repeated fetches do not touch the database.
+"""
+import gzip
+import hashlib
+import io
+import threading
+from urllib.parse import urlencode
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog import SITEMAP, get_catalog_version
+from .models import Category, Keyword
+
+MAX_URLS_PER_FILE = 50000
+CACHE_KEY = 'generator:sitemap:{version}:{base}:{name}'
+
+_build_lock = threading.RLock()
+
+
+def urls_per_file():
+    return min(getattr(settings, 'SITEMAP_URLS_PER_FILE', MAX_URLS_PER_FILE), MAX_URLS_PER_FILE)
+
+
+def _document(pieces):
+    """Return (gzip-compressed body, ETag) for a document written in pieces"""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as f:
+        for piece in pieces:
+            f.write(piece.encode())
+    body = buffer.getvalue()
+    return body, hashlib.sha256(body).hexdigest()[:32]
+
+
+def _cached(base, name, build):
+    """Return a cached value for the sitemap version, building it on a miss"""
+    key = CACHE_KEY.format(
+        version=get_catalog_version(SITEMAP), base=hashlib.sha1(base.encode()).hexdigest()[:12], name=name,
+    )
+    value = cache.get(key)
+    if value is None:
+        # One build at a time per worker; a crawler burst waits for it
+        with _build_lock:
+            value = cache.get(key)
+            if value is None:
+                value = build()
+                cache.set(key, value, getattr(settings, 'SITEMAP_CACHE_TIMEOUT', 3600))
+    return value
+
+
+def _keywords():
+    return Keyword.objects.filter(curated=True).order_by('id')
+
+
+def _layout():
+    """Return (number of fixed URLs, first keyword id of each sitemap or None)"""
+    def build():
+        size = urls_per_file()
+        fixed = 1 + Category.objects.count()
+        starts = {}
+        keywords = 0
+        for position, keyword_id in enumerate(_keywords().values_list('id', flat=True).iterator(chunk_size=5000)):
+            # A sitemap's keywords start at its first position past the fixed URLs
+            if position == 0 or (fixed + position) % size == 0:
+                starts[(fixed + position) // size] = keyword_id
+            keywords = position + 1
+        count = max(1, -(-(fixed + keywords) // size))
+        return fixed, [starts.get(number) for number in range(count)]
+    return _cached('', 'layout', build)
+
+
+def section_count():
+    return len(_layout()[1])
+
+
+def _fixed_locations(base):
+    yield f'{base}/'
+    for slug in Category.objects.order_by('id').values_list('slug', flat=True).iterator():
+        yield f'{base}/?{urlencode({"category": slug})}'
+
+
+def _locations(base, number):
+    """The URLs of sitemap ``number`` (from 1)"""
+    size = urls_per_file()
+    fixed, starts = _layout()
+    start, stop = (number - 1) * size, number * size
+    if start < fixed:
+        for position, location in enumerate(_fixed_locations(base)):
+            if position >= stop:
+                return
+            if position >= start:
+                yield location
+    first_id = starts[number - 1]
+    if first_id is None:
+        return
+    limit = stop - max(start, fixed)
+    keywords = _keywords().filter(id__gte=first_id).values_list('category__slug', 'text')[:limit]
+    for slug, text in keywords.iterator(chunk_size=2000):
+        yield f'{base}/?{urlencode({"category": slug, "topic": text})}'
+
+
+def index(base):
+    """(gzip-compressed body, ETag) of the sitemap index listing every sitemap"""
+    def build():
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for number in range(1, section_count() + 1):
+            yield f'  <sitemap><loc>{escape(f"{base}/sitemap-{number}.xml")}</loc></sitemap>\n'
+        yield '</sitemapindex>\n'
+    return _cached(base, 'index', lambda: _document(build()))
+
+
+def section(base, number):
+    """(gzip-compressed body, ETag) of sitemap ``number`` (from 1), or None past the last one"""
+    if number < 1 or number > section_count():
+        return None
+
+    def build():
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for location in _locations(base, number):
+            yield f'  <url><loc>{escape(location)}</loc></url>\n'
+        yield '</urlset>\n'
+    return _cached(base, f'section-{number}', lambda: _document(build()))
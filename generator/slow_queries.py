@@ -0,0 +1,113 @@
+"""Opt-in log of slow database queries.
+
+With ``SLOW_QUERY_LOG_ENABLED`` on, every connection runs its queries
+through ``record_slow_query`` (installed in ``generator.signals``). Queries
+taking at least ``SLOW_QUERY_THRESHOLD_MS`` are sampled at
+``SLOW_QUERY_SAMPLE_RATE`` and written as JSON lines to
+``SLOW_QUERY_LOG_PATH``. Every worker process appends to that file, so it
+is rotated externally (e.g. by logrotate) rather than by the workers; each
+one reopens the file once it has been moved. Each record has the SQL, its
+parameters, the view being served and the query plan from ``EXPLAIN``
+(``EXPLAIN QUERY PLAN`` on SQLite), which is left out of the request's
+query count and time. ``manage.py slow_queries`` summarizes the log.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+
+from django.conf import settings
+from django.db import transaction
+
+from .timing import current as current_timing, untimed
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_LENGTH = 10000
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+_local = threading.local()
+_handler_lock = threading.Lock()
+_file_logger = None
+
+
+def _log():
+    """The logger writing to the JSONL file, set up on first use"""
+    global _file_logger
+    if _file_logger is None:
+        with _handler_lock:
+            if _file_logger is None:
+                handler = WatchedFileHandler(settings.SLOW_QUERY_LOG_PATH, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                file_logger = logging.getLogger('generator.slow_queries.file')
+                file_logger.addHandler(handler)
+                file_logger.setLevel(logging.INFO)
+                file_logger.propagate = False
+                _file_logger = file_logger
+    return _file_logger
+
+
+def explain(connection, sql, params):
+    """Return the plan of a statement as a list of rows, or None"""
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor in ('postgresql', 'mysql'):
+        prefix = 'EXPLAIN '
+    else:
+        return None
+    # On PostgreSQL a failing statement aborts the whole transaction, so
+    # EXPLAIN runs in a savepoint there. SQLite cannot open one while the
+    # slow statement's rows are still being read, and doesn't need it.
+    if connection.vendor == 'postgresql' and connection.in_atomic_block:
+        guard = transaction.atomic(using=connection.alias)
+    else:
+        guard = nullcontext()
+    _local.explaining = True
+    try:
+        with untimed(), guard:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        _local.explaining = False
+
+
+def record_slow_query(execute, sql, params, many, context):
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms >= getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100) and (
+        random.random() < getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0)
+    ):
+        try:
+            _write(context['connection'], sql, params, many, elapsed_ms)
+        except Exception:
+            logger.exception('Could not record slow query')
+    return result
+
+
+def _write(connection, sql, params, many, elapsed_ms):
+    timing = current_timing()
+    plan = None
+    if not many and sql.lstrip().upper().startswith(EXPLAINABLE):
+        plan = explain(connection, sql, params)
+    _log().info(json.dumps({
+        'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'duration_ms': round(elapsed_ms, 3),
+        'database': connection.alias,
+        'vendor': connection.vendor,
+        'view': timing.view_name if timing else None,
+        'sql': sql[:MAX_SQL_LENGTH],
+        # executemany() parameter lists can be huge; keep the first few rows
+        'params': list(params)[:10] if many and params is not None else params,
+        'many': many,
+        'plan': plan,
+    }, default=str))
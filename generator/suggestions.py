@@ -0,0 +1,337 @@
+"""In-process suggestion index for the keyword autocomplete API.
+
+Each category gets a trigram index over the lower-cased keyword text and its
+related terms. Substring lookups intersect the posting lists of the query's
+trigrams and only verify the handful of surviving candidates, so a lookup
+never walks the whole category. Indexes are built lazily on first use, one
+category at a time without blocking lookups in the others, and kept up to
+date by the signal handlers in ``generator.signals``.
+
+When nothing contains the query, ``fuzzy_search`` falls back to matching its
+words within a small edit distance (see ``generator.fuzzy``), so a typo finds
+the keyword it was meant to be.
+"""
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .fuzzy import FuzzyVocabulary, words
+from .metrics import record_cache
+from .models import Keyword, RelatedTerm
+
+GRAM_SIZE = 3
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class _Entry:
+    __slots__ = ('text', 'lower', 'popularity', 'related')
+
+    def __init__(self, text, popularity, related):
+        self.text = text
+        self.lower = text.lower()
+        self.popularity = popularity
+        self.related = related
+
+
+class CategoryIndex:
+    """Trigram index over the keywords of a single category"""
+
+    def __init__(self):
+        self.entries = {}
+        self.built_at = time.monotonic()
+        self._by_text = defaultdict(set)
+        self._text_grams = defaultdict(set)
+        self._related_grams = defaultdict(set)
+        # Strings shorter than a trigram have no postings and are checked directly
+        self._short_text = set()
+        self._short_related = set()
+        self._vocabulary = FuzzyVocabulary()
+
+    @staticmethod
+    def _words(entry):
+        vocabulary = set(words(entry.lower))
+        for term in entry.related:
+            vocabulary.update(words(term))
+        return vocabulary
+
+    def add(self, keyword_id, text, popularity, related):
+        """Insert or replace a keyword; ``related`` is an iterable of terms"""
+        if keyword_id in self.entries:
+            self.remove(keyword_id)
+        related = tuple(term.lower() for term in related if term)
+        entry = _Entry(text, popularity, related)
+        self.entries[keyword_id] = entry
+        self._by_text[text].add(keyword_id)
+
+        text_grams = _grams(entry.lower)
+        for gram in text_grams:
+            self._text_grams[gram].add(keyword_id)
+        if len(entry.lower) < GRAM_SIZE:
+            self._short_text.add(keyword_id)
+
+        for term in related:
+            for gram in _grams(term):
+                self._related_grams[gram].add(keyword_id)
+            if len(term) < GRAM_SIZE:
+                self._short_related.add(keyword_id)
+
+        self._vocabulary.add(keyword_id, self._words(entry))
+
+    def remove(self, keyword_id):
+        entry = self.entries.pop(keyword_id, None)
+        if entry is None:
+            return
+        self._discard(self._by_text, (entry.text,), keyword_id)
+        self._discard(self._text_grams, _grams(entry.lower), keyword_id)
+        related_grams = set()
+        for term in entry.related:
+            related_grams |= _grams(term)
+        self._discard(self._related_grams, related_grams, keyword_id)
+        self._short_text.discard(keyword_id)
+        self._short_related.discard(keyword_id)
+        self._vocabulary.remove(keyword_id, self._words(entry))
+
+    def add_popularity(self, text, n):
+        for keyword_id in self._by_text.get(text, ()):
+            self.entries[keyword_id].popularity += n
+
+    @staticmethod
+    def _discard(postings, grams, keyword_id):
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is None:
+                continue
+            ids.discard(keyword_id)
+            if not ids:
+                del postings[gram]
+
+    def _candidates(self, postings, short_ids, needle):
+        """Return a superset of the ids whose indexed strings contain ``needle``"""
+        if len(needle) >= GRAM_SIZE:
+            sets = [postings.get(gram) for gram in _grams(needle)]
+            if not all(sets):
+                return set()
+            sets.sort(key=len)
+            return sets[0].intersection(*sets[1:])
+        # A needle shorter than a trigram is contained in some trigram of
+        # every string long enough to have one
+        candidates = set(short_ids)
+        for gram, ids in postings.items():
+            if needle in gram:
+                candidates |= ids
+        return candidates
+
+    def _text_matches(self, needle):
+        return {
+            keyword_id for keyword_id in self._candidates(self._text_grams, self._short_text, needle)
+            if needle in self.entries[keyword_id].lower
+        }
+
+    def _related_matches(self, needle):
+        return {
+            keyword_id for keyword_id in self._candidates(self._related_grams, self._short_related, needle)
+            if any(needle in term for term in self.entries[keyword_id].related)
+        }
+
+    def _most_popular(self, ids, limit):
+        return heapq.nlargest(limit, ids, key=lambda keyword_id: self.entries[keyword_id].popularity)
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` (text, popularity) pairs matching ``query``
+
+        Direct matches on the keyword text come first, then matches on related
+        terms, then keywords containing any single word of the query. Each
+        group is ordered by popularity.
+        """
+        query = query.lower()
+        ranked = []
+
+        exact = self._text_matches(query)
+        ranked.extend(self._most_popular(exact, limit))
+
+        seen = set(exact)
+        if len(ranked) < limit:
+            related = self._related_matches(query) - seen
+            ranked.extend(self._most_popular(related, limit - len(ranked)))
+            seen |= related
+
+        if len(ranked) < limit:
+            partial = set()
+            # Words shorter than a trigram would have to scan every posting
+            for word in set(re.findall(r'\w+', query)):
+                if len(word) >= GRAM_SIZE:
+                    partial |= self._text_matches(word)
+            partial -= seen
+            ranked.extend(self._most_popular(partial, limit - len(ranked)))
+
+        return [(self.entries[keyword_id].text, self.entries[keyword_id].popularity) for keyword_id in ranked]
+
+    def fuzzy_search(self, query, limit=10, budget=0.005):
+        """Return up to ``limit`` (text, popularity) pairs whose words approximately match ``query``
+
+        Keywords matching more of the query's words rank first, then those
+        with fewer edits, then the more popular. Lookups stop after ``budget``
+        seconds and rank whatever was found by then.
+        """
+        scores = self._vocabulary.match(query, time.perf_counter() + budget)
+        ranked = heapq.nsmallest(
+            limit,
+            scores,
+            key=lambda keyword_id: (-scores[keyword_id][0], scores[keyword_id][1], -self.entries[keyword_id].popularity),
+        )
+        return [(self.entries[keyword_id].text, self.entries[keyword_id].popularity) for keyword_id in ranked]
+
+
+class SuggestionIndex:
+    """Registry of per-category indexes, built lazily from the database"""
+
+    def __init__(self):
+        self._categories = {}
+        self._lock = threading.RLock()
+        # One lock per category serializes its builds without holding _lock
+        self._build_locks = {}
+        self._generation = 0
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'SUGGESTION_INDEX_ENABLED', True)
+
+    def _is_stale(self, index):
+        max_age = getattr(settings, 'SUGGESTION_INDEX_MAX_AGE', 300)
+        return bool(max_age) and time.monotonic() - index.built_at > max_age
+
+    def _loaded(self, category_id):
+        index = self._categories.get(category_id)
+        if index is not None and not self._is_stale(index):
+            return index
+        return None
+
+    def _record(self, index):
+        record_cache('suggestions', index is not None)
+        return index
+
+    @staticmethod
+    def _related_rows(category_id):
+        return RelatedTerm.objects.filter(keyword__category_id=category_id).values_list('keyword_id', 'term')
+
+    @staticmethod
+    def _keyword_rows(category_id):
+        return Keyword.objects.filter(category_id=category_id).values_list('id', 'text', 'popularity')
+
+    @staticmethod
+    def _build(related_rows, keyword_rows):
+        index = CategoryIndex()
+        related = defaultdict(list)
+        for keyword_id, term in related_rows:
+            related[keyword_id].append(term)
+        for keyword_id, text, popularity in keyword_rows:
+            index.add(keyword_id, text, popularity, related.pop(keyword_id, ()))
+        return index
+
+    def _load(self, category_id):
+        with self._lock:
+            build_lock = self._build_locks.setdefault(category_id, threading.Lock())
+        with build_lock:
+            index = self._loaded(category_id)
+            if index is not None:
+                return index
+            generation = self._generation
+            index = self._build(
+                self._related_rows(category_id).iterator(chunk_size=2000),
+                self._keyword_rows(category_id).iterator(chunk_size=2000),
+            )
+            with self._lock:
+                # Don't store an index that was invalidated while it was building
+                if generation == self._generation:
+                    self._categories[category_id] = index
+            return index
+
+    def for_category(self, category_id):
+        index = self._record(self._loaded(category_id))
+        if index is not None:
+            return index
+        return self._load(category_id)
+
+    async def afor_category(self, category_id):
+        """Async variant of for_category(); a build runs in a worker thread"""
+        index = self._record(self._loaded(category_id))
+        if index is not None:
+            return index
+        return await sync_to_async(self._load)(category_id)
+
+    @property
+    def fuzzy_budget(self):
+        return getattr(settings, 'FUZZY_MATCH_TIME_BUDGET', 0.005)
+
+    def _search(self, index, query, limit):
+        with self._lock:
+            return index.search(query, limit)
+
+    def _fuzzy_search(self, index, query, limit):
+        with self._lock:
+            return index.fuzzy_search(query, limit, self.fuzzy_budget)
+
+    def search(self, category_id, query, limit=10):
+        return self._search(self.for_category(category_id), query, limit)
+
+    async def asearch(self, category_id, query, limit=10):
+        """Async variant of search(); the lookup runs in a worker thread"""
+        index = await self.afor_category(category_id)
+        return await sync_to_async(self._search, thread_sensitive=False)(index, query, limit)
+
+    def fuzzy_search(self, category_id, query, limit=10):
+        """Typo-tolerant fallback for queries that search() finds nothing for"""
+        if not self.fuzzy_budget:
+            return []
+        return self._fuzzy_search(self.for_category(category_id), query, limit)
+
+    async def afuzzy_search(self, category_id, query, limit=10):
+        """Async variant of fuzzy_search(); the lookup runs in a worker thread"""
+        if not self.fuzzy_budget:
+            return []
+        index = await self.afor_category(category_id)
+        return await sync_to_async(self._fuzzy_search, thread_sensitive=False)(index, query, limit)
+
+    def keyword_saved(self, keyword):
+        """Apply a created or updated keyword to the loaded indexes"""
+        with self._lock:
+            for category_id, index in self._categories.items():
+                if category_id != keyword.category_id:
+                    index.remove(keyword.id)
+            index = self._categories.get(keyword.category_id)
+            if index is not None:
+                index.add(keyword.id, keyword.text, keyword.popularity, keyword.get_related_keywords_list())
+
+    def keyword_deleted(self, keyword):
+        with self._lock:
+            index = self._categories.get(keyword.category_id)
+            if index is not None:
+                index.remove(keyword.id)
+
+    def add_popularity(self, deltas):
+        """Apply popularity increments keyed by (category_id, text)"""
+        with self._lock:
+            for (category_id, text), n in deltas.items():
+                index = self._categories.get(category_id)
+                if index is not None:
+                    index.add_popularity(text, n)
+
+    def invalidate(self, category_id=None):
+        """Drop one category's index, or all of them, so they rebuild on next use"""
+        with self._lock:
+            self._generation += 1
+            if category_id is None:
+                self._categories.clear()
+            else:
+                self._categories.pop(category_id, None)
+
+
+suggestion_index = SuggestionIndex()
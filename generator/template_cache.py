@@ -0,0 +1,172 @@
+"""Per-process cache of compiled prompt templates.
+
+Each category's templates are loaded once and pre-split on the ``{topic}``
+placeholder, so rendering a prompt is a single ``str.join``. Question
+templates are compiled the same way, all categories at once. Entries carry
+the cache version they were loaded under; the signal handlers in
+``generator.signals`` bump the version whenever a Category, PromptTemplate
+or QuestionTemplate changes, and entries older than
+``CATALOG_CACHE_TIMEOUT`` are reloaded to pick up changes made by other
+workers.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import record_cache
+from .models import Category, PromptTemplate, QuestionTemplate
+
+PLACEHOLDER = '{topic}'
+
+
+class CompiledTemplate:
+    __slots__ = ('id', 'name', 'literals')
+
+    def __init__(self, template_id, name, text):
+        self.id = template_id
+        self.name = name
+        self.literals = tuple(text.split(PLACEHOLDER))
+
+    def render(self, topic):
+        return topic.join(self.literals)
+
+
+class CategoryTemplates:
+    __slots__ = ('category_id', 'name', 'slug', 'templates', 'version', 'digest', 'loaded_at')
+
+    def __init__(self, category, templates, version):
+        self.category_id = category.id
+        self.name = category.name
+        self.slug = category.slug
+        self.templates = templates
+        self.version = version
+        # Identifies the templates' content, unlike the version, which only
+        # moves on invalidation in this process
+        self.digest = hashlib.sha1(
+            repr([(t.id, t.name, t.literals) for t in templates]).encode()
+        ).hexdigest()
+        self.loaded_at = time.monotonic()
+
+
+class QuestionTemplates:
+    __slots__ = ('by_category', 'version', 'loaded_at')
+
+    def __init__(self, rows, version):
+        by_category = {}
+        for template_id, name, text, category_id in rows:
+            by_category.setdefault(category_id, []).append(CompiledTemplate(template_id, name, text))
+        self.by_category = {category_id: tuple(templates) for category_id, templates in by_category.items()}
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def for_category(self, category_id):
+        """The category's own question templates, or the shared ones if it has none"""
+        return self.by_category.get(category_id) or self.by_category.get(None, ())
+
+
+DEFAULT_QUESTION_TEMPLATES = QuestionTemplates(
+    ((None, t['name'], t['template'], None) for t in QuestionTemplate.get_default_templates()), None,
+)
+
+
+class TemplateCache:
+    def __init__(self):
+        self._entries = {}
+        self._questions = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _is_current(self, entry):
+        max_age = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+        if entry.version != self._version:
+            return False
+        return not max_age or time.monotonic() - entry.loaded_at <= max_age
+
+    def _cached(self, slug):
+        entry = self._entries.get(slug)
+        if entry is not None and self._is_current(entry):
+            record_cache('templates', True)
+            return entry
+        record_cache('templates', False)
+        return None
+
+    @staticmethod
+    def _template_rows(category):
+        return PromptTemplate.objects.filter(category=category).order_by('id').values_list('id', 'name', 'template')
+
+    def _store(self, category, rows, version):
+        templates = tuple(CompiledTemplate(template_id, name, text) for template_id, name, text in rows)
+        entry = CategoryTemplates(category, templates, version)
+        with self._lock:
+            # Don't store an entry that was invalidated while it was loading
+            if version == self._version:
+                self._entries[category.slug] = entry
+        return entry
+
+    def get(self, slug):
+        """Return the compiled templates for a category slug
+
+        Raises Category.DoesNotExist for unknown slugs.
+        """
+        entry = self._cached(slug)
+        if entry is not None:
+            return entry
+        version = self._version
+        category = Category.objects.get(slug=slug)
+        return self._store(category, self._template_rows(category), version)
+
+    async def aget(self, slug):
+        """Async variant of get() for the ASGI views"""
+        entry = self._cached(slug)
+        if entry is not None:
+            return entry
+        version = self._version
+        category = await Category.objects.aget(slug=slug)
+        rows = [row async for row in self._template_rows(category)]
+        return self._store(category, rows, version)
+
+    def _cached_questions(self):
+        entry = self._questions
+        if entry is not None and self._is_current(entry):
+            record_cache('question_templates', True)
+            return entry
+        record_cache('question_templates', False)
+        return None
+
+    @staticmethod
+    def _question_rows():
+        return QuestionTemplate.objects.order_by('order', 'id').values_list('id', 'name', 'template', 'category_id')
+
+    def _store_questions(self, rows, version):
+        entry = QuestionTemplates(rows, version)
+        with self._lock:
+            if version == self._version:
+                self._questions = entry
+        return entry
+
+    def questions(self):
+        """Return the compiled question templates of every category"""
+        entry = self._cached_questions()
+        if entry is not None:
+            return entry
+        version = self._version
+        return self._store_questions(self._question_rows(), version)
+
+    async def aquestions(self):
+        """Async variant of questions() for the ASGI views"""
+        entry = self._cached_questions()
+        if entry is not None:
+            return entry
+        version = self._version
+        return self._store_questions([row async for row in self._question_rows()], version)
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._questions = None
+
+
+template_cache = TemplateCache()
@@ -1,3 +1,1146 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, DataError, OperationalError
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from prompt_generator.root_files import RootFile
+
+from . import async_views, catalog, slow_queries, throttle, views
+from .catalog import get_categories
+from .classifier import TopicModel, topic_classifier
+from .fuzzy import FuzzyVocabulary, osa_distance
+from .leaderboard import Board, leaderboard
+from .management.commands import benchmark
+from .management.commands.slow_queries import fingerprint
+from .middleware import ReplicaPinMiddleware
+from .models import Category, Keyword, PromptTemplate, QuestionTemplate
+from .popularity import PopularityBuffer
+from .prompt_cache import PromptCache, prompt_cache
+from .readiness import Readiness, readiness
+from .replicas import PIN_COOKIE, ReplicaRouter, reads_from_replica, replica_health
+from .search import FTS5Search, KeywordSearch, keyword_search
+from .signals import invalidate_catalog_caches, popularity_flushed
+from .suggestions import CategoryIndex, suggestion_index
+from .template_cache import template_cache
+from .throttle import MemoryBackend, SQLiteBackend
+from .warmup import open_connections, warm_up
+
+
+def reset_caches():
+    """Drop the per-process caches, which outlive each test's transaction"""
+    cache.clear()
+    catalog._versions.clear()
+    invalidate_catalog_caches()
+
+
+@override_settings(CATALOG_VERSION_TTL=0, ADMISSION_CONTROL_ENABLED=False)
+class CatalogETagTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.category = Category.objects.create(name='Writing', slug='writing')
+        Keyword.objects.create(category=self.category, text='Essay', popularity=5)
+
+    def test_unchanged_catalog_answers_304(self):
+        response = self.client.get('/api/trending/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get('/api/trending/', secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/api/trending/', secure=True)['ETag']
+
+        Keyword.objects.create(category=self.category, text='Poem', popularity=50)
+
+        response = self.client.get('/api/trending/', secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Poem', [topic['text'] for topic in response.json()['topics']])
+
+    def test_etag_depends_on_query(self):
+        first = self.client.get('/api/trending/', secure=True)['ETag']
+        second = self.client.get('/api/trending/?category=writing', secure=True)['ETag']
+        self.assertNotEqual(first, second)
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, POPULARITY_FLUSH_INTERVAL=0)
+class BatchPromptTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        category = Category.objects.create(name='Writing', slug='writing')
+        PromptTemplate.objects.create(name='Outline', template='Outline an essay on {topic}', category=category)
+
+    def post_ndjson(self, lines):
+        response = self.client.post(
+            '/api/generate-prompts/batch/', '\n'.join(lines), content_type='application/x-ndjson', secure=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_bad_items_get_their_own_errors(self):
+        results = self.post_ndjson([
+            json.dumps({'topic': 'climate', 'category': 'writing', 'seed': 1}),
+            '{not json',
+            json.dumps(['climate', 'writing']),
+            json.dumps({'topic': 42, 'category': 'writing'}),
+            json.dumps({'topic': 'climate', 'category': ['writing']}),
+            json.dumps({'topic': 'climate', 'category': 'nope'}),
+            json.dumps({'topic': 'climate', 'category': 'writing', 'seed': {'a': 1}}),
+        ])
+
+        self.assertEqual([result['index'] for result in results], list(range(7)))
+        self.assertEqual(results[0]['prompts'][0]['generatedContent'], 'Outline an essay on climate')
+        self.assertEqual([result.get('error') for result in results[1:]], [
+            'Invalid JSON',
+            'Both topic and category are required',
+            'Topic and category must be strings',
+            'Topic and category must be strings',
+            'Category not found',
+            'Invalid seed',
+        ])
+
+    @override_settings(BATCH_MAX_ITEMS=2)
+    def test_items_past_the_limit_are_not_rendered(self):
+        item = json.dumps({'topic': 'climate', 'category': 'writing'})
+        results = self.post_ndjson([item] * 5)
+        self.assertEqual(len(results), 3)
+        self.assertIn('prompts', results[1])
+        self.assertEqual(results[2], {'index': 2, 'error': 'At most 2 items per batch'})
+        self.assertEqual(Keyword.objects.get(text='climate').popularity, 2)
+
+        response = self.client.post(
+            '/api/generate-prompts/batch/', json.dumps([json.loads(item)] * 3), content_type='application/json',
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_json_body_must_be_a_list(self):
+        response = self.client.post(
+            '/api/generate-prompts/batch/', json.dumps({'items': 'climate'}), content_type='application/json',
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(POPULARITY_FLUSH_INTERVAL=3600, POPULARITY_BUFFER_SIZE=10000)
+class PopularityBufferTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        # No background flusher; the tests flush explicitly
+        patcher = mock.patch.object(PopularityBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = PopularityBuffer()
+        self.category = Category.objects.create(name='Writing', slug='writing')
+
+    def test_increments_merge_into_existing_keyword(self):
+        keyword = Keyword.objects.create(category=self.category, text='Essay', popularity=5)
+        self.buffer.record(self.category.id, 'Essay')
+        self.buffer.record(self.category.id, 'Essay', 2)
+
+        keyword.refresh_from_db()
+        self.assertEqual(keyword.popularity, 5)
+        self.assertEqual(self.buffer.popularity(self.category.id, 'Essay'), 8)
+
+        self.buffer.flush()
+        keyword.refresh_from_db()
+        self.assertEqual(keyword.popularity, 8)
+        self.assertEqual(self.buffer.popularity(self.category.id, 'Essay'), 8)
+
+    def test_flush_creates_missing_keyword_once(self):
+        self.buffer.record(self.category.id, 'Haiku')
+        self.buffer.record(self.category.id, 'Haiku')
+        self.buffer.flush()
+        self.buffer.record(self.category.id, 'Haiku')
+        self.buffer.flush()
+
+        keyword = Keyword.objects.get(category=self.category, text='Haiku')
+        self.assertEqual(keyword.popularity, 3)
+        self.assertFalse(keyword.curated)
+
+    def test_flush_reports_created_and_updated_keywords(self):
+        Keyword.objects.create(category=self.category, text='Essay', popularity=5)
+        sent = []
+
+        def receiver(sender, **kwargs):
+            sent.append(kwargs)
+
+        popularity_flushed.connect(receiver)
+        self.addCleanup(popularity_flushed.disconnect, receiver)
+        self.buffer.record(self.category.id, 'Essay', 2)
+        self.buffer.record(self.category.id, 'Haiku')
+        self.buffer.flush()
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(sent[0]['deltas'], {(self.category.id, 'Essay'): 2})
+        self.assertEqual(
+            [row[1:] for row in sent[0]['created']], [(self.category.id, 'Haiku', 1)],
+        )
+        self.assertEqual(sorted(row[3] for row in sent[0]['totals']), [1, 7])
+
+    def test_long_texts_are_cut_to_the_column_length(self):
+        self.buffer.record(self.category.id, 'x' * 150)
+        self.assertEqual(self.buffer.popularity(self.category.id, 'x' * 150), 1)
+        self.buffer.flush()
+        self.assertTrue(Keyword.objects.filter(category=self.category, text='x' * 100).exists())
+
+    def test_points_for_a_deleted_category_are_dropped(self):
+        gone = Category.objects.create(name='Gone', slug='gone')
+        self.buffer.record(gone.id, 'Orphan')
+        gone.delete()
+        self.buffer.record(self.category.id, 'Essay')
+        self.buffer.flush()
+
+        self.assertTrue(Keyword.objects.filter(category=self.category, text='Essay').exists())
+        self.assertFalse(Keyword.objects.filter(text='Orphan').exists())
+        self.assertEqual(self.buffer.pending(gone.id, 'Orphan'), 0)
+
+    def test_rejected_key_does_not_hold_back_the_others(self):
+        write = self.buffer._write
+
+        def reject_poison(batch):
+            if any(text == 'Poison' for (_, text), _ in batch):
+                raise DataError('value too long')
+            return write(batch)
+
+        self.buffer.record(self.category.id, 'Poison')
+        self.buffer.record(self.category.id, 'Essay')
+        with mock.patch.object(self.buffer, '_write', side_effect=reject_poison), \
+                self.assertLogs('generator.popularity', 'ERROR'):
+            self.buffer.flush()
+
+        self.assertEqual(Keyword.objects.get(category=self.category, text='Essay').popularity, 1)
+        self.assertEqual(self.buffer.pending(self.category.id, 'Poison'), 0)
+
+    def test_unreachable_database_keeps_the_points(self):
+        self.buffer.record(self.category.id, 'Essay', 2)
+        with mock.patch.object(self.buffer, '_write', side_effect=OperationalError('server closed')), \
+                self.assertLogs('generator.popularity', 'ERROR'):
+            self.buffer.flush()
+        self.assertEqual(self.buffer.pending(self.category.id, 'Essay'), 2)
+
+        self.buffer.flush()
+        self.assertEqual(Keyword.objects.get(category=self.category, text='Essay').popularity, 2)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_admits_burst_then_asks_to_wait(self):
+        backend = MemoryBackend()
+        buckets = [('client', 1, 3)]
+
+        self.assertEqual([backend.take(buckets) for _ in range(3)], [0, 0, 0])
+        retry_after = backend.take(buckets)
+        self.assertGreater(retry_after, 0)
+        self.assertLessEqual(retry_after, 1)
+
+    def test_rejected_request_takes_no_token(self):
+        backend = MemoryBackend()
+        self.assertEqual(backend.take([('client', 1, 1), ('global', 1, 5)]), 0)
+        self.assertGreater(backend.take([('client', 1, 1), ('global', 1, 5)]), 0)
+        # The global bucket only paid for the admitted request
+        self.assertEqual([backend.take([('global', 1, 5)]) for _ in range(4)], [0, 0, 0, 0])
+
+    def test_locked_sqlite_file_falls_back_to_memory_buckets(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        backend = SQLiteBackend(os.path.join(directory.name, 'buckets.sqlite3'))
+        backend.TIMEOUT = 0.01
+        backend.take([('warmup', 1, 1)])
+
+        other = sqlite3.connect(backend.path, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+        self.addCleanup(other.execute, 'ROLLBACK')
+        with self.assertLogs('generator.throttle', 'WARNING'):
+            results = [backend.take([('client', 1, 2)]) for _ in range(3)]
+        self.assertEqual(results[:2], [0, 0])
+        self.assertGreater(results[2], 0)
+
+
+@override_settings(
+    ADMISSION_CONTROL_ENABLED=True,
+    ADMISSION_CONTROL_BACKEND='memory',
+    ADMISSION_CONTROL_RATES={'trending_topics': {'client': (0.01, 2)}},
+)
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        throttle._backend = None
+        self.addCleanup(setattr, throttle, '_backend', None)
+
+    def test_requests_over_the_burst_get_429(self):
+        statuses = [self.client.get('/api/trending/', secure=True).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+        response = self.client.get('/api/trending/', secure=True)
+        self.assertEqual(int(response['Retry-After']), 100)
+        # Other clients are limited separately
+        response = self.client.get('/api/trending/', secure=True, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=15)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        patcher = mock.patch.object(replica_health, 'is_healthy', return_value=True)
+        self.is_healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, request, when=None):
+        view = reads_from_replica(when)(lambda request: self.router.db_for_read(Keyword))
+        return view(request)
+
+    def test_wrapped_views_read_from_a_replica(self):
+        self.assertEqual(self.route(self.factory.get('/')), 'replica1')
+        self.assertEqual(self.router.db_for_write(Keyword), DEFAULT_DB_ALIAS)
+
+    def test_other_reads_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Keyword), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.route(self.factory.get('/'), when=lambda request: False), DEFAULT_DB_ALIAS)
+
+    def test_unhealthy_replica_is_skipped(self):
+        self.is_healthy.return_value = False
+        self.assertEqual(self.route(self.factory.get('/')), DEFAULT_DB_ALIAS)
+
+    def test_pinned_client_reads_from_the_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = str(time.time() + 10)
+        self.assertEqual(self.route(request), DEFAULT_DB_ALIAS)
+
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.route(request), 'replica1')
+
+    def test_successful_writes_pin_the_client(self):
+        middleware = ReplicaPinMiddleware(lambda request: HttpResponse())
+        response = middleware(self.factory.post('/'))
+        self.assertAlmostEqual(float(response.cookies[PIN_COOKIE].value), time.time() + 15, delta=5)
+
+        self.assertNotIn(PIN_COOKIE, middleware(self.factory.get('/')).cookies)
+        failed = ReplicaPinMiddleware(lambda request: HttpResponse(status=400))(self.factory.post('/'))
+        self.assertNotIn(PIN_COOKIE, failed.cookies)
+
+
+@override_settings(
+    CATALOG_VERSION_TTL=0,
+    ADMISSION_CONTROL_ENABLED=False,
+    SITEMAP_URLS_PER_FILE=3,
+    SITEMAP_BASE_URL='https://example.com',
+)
+class SitemapTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.category = Category.objects.create(name='Writing', slug='writing')
+        for text in ('Essay', 'Poem', 'Haiku'):
+            Keyword.objects.create(category=self.category, text=text)
+        Keyword.objects.create(category=self.category, text='Searched', curated=False)
+
+    def get(self, path, **headers):
+        response = self.client.get(path, secure=True, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_index_lists_each_sitemap(self):
+        body = self.get('/sitemap.xml').content.decode()
+        # Home page, one category and three curated keywords
+        self.assertEqual(body.count('<sitemap>'), 2)
+        self.assertIn('<loc>https://example.com/sitemap-1.xml</loc>', body)
+        self.assertIn('<loc>https://example.com/sitemap-2.xml</loc>', body)
+        self.assertEqual(self.client.get('/sitemap-3.xml', secure=True).status_code, 404)
+
+    def test_sections_hold_curated_keywords_in_id_order(self):
+        first = self.get('/sitemap-1.xml').content.decode()
+        second = self.get('/sitemap-2.xml').content.decode()
+        self.assertEqual(first.count('<url>'), 3)
+        self.assertIn('<loc>https://example.com/</loc>', first)
+        self.assertIn('topic=Essay', first)
+        self.assertEqual(second.count('<url>'), 2)
+        self.assertIn('topic=Haiku', second)
+        self.assertNotIn('Searched', first + second)
+
+    def test_popularity_does_not_change_the_etag(self):
+        etag = self.get('/sitemap.xml')['ETag']
+        Keyword.objects.filter(text='Essay').update(popularity=10)
+        response = self.client.get('/sitemap.xml', secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_curated_keyword_changes_the_etag(self):
+        etag = self.get('/sitemap-2.xml')['ETag']
+        Keyword.objects.create(category=self.category, text='Sonnet')
+        response = self.get('/sitemap-2.xml', HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('topic=Sonnet', response.content.decode())
+
+    def test_gzip_is_a_separate_representation(self):
+        plain = self.get('/sitemap-1.xml')
+        compressed = self.get('/sitemap-1.xml', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+
+
+class TopicModelTests(SimpleTestCase):
+    def setUp(self):
+        self.model = TopicModel()
+        self.model.add(('keyword', 1), 10, [('climate change essay', 2.0)])
+        self.model.add(('keyword', 2), 10, [('renewable energy', 2.0)])
+        self.model.add(('keyword', 3), 20, [('python code review', 2.0)])
+
+    def test_classify_picks_the_category_with_the_topic_words(self):
+        self.assertEqual(self.model.classify('the future of renewable energy'), 10)
+        self.assertEqual(self.model.classify('review my python'), 20)
+        self.assertIsNone(self.model.classify('unheard of words'))
+
+    def test_replacing_a_document_moves_it(self):
+        self.model.add(('keyword', 2), 20, [('renewable energy', 2.0)])
+        self.assertEqual(self.model.classify('renewable energy'), 20)
+
+    def test_remove_forgets_the_document(self):
+        self.model.remove(('keyword', 3))
+        self.assertIsNone(self.model.classify('python'))
+        self.assertNotIn(20, self.model._totals)
+        # Removing twice is harmless
+        self.model.remove(('keyword', 3))
+
+    def test_remove_category_drops_its_documents(self):
+        self.model.remove_category(10)
+        self.assertIsNone(self.model.classify('renewable energy'))
+        self.assertEqual(self.model.classify('python'), 20)
+        self.assertEqual(set(self.model._documents), {20})
+
+
+@override_settings(TOPIC_CLASSIFIER_ENABLED=True, TOPIC_CLASSIFIER_MAX_AGE=0)
+class TopicClassifierTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.writing = Category.objects.create(name='Writing', slug='writing')
+        self.coding = Category.objects.create(name='Coding', slug='coding')
+        Keyword.objects.create(category=self.writing, text='Persuasive essay', related_keywords='argument, thesis')
+        Keyword.objects.create(category=self.coding, text='Python debugging', related_keywords='traceback')
+
+    def test_classify_and_follow_keyword_changes(self):
+        self.assertEqual(topic_classifier.classify('a thesis statement'), self.writing.id)
+        keyword = Keyword.objects.create(category=self.coding, text='Unit tests')
+        self.assertEqual(topic_classifier.classify('unit tests'), self.coding.id)
+        keyword.delete()
+        self.assertIsNone(topic_classifier.classify('unit tests'))
+
+    def test_deleting_a_category_with_the_model_loaded(self):
+        topic_classifier.classify('warm up')
+        self.coding.delete()
+        self.assertFalse(Category.objects.filter(slug='coding').exists())
+        self.assertIsNone(topic_classifier.classify('python traceback'))
+
+
+class BoardTests(SimpleTestCase):
+    def setUp(self):
+        self.board = Board(2)
+        self.board.load([(1, 10, 'essay', 5), (2, 10, 'poem', 3)])
+
+    def test_offer_replaces_the_lowest_entry(self):
+        self.board.offer(3, 10, 'story', 4)
+        self.assertEqual([keyword_id for keyword_id, _ in self.board.ranked()], [1, 3])
+        self.board.offer(4, 10, 'haiku', 1)
+        self.assertNotIn(4, self.board.entries)
+        self.assertFalse(self.board.dirty)
+
+    def test_changes_that_could_lower_a_ranking_mark_it_dirty(self):
+        self.board.offer(1, 10, 'essay', 2)
+        self.assertTrue(self.board.dirty)
+
+
+@override_settings(CATALOG_VERSION_TTL=0, LEADERBOARD_MAX_AGE=0)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.category = Category.objects.create(name='Writing', slug='writing')
+        self.essay = Keyword.objects.create(category=self.category, text='Essay', popularity=5)
+        Keyword.objects.create(category=self.category, text='Poem', popularity=3)
+
+    def texts(self, category_slug=None):
+        return [topic['text'] for topic in leaderboard.top(category_slug)]
+
+    def test_saves_are_offered_to_the_boards(self):
+        self.assertEqual(self.texts(), ['Essay', 'Poem'])
+        Keyword.objects.create(category=self.category, text='Story', popularity=9)
+        # Only the version stamp is read; the board is not rebuilt
+        with self.assertNumQueries(1):
+            self.assertEqual(self.texts(), ['Story', 'Essay', 'Poem'])
+
+    def test_rebuild_after_a_delete(self):
+        self.assertEqual(self.texts(), ['Essay', 'Poem'])
+        self.essay.delete()
+        self.assertEqual(self.texts(), ['Poem'])
+        Keyword.objects.filter(text='Poem').update(popularity=1)
+        self.assertEqual(leaderboard.rebuild_all()[0]['popularity'], 1)
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, SERVER_TIMING_HEADER=True)
+class InternalTimingsTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/healthz', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('view;dur=', response['Server-Timing'])
+
+    @override_settings(DEBUG=True, METRICS_TOKEN='', METRICS_ALLOWED_IPS=[])
+    def test_hidden_from_anonymous_clients_even_with_debug(self):
+        self.assertEqual(self.client.get('/internal/timings/', secure=True).status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret', METRICS_ALLOWED_IPS=[])
+    def test_served_with_the_metrics_token(self):
+        self.assertEqual(self.client.get('/internal/timings/', secure=True).status_code, 401)
+        response = self.client.get('/internal/timings/', secure=True, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pid'], os.getpid())
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=[])
+    def test_served_to_staff(self):
+        staff = User.objects.create_user('admin', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/internal/timings/', secure=True).status_code, 200)
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class ReadinessTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def test_empty_catalog_is_seeded_and_published(self):
+        # Cached while the table is still empty
+        self.assertEqual(get_categories(), [])
+        version = catalog.get_catalog_version()
+
+        status = Readiness().check()
+
+        self.assertTrue(status['ready'])
+        self.assertEqual(status['seeded_categories'], len(Category.get_default_categories()))
+        self.assertEqual(len(get_categories()), status['seeded_categories'])
+        self.assertNotEqual(catalog.get_catalog_version(), version)
+
+    def test_missing_tables_are_reported(self):
+        with mock.patch('django.db.connection.introspection.table_names', return_value=[]):
+            status = Readiness().check()
+        self.assertFalse(status['ready'])
+        self.assertIn(Category._meta.db_table, status['missing_tables'])
+
+
+class RootFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'robots.txt')
+        self.write(b'User-agent: *\nDisallow: /api/\n' * 20)
+        self.file = RootFile(lambda: [self.path], 'text/plain')
+        self.factory = RequestFactory()
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def get(self, **headers):
+        return self.file.response(self.factory.get('/robots.txt', **headers))
+
+    def test_unchanged_file_answers_304(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_compressed_variants(self):
+        plain = self.get()
+        compressed = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='gzip, br')['Content-Encoding'], 'br')
+
+    def test_changed_file_is_reloaded(self):
+        etag = self.get()['ETag']
+        self.write(b'User-agent: *\n')
+        os.utime(self.path, ns=(0, 0))
+        with mock.patch('prompt_generator.root_files.STAT_INTERVAL', 0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'User-agent: *\n')
+
+
+class CategoryIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CategoryIndex()
+        self.index.add(1, 'Persuasive essay', 5, ['argument', 'thesis'])
+        self.index.add(2, 'Essay outline', 9, [])
+        self.index.add(3, 'Poem', 1, ['verse'])
+        self.index.add(4, 'AI', 2, [])
+
+    def test_text_matches_rank_before_related_and_word_matches(self):
+        self.assertEqual(self.index.search('essay'), [('Essay outline', 9), ('Persuasive essay', 5)])
+        self.assertEqual(self.index.search('thes'), [('Persuasive essay', 5)])
+        self.assertEqual(self.index.search('poem outline'), [('Essay outline', 9), ('Poem', 1)])
+        self.assertEqual(self.index.search('ai', limit=1), [('AI', 2)])
+
+    def test_updates_are_applied_in_place(self):
+        self.index.add(3, 'Sonnet', 1, ['verse'])
+        self.assertEqual(self.index.search('poem'), [])
+        self.assertEqual(self.index.search('verse'), [('Sonnet', 1)])
+        self.index.add_popularity('Sonnet', 10)
+        self.assertEqual(self.index.search('verse'), [('Sonnet', 11)])
+        self.index.remove(3)
+        self.assertEqual(self.index.search('verse'), [])
+        self.assertNotIn('ver', self.index._related_grams)
+
+
+@override_settings(SUGGESTION_INDEX_MAX_AGE=0)
+class SuggestionIndexTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.writing = Category.objects.create(name='Writing', slug='writing')
+        self.coding = Category.objects.create(name='Coding', slug='coding')
+        self.keyword = Keyword.objects.create(category=self.writing, text='Essay', popularity=3)
+
+    def test_keyword_changes_reach_the_loaded_index(self):
+        self.assertEqual(suggestion_index.search(self.writing.id, 'ess'), [('Essay', 3)])
+        with self.assertNumQueries(0):
+            self.assertEqual(suggestion_index.search(self.writing.id, 'say'), [('Essay', 3)])
+
+        self.keyword.category = self.coding
+        self.keyword.save()
+        self.assertEqual(suggestion_index.search(self.writing.id, 'ess'), [])
+        self.assertEqual(suggestion_index.search(self.coding.id, 'ess'), [('Essay', 3)])
+
+        self.keyword.delete()
+        self.assertEqual(suggestion_index.search(self.coding.id, 'ess'), [])
+
+
+class RelatedTermTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.category = Category.objects.create(name='Writing', slug='writing')
+        self.keyword = Keyword.objects.create(
+            category=self.category, text='Essay', related_keywords='Thesis ,  Argument  Map, thesis,',
+        )
+
+    def terms(self):
+        return sorted(self.keyword.related_terms.values_list('term', flat=True))
+
+    def test_saves_mirror_related_keywords(self):
+        self.assertEqual(self.terms(), ['argument map', 'thesis'])
+        self.keyword.related_keywords = 'thesis, outline'
+        self.keyword.save()
+        self.assertEqual(self.terms(), ['outline', 'thesis'])
+
+    def test_related_terms_are_matched_from_their_start(self):
+        matches = Keyword.objects.filter(KeywordSearch().related_contains('ARGUMENT'))
+        self.assertEqual(list(matches), [self.keyword])
+        self.assertFalse(Keyword.objects.filter(KeywordSearch().related_contains('map')).exists())
+
+
+@override_settings(CATALOG_CACHE_TIMEOUT=0)
+class TemplateCacheTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.category = Category.objects.create(name='Writing', slug='writing')
+        self.template = PromptTemplate.objects.create(
+            name='Outline', template='Outline {topic}, then argue for {topic}.', category=self.category,
+        )
+
+    def test_compiled_templates_are_cached(self):
+        entry = template_cache.get('writing')
+        self.assertEqual(entry.templates[0].render('tea'), 'Outline tea, then argue for tea.')
+        with self.assertNumQueries(0):
+            self.assertIs(template_cache.get('writing'), entry)
+        with self.assertRaises(Category.DoesNotExist):
+            template_cache.get('nope')
+
+    def test_template_changes_reload_the_category(self):
+        digest = template_cache.get('writing').digest
+        self.template.template = 'Summarize {topic}'
+        self.template.save()
+        entry = template_cache.get('writing')
+        self.assertEqual(entry.templates[0].render('tea'), 'Summarize tea')
+        self.assertNotEqual(entry.digest, digest)
+
+
+@override_settings(CATALOG_VERSION_TTL=0, POPULARITY_FLUSH_INTERVAL=3600, POPULARITY_BUFFER_SIZE=10000)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        patcher = mock.patch.object(PopularityBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        category = Category.objects.create(name='Writing', slug='writing')
+        Keyword.objects.create(category=category, text='Persuasive essay', popularity=4, related_keywords='thesis')
+        Keyword.objects.create(category=category, text='Poem', popularity=2)
+        PromptTemplate.objects.create(name='Outline', template='Outline {topic}', category=category)
+        PromptTemplate.objects.create(name='Draft', template='Draft {topic}', category=category)
+
+    async def assertSameResponse(self, name, request, arequest):
+        expected = await sync_to_async(getattr(views, name))(request)
+        actual = await getattr(async_views, name)(arequest)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(json.loads(actual.content), json.loads(expected.content))
+
+    async def test_get_views_match_the_sync_ones(self):
+        for name, path in [
+            ('get_trending_topics', '/api/trending/?category=writing'),
+            ('get_trending_topics', '/api/trending/?category=nope'),
+            ('get_keywords_by_category', '/api/keywords/?category=writing&query=thes'),
+            ('get_keywords_by_category', '/api/keywords/?category=writing&query=pome'),
+            ('get_keywords_by_category', '/api/keywords/?category=writing'),
+        ]:
+            with self.subTest(path=path):
+                await self.assertSameResponse(name, RequestFactory().get(path), AsyncRequestFactory().get(path))
+
+    async def test_post_views_match_the_sync_ones(self):
+        for name, body in [
+            ('generate_prompts', {'topic': 'climate', 'category': 'writing', 'seed': 7}),
+            ('generate_prompts', {'topic': 'climate', 'category': 'nope'}),
+            ('generate_question_prompts', {'topic': 'climate', 'category': 'writing'}),
+            ('generate_question_prompts', {'category': 'writing'}),
+        ]:
+            with self.subTest(name=name, body=body):
+                body = json.dumps(body)
+                await self.assertSameResponse(
+                    name,
+                    RequestFactory().post('/', body, content_type='application/json'),
+                    AsyncRequestFactory().post('/', body, content_type='application/json'),
+                )
+
+
+class LoadInitialDataTests(TestCase):
+    def load(self, *args):
+        out = StringIO()
+        call_command('load_initial_data', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reloading_changes_nothing(self):
+        self.load()
+        counts = (Category.objects.count(), PromptTemplate.objects.count(), Keyword.objects.count())
+        self.assertGreater(counts[2], 0)
+
+        output = self.load()
+
+        self.assertIn('Categories: 0 created, 0 updated', output)
+        self.assertIn('Prompt templates: 0 created, 0 updated', output)
+        self.assertIn('Keywords: 0 created, 0 updated', output)
+        self.assertEqual((Category.objects.count(), PromptTemplate.objects.count(), Keyword.objects.count()), counts)
+
+    def test_keep_popularity(self):
+        self.load()
+        Keyword.objects.filter(text='write a poem about').update(popularity=500)
+        Keyword.objects.filter(text='Python').delete()
+
+        self.load('--keep-popularity')
+        self.assertEqual(Keyword.objects.get(text='write a poem about').popularity, 500)
+        self.assertTrue(Keyword.objects.filter(text='Python').exists())
+
+        self.load()
+        self.assertEqual(Keyword.objects.get(text='write a poem about').popularity, 9)
+
+
+class CatalogExportImportTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        category = Category.objects.create(name='Writing', slug='writing')
+        PromptTemplate.objects.create(name='Outline', template='Outline {topic}', category=category)
+        Keyword.objects.create(category=category, text='Essay', popularity=7, related_keywords='thesis')
+        Keyword.objects.create(category=category, text='Café menu', popularity=1, curated=False)
+
+    def export(self, name):
+        path = os.path.join(self.directory, name)
+        call_command('export_catalog', path, stdout=StringIO())
+        with gzip.open(path, 'rt') if name.endswith('.gz') else open(path) as f:
+            return f.read()
+
+    def test_round_trip(self):
+        exported = self.export('catalog.jsonl.gz')
+        Category.objects.all().delete()
+
+        call_command('import_catalog', os.path.join(self.directory, 'catalog.jsonl.gz'), stdout=StringIO())
+
+        self.assertEqual(self.export('again.jsonl'), exported)
+        self.assertEqual(
+            list(Keyword.objects.get(text='Essay').related_terms.values_list('term', flat=True)), ['thesis'],
+        )
+
+    def test_resume_after_a_bad_line(self):
+        lines = self.export('catalog.jsonl').splitlines()
+        Category.objects.all().delete()
+        path = os.path.join(self.directory, 'broken.jsonl')
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines[:2] + ['{"type": "bogus"}'] + lines[2:]))
+
+        with self.assertRaisesMessage(CommandError, "Line 3: unknown record type 'bogus'"):
+            call_command('import_catalog', path, batch_size=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Category.objects.count(), 1)
+        self.assertFalse(Keyword.objects.exists())
+
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines[:2] + ['{"type": "category", "name": "Coding", "slug": "coding"}'] + lines[2:]))
+        call_command('import_catalog', path, batch_size=2, resume=True, stdout=StringIO())
+        self.assertEqual(Keyword.objects.count(), 2)
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+
+class KeywordSearchTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Coding', slug='coding')
+        other = Category.objects.create(name='Writing', slug='writing')
+        Keyword.objects.create(category=self.category, text='Python debugging', popularity=3)
+        Keyword.objects.create(category=self.category, text='Unit tests', popularity=9, related_keywords='pytest, mocking')
+        Keyword.objects.create(category=self.category, text='Code review', popularity=5)
+        Keyword.objects.create(category=other, text='Python essay', popularity=50)
+
+    def texts(self, backend, query):
+        return [keyword.text for keyword in backend.search(self.category, query)]
+
+    def test_backends_agree(self):
+        backend = keyword_search()
+        if connection.vendor == 'sqlite':
+            self.assertIsInstance(backend, FTS5Search)
+        for query in ['python', 'PYTHON code', 'pytest', 'unit', 'nothing here']:
+            with self.subTest(query=query):
+                self.assertEqual(self.texts(backend, query), self.texts(KeywordSearch(), query))
+        self.assertEqual(self.texts(backend, 'python code'), ['Code review', 'Python debugging'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite FTS5 table')
+    def test_fts_table_follows_keyword_writes(self):
+        backend = FTS5Search()
+        self.assertEqual(self.texts(backend, 'mocking'), ['Unit tests'])
+        # Unlike the B-tree prefix lookup, the trigram table finds substrings
+        self.assertEqual(self.texts(backend, 'ocking'), ['Unit tests'])
+        keyword = Keyword.objects.get(text='Unit tests')
+        keyword.related_keywords = 'fixtures'
+        keyword.save()
+        self.assertEqual(self.texts(backend, 'mocking'), [])
+        keyword.delete()
+        self.assertEqual(self.texts(backend, 'fixtures'), [])
+
+
+class FuzzyVocabularyTests(SimpleTestCase):
+    def setUp(self):
+        self.vocabulary = FuzzyVocabulary()
+        self.vocabulary.add(1, {'python', 'debugging'})
+        self.vocabulary.add(2, {'python', 'code'})
+        self.vocabulary.add(3, {'poem'})
+        self.deadline = time.perf_counter() + 60
+
+    def test_osa_distance(self):
+        self.assertEqual(osa_distance('pyhton', 'python', 2), 1)
+        self.assertEqual(osa_distance('pythn', 'python', 2), 1)
+        self.assertEqual(osa_distance('jython3', 'python', 2), 2)
+        self.assertEqual(osa_distance('snake', 'python', 2), 3)
+
+    def test_lookup_respects_the_allowed_distance(self):
+        self.assertEqual(self.vocabulary.lookup('pyhton', self.deadline), [('python', 1)])
+        self.assertEqual(self.vocabulary.lookup('pome', self.deadline), [('poem', 1)])
+        # Four letters allow a single edit, two letters none
+        self.assertEqual(self.vocabulary.lookup('pmoe', self.deadline), [])
+        self.assertEqual(self.vocabulary.lookup('po', self.deadline), [])
+
+    def test_match_scores_words_and_distance(self):
+        self.assertEqual(
+            self.vocabulary.match('pyhton cod', self.deadline), {1: (1, 1), 2: (2, 2)},
+        )
+
+    def test_remove_forgets_unused_words(self):
+        self.vocabulary.remove(2, {'python', 'code'})
+        self.assertEqual(self.vocabulary.match('pyhton cod', self.deadline), {1: (1, 1)})
+        self.vocabulary.remove(1, {'python', 'debugging'})
+        self.assertEqual(self.vocabulary.lookup('pyhton', self.deadline), [])
+        self.assertEqual(set(self.vocabulary._keywords), {'poem'})
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, POPULARITY_FLUSH_INTERVAL=3600, POPULARITY_BUFFER_SIZE=10000)
+class FuzzySuggestionTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        patcher = mock.patch.object(PopularityBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        category = Category.objects.create(name='Coding', slug='coding')
+        Keyword.objects.create(category=category, text='Python debugging', popularity=3)
+
+    def suggestions(self, query):
+        response = self.client.get('/api/keywords/', {'category': 'coding', 'query': query}, secure=True)
+        return [suggestion['text'] for suggestion in response.json()['suggestions']]
+
+    def test_typo_finds_the_keyword(self):
+        self.assertEqual(self.suggestions('pyhton debuging'), ['Python debugging'])
+
+    @override_settings(FUZZY_MATCH_TIME_BUDGET=0)
+    def test_disabled_fuzzy_matching_suggests_the_query(self):
+        self.assertEqual(self.suggestions('pyhton'), ['Pyhton'])
+
+
+class PromptCacheTests(SimpleTestCase):
+    def test_least_recently_used_entries_are_evicted(self):
+        lru = PromptCache()
+        entry_size = len(json.dumps(['x' * 10]))
+        with override_settings(PROMPT_CACHE_MAX_BYTES=entry_size * 2):
+            lru.set('a', ['x' * 10])
+            lru.set('b', ['x' * 10])
+            lru.get('a')
+            lru.set('c', ['x' * 10])
+            self.assertIsNone(lru.get('b'))
+            self.assertEqual(lru.get('a'), ['x' * 10])
+            self.assertEqual(lru.get('c'), ['x' * 10])
+
+            lru.set('d', ['x' * 100])
+            self.assertIsNone(lru.get('d'))
+            self.assertEqual(lru._size, entry_size * 2)
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, POPULARITY_FLUSH_INTERVAL=3600, POPULARITY_BUFFER_SIZE=10000)
+class SeededPromptTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        prompt_cache.clear()
+        patcher = mock.patch.object(PopularityBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        category = Category.objects.create(name='Writing', slug='writing')
+        for name in ['Outline', 'Draft', 'Edit', 'Title']:
+            PromptTemplate.objects.create(name=name, template=f'{name} {{topic}}', category=category)
+
+    def generate(self, **data):
+        return self.client.post(
+            '/api/generate-prompts/', json.dumps({'category': 'writing', **data}), content_type='application/json',
+            secure=True,
+        )
+
+    def test_same_seed_same_prompts(self):
+        first = self.generate(topic='tea', seed='abc').json()
+        self.assertEqual(first['seed'], 'abc')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.generate(topic='  tea ', seed='abc').json(), first)
+
+        # An unseeded request reports the seed that reproduces it
+        unseeded = self.generate(topic='tea').json()
+        self.assertEqual(self.generate(topic='tea', seed=unseeded['seed']).json(), unseeded)
+
+    def test_edited_templates_are_not_served_from_the_cache(self):
+        self.generate(topic='tea', seed=1)
+        PromptTemplate.objects.update(template='New {topic}')
+        PromptTemplate.objects.first().save()
+        prompts = self.generate(topic='tea', seed=1).json()['prompts']
+        self.assertEqual({prompt['generatedContent'] for prompt in prompts}, {'New tea'})
+
+    def test_invalid_seed(self):
+        for seed in [True, 1.5, {'a': 1}, 'x' * 65]:
+            with self.subTest(seed=seed):
+                self.assertEqual(self.generate(topic='tea', seed=seed).status_code, 400)
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False, POPULARITY_FLUSH_INTERVAL=3600, POPULARITY_BUFFER_SIZE=10000)
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        patcher = mock.patch.object(PopularityBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.command = benchmark.Command(stdout=StringIO())
+
+    def test_percentile(self):
+        values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        self.assertEqual(benchmark.percentile(values, 50), 5)
+        self.assertEqual(benchmark.percentile(values, 95), 10)
+        self.assertEqual(benchmark.percentile(values, 1), 1)
+        self.assertEqual(benchmark.percentile([], 99), 0.0)
+
+    def test_unknown_scenario(self):
+        with self.assertRaisesMessage(CommandError, 'Unknown scenarios: nope'):
+            call_command('benchmark', scenarios='home,nope', stdout=StringIO())
+
+    def test_seeded_catalog_serves_every_scenario(self):
+        slugs = self.command.seed_catalog(3, 200, random.Random(1))
+        self.assertEqual(len(slugs), 3)
+        self.assertEqual(Keyword.objects.filter(category__slug__in=slugs).count(), 200)
+
+        topics = self.command.sample_topics(slugs)
+        rng = random.Random(1)
+        for scenario in benchmark.SCENARIOS:
+            for _ in range(5):
+                method, path, data = self.command.make_request(scenario, rng, topics, slugs)
+                with self.subTest(scenario=scenario, data=data):
+                    if method == 'get':
+                        response = self.client.get(path, data, secure=True)
+                    else:
+                        response = self.client.post(path, json.dumps(data), content_type='application/json', secure=True)
+                    self.assertLess(response.status_code, 400)
+
+
+@override_settings(ADMISSION_CONTROL_ENABLED=False)
+class MetricsTests(TestCase):
+    def scrape(self, **headers):
+        return self.client.get('/metrics', secure=True, **headers)
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=[])
+    def test_not_served_without_a_gate(self):
+        self.assertEqual(self.scrape().status_code, 404)
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_allowed_addresses(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret', METRICS_ALLOWED_IPS=[])
+    def test_token_and_exposition(self):
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.client.get('/healthz', secure=True)
+
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('generator_requests_total{method="GET",status="200",view="healthz"}', body)
+        self.assertIn('generator_request_duration_seconds_bucket{', body)
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        self.logger = mock.Mock()
+        patcher = mock.patch.object(slow_queries, '_log', return_value=self.logger)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def records(self):
+        return [json.loads(call.args[0]) for call in self.logger.info.call_args_list]
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_SAMPLE_RATE=1.0)
+    def test_slow_queries_are_logged_with_their_plan(self):
+        with connection.execute_wrapper(slow_queries.record_slow_query):
+            list(Keyword.objects.filter(text='Essay'))
+
+        [record] = self.records()
+        self.assertIn('FROM "generator_keyword"', record['sql'])
+        self.assertEqual(record['params'], ['Essay'])
+        self.assertTrue(record['plan'])
+        self.assertFalse(record['many'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=10000)
+    def test_fast_queries_are_not_logged(self):
+        with connection.execute_wrapper(slow_queries.record_slow_query):
+            list(Keyword.objects.all())
+        self.assertEqual(self.records(), [])
+
+
+class SlowQuerySummaryTests(SimpleTestCase):
+    def test_fingerprint_collapses_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s,%s) AND name = 'O''Brien'  AND n > 10"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ?',
+        )
+
+    def test_summary_groups_statements_across_rotated_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.jsonl')
+            entries = [
+                {'sql': 'SELECT 1 FROM t WHERE id = 5', 'duration_ms': 120.0, 'view': 'home'},
+                {'sql': 'SELECT 1 FROM t WHERE id = 7', 'duration_ms': 300.0, 'view': 'get_keywords'},
+            ]
+            with open(f'{path}.1', 'w') as f:
+                f.write(json.dumps(entries[0]) + '\n{"cut short\n')
+            with open(path, 'w') as f:
+                f.write(json.dumps(entries[1]) + '\n')
+            out = StringIO()
+            call_command('slow_queries', path=path, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('2 slow queries in 1 distinct statements', output)
+        self.assertIn('2x  total 420.0ms  mean 210.0ms  max 300.0ms', output)
+        self.assertIn('views: get_keywords, home', output)
+
+
+@override_settings(
+    ADMISSION_CONTROL_ENABLED=False, CATALOG_CACHE_TIMEOUT=0, TOPIC_CLASSIFIER_ENABLED=False,
+    POPULARITY_FLUSH_INTERVAL=3600, POPULARITY_BUFFER_SIZE=10000,
+)
+class QuestionTemplateTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        patcher = mock.patch.object(PopularityBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.writing = Category.objects.create(name='Writing', slug='writing')
+        self.coding = Category.objects.create(name='Coding', slug='coding')
+        QuestionTemplate.objects.create(name='Debug', template='How do I debug {topic}?', category=self.coding, order=1)
+        QuestionTemplate.objects.create(name='Test', template='How do I test {topic}?', category=self.coding, order=0)
+        Keyword.objects.create(category=self.coding, text='Flask app', popularity=3)
+
+    def questions(self, **data):
+        response = self.client.post(
+            '/api/generate-question-prompts/', json.dumps(data), content_type='application/json', secure=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        return [prompt['generatedContent'] for prompt in response.json()['prompts']]
+
+    def test_category_templates_in_order(self):
+        self.assertEqual(
+            self.questions(topic='flask  app', category='coding'),
+            ['How do I test flask app?', 'How do I debug flask app?'],
+        )
+
+    def test_categories_without_templates_use_the_shared_ones(self):
+        prompts = self.questions(topic='essays', category='writing')
+        self.assertEqual(len(prompts), QuestionTemplate.objects.filter(category=None).count())
+        self.assertEqual(prompts[0], 'What is essays? Provide a detailed explanation with examples.')
+
+    def test_topic_matching_a_keyword_picks_its_category(self):
+        self.assertEqual(self.questions(topic='FLASK APP')[0], 'How do I test FLASK APP?')
+
+    def test_template_edits_are_picked_up(self):
+        self.questions(topic='x', category='coding')
+        QuestionTemplate.objects.filter(name='Test').update(order=5)
+        QuestionTemplate.objects.get(name='Debug').save()
+        self.assertEqual(self.questions(topic='x', category='coding'), ['How do I debug x?', 'How do I test x?'])
+
+
+@override_settings(CATALOG_VERSION_TTL=60, SUGGESTION_INDEX_ENABLED=True, TOPIC_CLASSIFIER_ENABLED=True)
+class WarmUpTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.category = Category.objects.create(name='Writing', slug='writing')
+        PromptTemplate.objects.create(name='Outline', template='Outline {topic}', category=self.category)
+        Keyword.objects.create(category=self.category, text='Essay', popularity=3)
+
+    def test_caches_are_loaded_before_the_first_request(self):
+        self.assertTrue(warm_up())
+        with self.assertNumQueries(0):
+            self.assertEqual(template_cache.get('writing').templates[0].render('tea'), 'Outline tea')
+            self.assertEqual(suggestion_index.search(self.category.id, 'ess'), [('Essay', 3)])
+            self.assertEqual(leaderboard.top('writing')[0]['text'], 'Essay')
+            template_cache.questions()
+            self.assertEqual(topic_classifier.classify('essay'), self.category.id)
+
+    def test_skipped_until_ready(self):
+        with mock.patch.object(readiness, 'check', return_value={'ready': False}):
+            self.assertFalse(warm_up())
+
+    def test_only_persistent_connections_are_opened(self):
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            self.assertEqual(open_connections(), [])
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}):
+            self.assertEqual(open_connections(), [DEFAULT_DB_ALIAS])
@@ -0,0 +1,170 @@
+"""Token buckets for admission control of the write-heavy API endpoints.
+
+A bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+second; a request is admitted when every bucket it is checked against has a
+token to spare. Bucket state lives in a backend:
+
+* ``memory``: a dict in each process. Limits apply per worker, so the
+  effective limit is multiplied by the number of worker processes.
+* ``sqlite``: a small SQLite file shared by every worker on the host and
+  updated under ``BEGIN IMMEDIATE``. Costs a local write per request but
+  enforces one limit across workers. While the file is locked for longer
+  than ``TIMEOUT`` or unusable, each worker falls back to its own memory
+  buckets rather than admitting everything.
+
+Any other value of ``ADMISSION_CONTROL_BACKEND`` is imported as a dotted
+path to a class with the same ``take()`` method.
+"""
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+def _wait(tokens, rate):
+    """Seconds until a bucket holding ``tokens`` has a whole token"""
+    if rate <= 0:
+        return math.inf
+    return (1 - tokens) / rate
+
+
+class MemoryBackend:
+    """Per-process bucket state"""
+
+    # Full buckets carry no information and are dropped past this many keys,
+    # at most PRUNE_BATCH of them per request
+    MAX_KEYS = 100000
+    PRUNE_BATCH = 100
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        """Take a token from every (key, rate, burst) bucket, or from none
+
+        Returns 0 when admitted, otherwise the seconds until a retry could
+        succeed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, rate, burst in buckets:
+                tokens, updated = self._buckets.get(key, (burst, now))
+                levels.append(_refill(tokens, updated, now, rate, burst))
+            retry_after = max((_wait(tokens, rate) for tokens, (_, rate, _) in zip(levels, buckets) if tokens < 1), default=0)
+            if retry_after:
+                return retry_after
+            for tokens, (key, _, _) in zip(levels, buckets):
+                # Re-inserted so the dict stays ordered by last update
+                self._buckets.pop(key, None)
+                self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+            return 0
+
+    def _prune(self, now):
+        """Drop the least recently updated buckets that have refilled since"""
+        rates = getattr(settings, 'ADMISSION_CONTROL_RATES', {})
+        longest = max((burst / rate for limits in rates.values() for rate, burst in limits.values() if rate > 0), default=60)
+        for key in list(islice(self._buckets, self.PRUNE_BATCH)):
+            if now - self._buckets[key][1] < longest:
+                break
+            del self._buckets[key]
+
+
+class SQLiteBackend:
+    """Bucket state in an SQLite file shared by the workers of one host"""
+
+    # Rows untouched for this long are deleted now and then
+    EXPIRE_AFTER = 3600
+    # Seconds to wait for another worker's transaction before falling back
+    TIMEOUT = 0.25
+
+    def __init__(self, path=None):
+        self.path = path or getattr(
+            settings,
+            'ADMISSION_CONTROL_SQLITE_PATH',
+            os.path.join(tempfile.gettempdir(), 'prompt_generator_admission.sqlite3'),
+        )
+        self._local = threading.local()
+        self._calls = 0
+        self._fallback = MemoryBackend()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.TIMEOUT, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, buckets):
+        """Same contract as MemoryBackend.take(); limits per worker if the file is unusable"""
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                levels = []
+                for key, rate, burst in buckets:
+                    row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                    tokens, updated = row if row else (burst, now)
+                    levels.append(_refill(tokens, updated, now, rate, burst))
+                retry_after = max((_wait(tokens, rate) for tokens, (_, rate, _) in zip(levels, buckets) if tokens < 1), default=0)
+                if not retry_after:
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                        [(key, tokens - 1, now) for tokens, (key, _, _) in zip(levels, buckets)],
+                    )
+                self._calls += 1
+                if self._calls % 1000 == 0:
+                    connection.execute('DELETE FROM buckets WHERE updated < ?', (now - self.EXPIRE_AFTER,))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            # Neither admit everything nor reject everything while the file
+            # is busy or broken: this worker's own buckets still bound it
+            logger.warning('Admission control backend unavailable: %s', e)
+            return self._fallback.take(buckets)
+        return retry_after
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'ADMISSION_CONTROL_BACKEND', 'memory')
+                _backend = (BACKENDS.get(name) or import_string(name))()
+    return _backend
@@ -0,0 +1,158 @@
+"""Per-request timing breakdown for the Server-Timing header and /internal/timings/.
+
+``ServerTimingMiddleware`` opens a ``RequestTiming`` in a context variable
+for each request. Every database connection runs queries through
+``record_query`` (installed in ``generator.signals``), and
+``generator.http.JsonResponse`` reports its encoding time, so both are
+attributed to the request even when async views run the ORM in a thread.
+Finished requests are folded into per-view totals in ``timing_stats``.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('generator_request_timing', default=None)
+
+METRICS = ('total', 'view', 'db', 'serialize')
+
+
+class RequestTiming:
+    __slots__ = ('started', 'view_name', 'view_started', 'view_time', 'queries', 'db_time', 'serialize_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_name = None
+        self.view_started = None
+        self.view_time = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+    def durations(self, total):
+        """Milliseconds per metric"""
+        return {
+            'total': total * 1000,
+            'view': self.view_time * 1000,
+            'db': self.db_time * 1000,
+            'serialize': self.serialize_time * 1000,
+        }
+
+
+def start():
+    """Begin timing the current request; returns (timing, token for finish())"""
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    """The timing of the request being handled, or None outside a request"""
+    return _current.get()
+
+
+@contextmanager
+def untimed():
+    """Leave the queries run inside out of the current request's timing"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.queries += 1
+        timing.db_time += time.perf_counter() - started
+
+
+def record_serialization(seconds):
+    timing = _current.get()
+    if timing is not None:
+        timing.serialize_time += seconds
+
+
+def server_timing_header(durations, queries):
+    return ', '.join([
+        f'db;dur={durations["db"]:.2f};desc="{queries} queries"',
+        f'view;dur={durations["view"]:.2f}',
+        f'serialize;dur={durations["serialize"]:.2f}',
+        f'total;dur={durations["total"]:.2f}',
+    ])
+
+
+def log_request(request, response, timing, durations):
+    logger.info(json.dumps({
+        'view': timing.view_name,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'queries': timing.queries,
+        **{f'{metric}_ms': round(value, 3) for metric, value in durations.items()},
+    }))
+
+
+class TimingStats:
+    """Running per-view totals and maxima of the request timings"""
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def add(self, view_name, durations, queries, status):
+        with self._lock:
+            stats = self._views.get(view_name)
+            if stats is None:
+                stats = self._views[view_name] = {
+                    'requests': 0,
+                    'errors': 0,
+                    'queries': 0,
+                    'max_queries': 0,
+                    **{f'{metric}_ms': 0.0 for metric in METRICS},
+                    **{f'max_{metric}_ms': 0.0 for metric in METRICS},
+                }
+            stats['requests'] += 1
+            stats['errors'] += status >= 500
+            stats['queries'] += queries
+            stats['max_queries'] = max(stats['max_queries'], queries)
+            for metric, value in durations.items():
+                stats[f'{metric}_ms'] += value
+                stats[f'max_{metric}_ms'] = max(stats[f'max_{metric}_ms'], value)
+
+    def snapshot(self):
+        """Per-view request counts with mean and max of every metric"""
+        with self._lock:
+            views = {name: dict(stats) for name, stats in self._views.items()}
+        result = {}
+        for name, stats in sorted(views.items()):
+            requests = stats['requests']
+            result[name] = {
+                'requests': requests,
+                'errors': stats['errors'],
+                'mean_queries': round(stats['queries'] / requests, 2),
+                'max_queries': stats['max_queries'],
+                **{f'mean_{metric}_ms': round(stats[f'{metric}_ms'] / requests, 3) for metric in METRICS},
+                **{f'max_{metric}_ms': round(stats[f'max_{metric}_ms'], 3) for metric in METRICS},
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+timing_stats = TimingStats()
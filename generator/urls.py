@@ -1,10 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under an ASGI server the JSON APIs can be served by native async views
+api = async_views if settings.ASYNC_API_VIEWS else views
 
 urlpatterns = [
     path('', views.home, name='home'),
-    path('api/keywords/', views.get_keywords_by_category, name='get_keywords'),
-    path('api/trending/', views.get_trending_topics, name='trending_topics'),
-    path('api/generate-prompts/', views.generate_prompts, name='generate_prompts'),
-    path('api/generate-question-prompts/', views.generate_question_prompts, name='generate_question_prompts'),
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+    path('internal/timings/', views.internal_timings, name='internal_timings'),
+    path('metrics', views.metrics, name='metrics'),
+    path('sitemap-<int:number>.xml', views.sitemap_section, name='sitemap_section'),
+    path('api/keywords/', api.get_keywords_by_category, name='get_keywords'),
+    path('api/trending/', api.get_trending_topics, name='trending_topics'),
+    path('api/generate-prompts/', api.generate_prompts, name='generate_prompts'),
+    path('api/generate-prompts/batch/', views.generate_prompts_batch, name='generate_prompts_batch'),
+    path('api/generate-question-prompts/', api.generate_question_prompts, name='generate_question_prompts'),
 ] 
\ No newline at end of file
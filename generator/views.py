@@ -1,189 +1,50 @@
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from .models import Category, Keyword, PromptTemplate
-from django.db.models import Q, F, Value, FloatField
-from django.db.models.functions import Length, Greatest
-from functools import reduce
+from .catalog import get_categories
+from .classifier import topic_classifier
+from .http import JsonResponse, accepted_encodings, conditional_on_catalog
+from .leaderboard import leaderboard
+from .metrics import record_fallback, render as render_metrics
+from .popularity import popularity_buffer
+from .prompt_cache import normalize_topic, prompt_cache, random_seed
+from .readiness import readiness
+from .replicas import reads_from_replica
+from .search import keyword_search
+from . import sitemaps
+from .suggestions import suggestion_index
+from .template_cache import DEFAULT_QUESTION_TEMPLATES, template_cache
+from .timing import timing_stats
+from django.db.models.functions import Lower
+import gzip
 import random
 import json
-import re
-import traceback
-import sys
-from django.utils.text import slugify
-from django.db import connection, DatabaseError, ProgrammingError, OperationalError
-from django.db.migrations.executor import MigrationExecutor
-from django.db.migrations.recorder import MigrationRecorder
+import os
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.db import DatabaseError, ProgrammingError, OperationalError
 
+@conditional_on_catalog(private=True)
+@reads_from_replica()
 def home(request):
     try:
-        # First try to access the categories
-        categories_exist = False
-        try:
-            # Check if the table exists
-            with connection.cursor() as cursor:
-                db_engine = connection.vendor
-                if db_engine == 'sqlite':
-                    # For SQLite
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='generator_category';")
-                    table_exists = cursor.fetchone() is not None
-                else:
-                    # For PostgreSQL and others
-                    cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables
-                        WHERE table_schema = 'public'
-                        AND table_name = 'generator_category'
-                    )
-                    """)
-                    table_exists = cursor.fetchone()[0]
-                
-                if not table_exists:
-                    # Table doesn't exist, create it
-                    categories_exist = False
-                else:
-                    # Check if there are records
-                    try:
-                        categories = Category.objects.all()
-                        categories_exist = categories.exists()
-                    except:
-                        categories_exist = False
-        except Exception:
-            categories_exist = False
-            
-        # If categories don't exist or the table doesn't exist, create them    
-        if not categories_exist:
-            # Try to manually create the tables
+        # Schema and seed data are verified once per worker, not per request
+        categories = None
+        if readiness.is_ready():
             try:
-                with connection.cursor() as cursor:
-                    # Check database type - SQLite vs PostgreSQL
-                    db_engine = connection.vendor
-                    
-                    # Create appropriate SQL for the database engine
-                    if db_engine == 'sqlite':
-                        id_field = "id INTEGER PRIMARY KEY AUTOINCREMENT"
-                    else:  # postgresql or others
-                        id_field = "id SERIAL PRIMARY KEY"
-                    
-                    # Create Category table
-                    cursor.execute(f'''
-                    CREATE TABLE IF NOT EXISTS generator_category (
-                        {id_field}, 
-                        name VARCHAR(100) NOT NULL, 
-                        slug VARCHAR(50) NOT NULL UNIQUE
-                    )
-                    ''')
-                    
-                    # Create PromptTemplate table
-                    cursor.execute(f'''
-                    CREATE TABLE IF NOT EXISTS generator_prompttemplate (
-                        {id_field},
-                        name VARCHAR(200) NOT NULL,
-                        template TEXT NOT NULL,
-                        category_id INTEGER NOT NULL REFERENCES generator_category(id)
-                    )
-                    ''')
-                    
-                    # Create Keyword table
-                    cursor.execute(f'''
-                    CREATE TABLE IF NOT EXISTS generator_keyword (
-                        {id_field},
-                        text VARCHAR(100) NOT NULL,
-                        popularity INTEGER NOT NULL DEFAULT 0,
-                        related_keywords TEXT NOT NULL DEFAULT '',
-                        category_id INTEGER NOT NULL REFERENCES generator_category(id)
-                    )
-                    ''')
-                    
-                    # Insert statement also needs to be adapted to the DB engine
-                    if db_engine == 'sqlite':
-                        insert_category_sql = "INSERT OR IGNORE INTO generator_category (name, slug) VALUES (?, ?)"
-                        insert_template_sql = "INSERT OR IGNORE INTO generator_prompttemplate (name, template, category_id) VALUES (?, ?, ?)"
-                        insert_keyword_sql = "INSERT OR IGNORE INTO generator_keyword (text, category_id, popularity, related_keywords) VALUES (?, ?, ?, ?)"
-                    else:
-                        # For PostgreSQL
-                        insert_category_sql = """
-                        INSERT INTO generator_category (name, slug)
-                        VALUES (%s, %s)
-                        ON CONFLICT (slug) DO NOTHING
-                        """
-                        insert_template_sql = """
-                        INSERT INTO generator_prompttemplate (name, template, category_id)
-                        VALUES (%s, %s, %s)
-                        ON CONFLICT DO NOTHING
-                        """
-                        insert_keyword_sql = """
-                        INSERT INTO generator_keyword (text, category_id, popularity, related_keywords)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT DO NOTHING
-                        """
-                    
-                    # Insert some basic categories
-                    categories_data = [
-                        ("ChatGPT", "chatgpt"),
-                        ("Midjourney", "midjourney"),
-                        ("Blogging / SEO", "blogging-seo"),
-                        ("Coding", "coding"),
-                        ("Social Media", "social-media")
-                    ]
-                    
-                    for name, slug in categories_data:
-                        try:
-                            cursor.execute(insert_category_sql, (name, slug))
-                        except Exception as e:
-                            pass  # Continue with other inserts
-                    
-                    # Insert some basic templates
-                    templates_data = [
-                        ("Basic Template", "Write about {topic} in detail.", 1),
-                        ("Art Creation", "Create an image of {topic} with vibrant colors.", 2),
-                        ("Blog Post", "Write a blog post about {topic} with SEO optimization.", 3),
-                        ("Code Example", "Write a code example for {topic}.", 4),
-                        ("Social Post", "Create an engaging social media post about {topic}.", 5)
-                    ]
-                    
-                    for name, template, category_id in templates_data:
-                        try:
-                            cursor.execute(insert_template_sql, (name, template, category_id))
-                        except Exception as e:
-                            pass  # Continue with other inserts
-                    
-                    # Insert some basic keywords
-                    keywords_data = [
-                        ("AI assistant", 1, 10, "virtual assistant, chatbot"),
-                        ("Digital art", 2, 10, "digital painting, artwork"),
-                        ("Content marketing", 3, 10, "content strategy, marketing"),
-                        ("Python", 4, 10, "programming, coding"),
-                        ("Instagram", 5, 10, "social media, posts")
-                    ]
-                    
-                    for text, category_id, popularity, related in keywords_data:
-                        try:
-                            cursor.execute(insert_keyword_sql, (text, category_id, popularity, related))
-                        except Exception as e:
-                            pass  # Continue with other inserts
-            except Exception as db_error:
-                # For fallback, use our hardcoded data
-                pass
-
-        # Get categories for display
-        try:
-            categories = Category.objects.all()
-            if not categories.exists():
-                # Create basic categories using ORM
-                category_names = ["ChatGPT", "Midjourney", "Blogging / SEO", "Coding", "Social Media"]
-                for name in category_names:
-                    Category.objects.create(name=name, slug=slugify(name))
-                categories = Category.objects.all()
-            
-            return render(request, 'home.html', {'categories': categories})
-        except Exception as model_error:
+                categories = get_categories()
+            except DatabaseError:
+                categories = None
+        
+        if not categories:
             # If we can't use the ORM, fallback to hardcoded categories
-            hardcoded_categories = []
-            default_categories = Category.get_default_categories()
-            for cat in default_categories:
-                hardcoded_categories.append({'name': cat['name'], 'slug': cat['slug']})
-                
-            return render(request, 'home.html', {'categories': hardcoded_categories})
+            record_fallback('home')
+            categories = [
+                {'name': cat['name'], 'slug': cat['slug']}
+                for cat in Category.get_default_categories()
+            ]
+        
+        return render(request, 'home.html', {'categories': categories})
     except Exception as e:
         # Last resort: render emergency HTML
         error_info = str(e)
@@ -215,44 +76,129 @@ def home(request):
         """
         return HttpResponse(emergency_html)
 
+def healthz(request):
+    """Liveness probe: the worker is up and serving requests"""
+    return JsonResponse({'status': 'ok'})
+
+def readyz(request):
+    """Readiness probe: schema and seed data are in place"""
+    status = readiness.status
+    if not status['ready']:
+        status = readiness.check()
+    return JsonResponse(status, status=200 if status['ready'] else 503)
+
+def _internal_access_denied(request):
+    """Error response unless the request passes the /metrics gate, else None
+
+    Not served unless METRICS_ALLOWED_IPS or METRICS_TOKEN is set. Requests
+    must come from an allowed address when the list is set, and carry
+    ``Authorization: Bearer <METRICS_TOKEN>`` when the token is set.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if not token and not allowed_ips:
+        return HttpResponse(status=404)
+    if allowed_ips and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponse(status=403)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return None
+
+def internal_timings(request):
+    """Per-view request timings of this worker process; POST resets them
+
+    Only available to staff users and to clients that may scrape /metrics,
+    whatever DEBUG is set to.
+    """
+    if not request.user.is_staff:
+        denied = _internal_access_denied(request)
+        if denied is not None:
+            return denied
+    views = timing_stats.snapshot()
+    if request.method == 'POST':
+        timing_stats.reset()
+    return JsonResponse({'pid': os.getpid(), 'views': views})
+
+def metrics(request):
+    """Prometheus exposition of the metrics of every worker on this host
+
+    Gated by METRICS_ALLOWED_IPS and METRICS_TOKEN; see _internal_access_denied().
+    """
+    denied = _internal_access_denied(request)
+    if denied is not None:
+        return denied
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+def _sitemap_base_url(request):
+    return (getattr(settings, 'SITEMAP_BASE_URL', '') or request.build_absolute_uri('/')).rstrip('/')
+
+def _sitemap_response(request, document):
+    """XML response from a (gzip-compressed body, ETag) document
+
+    The body is sent as is when the client accepts gzip. Each encoding is a
+    different representation with its own ETag.
+    """
+    body, etag = document
+    gzipped = 'gzip' in accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    etag = f'"{etag}-gzip"' if gzipped else f'"{etag}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body if gzipped else gzip.decompress(body), content_type='application/xml')
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'CATALOG_HTTP_MAX_AGE', 0), must_revalidate=True)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+@reads_from_replica()
+def sitemap_index(request):
+    """Sitemap index over the sitemaps of the catalog"""
+    return _sitemap_response(request, sitemaps.index(_sitemap_base_url(request)))
+
+@reads_from_replica()
+def sitemap_section(request, number):
+    """One sitemap of up to SITEMAP_URLS_PER_FILE catalog URLs"""
+    try:
+        document = sitemaps.section(_sitemap_base_url(request), number)
+    except (OperationalError, ProgrammingError):
+        record_fallback('sitemap')
+        return HttpResponse(status=503)
+    if document is None:
+        return HttpResponse(status=404)
+    return _sitemap_response(request, document)
+
+def _default_trending_topics(category_slug):
+    """Trending topics from the hardcoded defaults"""
+    topics = []
+    default_categories = {cat['id']: cat for cat in Category.get_default_categories()}
+    
+    for keyword in Keyword.get_default_keywords():
+        category = default_categories.get(keyword['category_id'])
+        if category and (not category_slug or category_slug == category['slug']):
+            topics.append({
+                'text': keyword['text'],
+                'category': category['name'],
+                'category_slug': category['slug'],
+                'popularity': keyword['popularity']
+            })
+    return topics
+
+@conditional_on_catalog()
+@reads_from_replica()
 def get_trending_topics(request):
     """API endpoint to get trending topics across all categories or for a specific category"""
     category_slug = request.GET.get('category')
     
     try:
-        # Get top keywords by popularity
+        # Served from the in-memory leaderboard, never a full-table sort
         try:
-            if category_slug:
-                # For a specific category
-                category = Category.objects.get(slug=category_slug)
-                trending = Keyword.objects.filter(category=category).order_by('-popularity')[:8]
-            else:
-                # Across all categories
-                trending = Keyword.objects.order_by('-popularity')[:12]
-                
-            # Format the response
-            topics = []
-            for keyword in trending:
-                topics.append({
-                    'text': keyword.text,
-                    'category': keyword.category.name,
-                    'category_slug': keyword.category.slug,
-                    'popularity': keyword.popularity
-                })
+            topics = leaderboard.top(category_slug)
         except (OperationalError, ProgrammingError):
             # Fallback to hardcoded data if database tables don't exist
-            topics = []
-            default_categories = {cat['id']: cat for cat in Category.get_default_categories()}
-            
-            for keyword in Keyword.get_default_keywords():
-                category = default_categories.get(keyword['category_id'])
-                if category and (not category_slug or category_slug == category['slug']):
-                    topics.append({
-                        'text': keyword['text'],
-                        'category': category['name'],
-                        'category_slug': category['slug'],
-                        'popularity': keyword['popularity']
-                    })
+            record_fallback('trending_topics')
+            topics = _default_trending_topics(category_slug)
             
         return JsonResponse({'topics': topics})
     except Category.DoesNotExist:
@@ -260,6 +206,47 @@ def get_trending_topics(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+def _search_keywords_in_db(category, query):
+    """Match keywords of a category against the query directly in the database"""
+    return keyword_search().search(category, query)
+
+def _default_suggestions(category_slug, query):
+    """Keyword suggestions from the hardcoded defaults"""
+    default_categories = {cat['slug']: cat for cat in Category.get_default_categories()}
+    if category_slug not in default_categories:
+        raise Category.DoesNotExist(category_slug)
+        
+    default_keywords = Keyword.get_default_keywords()
+    category_id = default_categories[category_slug]['id']
+    
+    # Filter keywords for this category
+    category_keywords = [k for k in default_keywords if k['category_id'] == category_id]
+    
+    # If query is too short, return all keywords
+    if len(query) < 3:
+        return [
+            {'text': k['text'], 'popularity': k['popularity']} 
+            for k in category_keywords
+        ]
+    
+    # Simple text matching for suggestions
+    matching_keywords = [k for k in category_keywords if query.lower() in k['text'].lower()]
+    suggestions = [
+        {'text': k['text'], 'popularity': k['popularity']} 
+        for k in matching_keywords
+    ]
+    
+    # If no suggestions, use the query itself
+    if not suggestions:
+        suggestions = [{'text': query.capitalize(), 'popularity': 1}]
+    return suggestions
+
+def _is_short_query(request):
+    """Short keyword queries list the top keywords; longer ones may record popularity"""
+    return len(request.GET.get('query', '').strip()) < 3
+
+@conditional_on_catalog(etag_if=_is_short_query)
+@reads_from_replica(when=_is_short_query)
 def get_keywords_by_category(request):
     """API endpoint to get keywords suggestions based on selected category and optional query"""
     category_slug = request.GET.get('category')
@@ -281,87 +268,37 @@ def get_keywords_by_category(request):
                 ]
                 return JsonResponse({'suggestions': suggestions})
             
-            # Start with direct matches on keyword text or related keywords
-            exact_keywords = Keyword.objects.filter(
-                category=category,
-                text__icontains=query
-            ).order_by('-popularity')
-            
-            # Find keywords that contain query in their related_keywords
-            related_matches = []
-            for keyword in Keyword.objects.filter(category=category):
-                if any(query in related.lower() for related in keyword.get_related_keywords_list()):
-                    related_matches.append(keyword)
-            
-            # Find keywords with partial word matches (e.g., "python code" should match "code")
-            words = re.findall(r'\w+', query)
-            partial_matches = Keyword.objects.filter(
-                category=category
-            ).exclude(
-                id__in=[k.id for k in exact_keywords]
-            ).exclude(
-                id__in=[k.id for k in related_matches]
-            ).filter(
-                reduce(lambda x, y: x | y, [Q(text__icontains=word) for word in words])
-            ).order_by('-popularity')
-            
-            # Combine and limit results
-            all_keywords = list(exact_keywords) + related_matches + list(partial_matches)
-            unique_keywords = []
-            seen_ids = set()
-            
-            for keyword in all_keywords:
-                if keyword.id not in seen_ids:
-                    seen_ids.add(keyword.id)
-                    unique_keywords.append(keyword)
+            if suggestion_index.enabled:
+                suggestions = [
+                    {'text': text, 'popularity': popularity}
+                    for text, popularity in suggestion_index.search(category.id, query)
+                ]
+            else:
+                suggestions = [
+                    {'text': keyword.text, 'popularity': keyword.popularity}
+                    for keyword in _search_keywords_in_db(category, query)[:10]
+                ]
             
-            suggestions = [
-                {'text': keyword.text, 'popularity': keyword.popularity} 
-                for keyword in unique_keywords[:10]
-            ]
+            # Nothing contains the query; it may be a typo of an existing keyword
+            if not suggestions and query and suggestion_index.enabled:
+                suggestions = [
+                    {'text': text, 'popularity': popularity}
+                    for text, popularity in suggestion_index.fuzzy_search(category.id, query)
+                ]
+                if suggestions:
+                    popularity_buffer.record(category.id, suggestions[0]['text'])
             
             # If we still don't have enough suggestions, create one from the query
             if not suggestions and query:
                 # Create suggestion from query and store for future
-                new_keyword, created = Keyword.objects.get_or_create(
-                    text=query.capitalize(),
-                    category=category,
-                    defaults={'popularity': 1}
-                )
-                if not created:
-                    new_keyword.popularity += 1
-                    new_keyword.save()
-                    
-                suggestions = [{'text': new_keyword.text, 'popularity': new_keyword.popularity}]
+                text = query.capitalize()
+                popularity_buffer.record(category.id, text)
+                popularity = popularity_buffer.popularity(category.id, text)
+                suggestions = [{'text': text, 'popularity': popularity}]
         except (OperationalError, ProgrammingError):
             # Fallback to hardcoded data
-            default_categories = {cat['slug']: cat for cat in Category.get_default_categories()}
-            if category_slug not in default_categories:
-                return JsonResponse({'error': 'Category not found'}, status=404)
-                
-            default_keywords = Keyword.get_default_keywords()
-            category_id = default_categories[category_slug]['id']
-            
-            # Filter keywords for this category
-            category_keywords = [k for k in default_keywords if k['category_id'] == category_id]
-            
-            # If query is too short, return all keywords
-            if len(query) < 3:
-                suggestions = [
-                    {'text': k['text'], 'popularity': k['popularity']} 
-                    for k in category_keywords
-                ]
-            else:
-                # Simple text matching for suggestions
-                matching_keywords = [k for k in category_keywords if query.lower() in k['text'].lower()]
-                suggestions = [
-                    {'text': k['text'], 'popularity': k['popularity']} 
-                    for k in matching_keywords
-                ]
-                
-                # If no suggestions, use the query itself
-                if not suggestions:
-                    suggestions = [{'text': query.capitalize(), 'popularity': 1}]
+            record_fallback('get_keywords')
+            suggestions = _default_suggestions(category_slug, query)
         
         return JsonResponse({'suggestions': suggestions})
     except Category.DoesNotExist:
@@ -369,6 +306,76 @@ def get_keywords_by_category(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+def _request_seed(data):
+    """Return (seed, seeded) for a generate request
+
+    ``seeded`` is False when the request gave no seed and a random one was
+    drawn. Raises ValueError for anything but a short string or integer.
+    """
+    seed = data.get('seed', data.get('variant'))
+    if seed is None:
+        return random_seed(), False
+    if isinstance(seed, bool) or not isinstance(seed, (int, str)) or len(str(seed)) > 64:
+        raise ValueError('Invalid seed')
+    return seed, True
+
+def _render_prompts(compiled, topic, seed):
+    """Render 2-3 templates of a category for a topic, selected by the seed"""
+    rng = random.Random(str(seed))
+    count = rng.randint(2, 3)
+    selected_templates = rng.sample(compiled.templates, min(count, len(compiled.templates)))
+    return [
+        {
+            'id': template.id,
+            'name': template.name,
+            'generatedContent': template.render(topic)
+        }
+        for template in selected_templates
+    ]
+
+def _cached_prompts(compiled, topic, seed, seeded=True):
+    """Rendered prompts for a topic, from the LRU cache for client-chosen seeds
+
+    Random seeds rarely repeat, so their prompts are rendered without caching.
+    """
+    if not seeded:
+        return _render_prompts(compiled, topic, seed)
+    key = (compiled.category_id, topic, str(seed), compiled.digest)
+    prompts = prompt_cache.get(key)
+    if prompts is None:
+        prompts = _render_prompts(compiled, topic, seed)
+        prompt_cache.set(key, prompts)
+    return prompts
+
+def _default_prompts(category_slug, topic, seed):
+    """Prompts rendered from the hardcoded default templates"""
+    default_categories = {cat['slug']: cat for cat in Category.get_default_categories()}
+    default_templates = PromptTemplate.get_default_templates()
+    
+    if category_slug not in default_categories:
+        raise Category.DoesNotExist(category_slug)
+        
+    category_id = default_categories[category_slug]['id']
+    
+    # Filter templates for this category
+    category_templates = [t for t in default_templates if t['category_id'] == category_id]
+    
+    # Select 2-3 templates
+    rng = random.Random(str(seed))
+    count = rng.randint(2, 3)
+    selected_templates = rng.sample(category_templates, min(count, len(category_templates)))
+    
+    # Generate prompts
+    prompts = []
+    for template in selected_templates:
+        generated_content = template['template'].replace('{topic}', topic)
+        prompts.append({
+            'id': template['id'],
+            'name': template['name'],
+            'generatedContent': generated_content
+        })
+    return prompts
+
 def generate_prompts(request):
     """API endpoint to generate prompts based on topic and category"""
     if request.method == 'POST':
@@ -376,75 +383,38 @@ def generate_prompts(request):
             data = json.loads(request.body)
             topic = data.get('topic')
             category_slug = data.get('category')
+            if isinstance(topic, str):
+                topic = normalize_topic(topic)
             
             if not topic or not category_slug:
                 return JsonResponse({'error': 'Both topic and category are required'}, status=400)
             
             try:
-                # Regular database approach
-                category = Category.objects.get(slug=category_slug)
+                seed, seeded = _request_seed(data)
+            except ValueError:
+                return JsonResponse({'error': 'Invalid seed'}, status=400)
+            
+            try:
+                # Compiled templates are cached per category, so the steady
+                # state needs no queries at all
+                compiled = template_cache.get(category_slug)
                 
                 # Increment keyword popularity or create new keyword
-                keyword, created = Keyword.objects.get_or_create(
-                    text=topic,
-                    category=category,
-                    defaults={'popularity': 1}
-                )
+                popularity_buffer.record(compiled.category_id, topic)
                 
-                if not created:
-                    keyword.popularity += 1
-                    keyword.save()
-                
-                # Get templates for this category
-                templates = PromptTemplate.objects.filter(category=category)
-                
-                if not templates.exists():
+                if not compiled.templates:
                     return JsonResponse({'error': 'No templates found for this category'}, status=404)
                 
-                # Randomly select 2-3 templates
-                count = random.randint(2, 3)
-                selected_templates = random.sample(list(templates), min(count, templates.count()))
-                
-                # Generate prompts
-                prompts = []
-                for template in selected_templates:
-                    generated_content = template.template.replace('{topic}', topic)
-                    prompts.append({
-                        'id': template.id,
-                        'name': template.name,
-                        'generatedContent': generated_content
-                    })
+                prompts = _cached_prompts(compiled, topic, seed, seeded)
             except (OperationalError, ProgrammingError):
                 # Fallback to hardcoded data
-                default_categories = {cat['slug']: cat for cat in Category.get_default_categories()}
-                default_templates = PromptTemplate.get_default_templates()
-                
-                if category_slug not in default_categories:
-                    return JsonResponse({'error': 'Category not found'}, status=404)
-                    
-                category_id = default_categories[category_slug]['id']
+                record_fallback('generate_prompts')
+                prompts = _default_prompts(category_slug, topic, seed)
                 
-                # Filter templates for this category
-                category_templates = [t for t in default_templates if t['category_id'] == category_id]
-                
-                if not category_templates:
+                if not prompts:
                     return JsonResponse({'error': 'No templates found for this category'}, status=404)
-                
-                # Randomly select 2-3 templates
-                count = random.randint(2, 3)
-                selected_templates = random.sample(category_templates, min(count, len(category_templates)))
-                
-                # Generate prompts
-                prompts = []
-                for template in selected_templates:
-                    generated_content = template['template'].replace('{topic}', topic)
-                    prompts.append({
-                        'id': template['id'],
-                        'name': template['name'],
-                        'generatedContent': generated_content
-                    })
             
-            return JsonResponse({'prompts': prompts})
+            return JsonResponse({'prompts': prompts, 'seed': seed})
         except Category.DoesNotExist:
             return JsonResponse({'error': 'Category not found'}, status=404)
         except json.JSONDecodeError:
@@ -454,79 +424,158 @@ def generate_prompts(request):
     
     return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
 
+def _iter_ndjson_items(request):
+    """Yield the items of an NDJSON batch, read line by line from the request stream
+
+    Lines that cannot be parsed are yielded as None.
+    """
+    for line in request:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield None
+
+def _batch_result(item, resolved):
+    """Prompts or an error for one batch item; ``resolved`` caches categories by slug"""
+    if item is None:
+        return {'error': 'Invalid JSON'}
+    if not isinstance(item, dict) or not item.get('topic') or not item.get('category'):
+        return {'error': 'Both topic and category are required'}
+    topic = item['topic']
+    category_slug = item['category']
+    if not isinstance(topic, str) or not isinstance(category_slug, str):
+        return {'error': 'Topic and category must be strings'}
+    topic = normalize_topic(topic)
+    result = {'topic': topic, 'category': category_slug}
+    
+    try:
+        seed, seeded = _request_seed(item)
+    except ValueError:
+        return {**result, 'error': 'Invalid seed'}
+    
+    try:
+        if category_slug not in resolved:
+            try:
+                resolved[category_slug] = template_cache.get(category_slug)
+            except Category.DoesNotExist:
+                resolved[category_slug] = None
+        compiled = resolved[category_slug]
+        if compiled is None:
+            return {**result, 'error': 'Category not found'}
+        if not compiled.templates:
+            return {**result, 'error': 'No templates found for this category'}
+        prompts = _cached_prompts(compiled, topic, seed, seeded)
+        popularity_buffer.record(compiled.category_id, topic)
+    except (OperationalError, ProgrammingError):
+        record_fallback('generate_prompts_batch')
+        return {**result, 'error': 'Service unavailable'}
+    return {**result, 'prompts': prompts, 'seed': seed}
+
+def _batch_max_items():
+    return getattr(settings, 'BATCH_MAX_ITEMS', 50)
+
+def _stream_batch_prompts(items):
+    """Generate one NDJSON line per batch item, resolving each category once
+
+    Reading stops with an error line at the first item past BATCH_MAX_ITEMS.
+    """
+    resolved = {}
+    for index, item in enumerate(items):
+        if index >= _batch_max_items():
+            yield json.dumps({'index': index, 'error': f'At most {_batch_max_items()} items per batch'}) + '\n'
+            return
+        yield json.dumps({'index': index, **_batch_result(item, resolved)}) + '\n'
+
+def generate_prompts_batch(request):
+    """API endpoint to generate prompts for many {topic, category} pairs at once
+
+    Results are streamed back as NDJSON, one line per item in request order,
+    so the first prompts arrive before the whole batch has been rendered.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+    
+    if request.content_type == 'application/x-ndjson':
+        items = _iter_ndjson_items(request)
+    else:
+        # A JSON list of items or an object with an "items" list, parsed up
+        # front so malformed input gets a 400
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        items = data.get('items', []) if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        if len(items) > _batch_max_items():
+            return JsonResponse({'error': f'At most {_batch_max_items()} items per batch'}, status=400)
+    
+    return StreamingHttpResponse(_stream_batch_prompts(items), content_type='application/x-ndjson')
+
+def _question_prompts(templates, topic):
+    """Render question templates for the given topic"""
+    return [
+        {
+            'name': template.name,
+            'generatedContent': template.render(topic)
+        }
+        for template in templates
+    ]
+
+def _topic_category_query(topic):
+    """Category ids of the keywords matching a topic, most popular first
+
+    Matches on LOWER(text), which the keyword_text_lower index covers.
+    """
+    return (
+        Keyword.objects.alias(text_lower=Lower('text'))
+        .filter(text_lower=topic.lower())
+        .order_by('-popularity')
+        .values_list('category_id', flat=True)
+    )
+
+def _first_category_query():
+    return Category.objects.order_by('id').values_list('id', flat=True)
+
 def generate_question_prompts(request):
     """API endpoint to generate multiple question-based prompts for a given keyword"""
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             topic = data.get('topic')
+            category_slug = data.get('category')
             
-            if not topic:
+            if not topic or not isinstance(topic, str):
                 return JsonResponse({'error': 'Topic is required'}, status=400)
+            topic = normalize_topic(topic)
             
-            # Create a set of question templates for the given topic
-            question_templates = [
-                {
-                    'name': 'What is',
-                    'generatedContent': f"What is {topic}? Provide a detailed explanation with examples."
-                },
-                {
-                    'name': 'Why important',
-                    'generatedContent': f"Why is {topic} important or significant? Explain its relevance and impact."
-                },
-                {
-                    'name': 'How to use',
-                    'generatedContent': f"How to use {topic} effectively? Provide practical steps and best practices."
-                },
-                {
-                    'name': 'Compare',
-                    'generatedContent': f"Compare {topic} with its alternatives. What are the advantages and disadvantages?"
-                },
-                {
-                    'name': 'History',
-                    'generatedContent': f"What is the history and evolution of {topic}? How has it developed over time?"
-                },
-                {
-                    'name': 'Future trends',
-                    'generatedContent': f"What are the future trends and developments in {topic}? How might it evolve?"
-                },
-                {
-                    'name': 'Common misconceptions',
-                    'generatedContent': f"What are common misconceptions about {topic}? Clarify these with accurate information."
-                },
-                {
-                    'name': 'For beginners',
-                    'generatedContent': f"Explain {topic} for complete beginners. Use simple language and analogies."
-                }
-            ]
-            
-            # Track keyword usage
             try:
-                # Try to find a suitable category for this topic
-                keywords = Keyword.objects.filter(text__icontains=topic)
-                if keywords.exists():
-                    # Use the most popular matching category
-                    keyword = keywords.order_by('-popularity').first()
-                    category = keyword.category
+                if category_slug:
+                    category_id = template_cache.get(category_slug).category_id
                 else:
-                    # Default to first category if no match
-                    category = Category.objects.first()
+                    # Guess the category from the topic's words. With the classifier
+                    # disabled, use the most popular exact match or the first one
+                    category_id = (
+                        topic_classifier.classify(topic)
+                        or _topic_category_query(topic).first()
+                        or _first_category_query().first()
+                    )
                 
-                # Update keyword popularity
-                keyword, created = Keyword.objects.get_or_create(
-                    text=topic,
-                    category=category,
-                    defaults={'popularity': 1}
-                )
+                templates = template_cache.questions().for_category(category_id)
                 
-                if not created:
-                    keyword.popularity += 1
-                    keyword.save()
-            except:
-                # If database operations fail, continue without tracking
-                pass
+                # Track keyword usage
+                if category_id:
+                    popularity_buffer.record(category_id, topic)
+            except (OperationalError, ProgrammingError):
+                record_fallback('generate_question_prompts')
+                templates = DEFAULT_QUESTION_TEMPLATES.for_category(None)
             
-            return JsonResponse({'prompts': question_templates})
+            return JsonResponse({'prompts': _question_prompts(templates, topic)})
+        except Category.DoesNotExist:
+            return JsonResponse({'error': 'Category not found'}, status=404)
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
         except Exception as e:
@@ -0,0 +1,64 @@
+"""Filling the per-process caches before a worker takes traffic.
+
+With gunicorn's ``preload_app`` (see ``gunicorn.conf.py``) ``warm_up()`` runs
+once in the master, and every forked worker starts with the categories,
+compiled templates, suggestion indexes, trending boards and topic classifier
+already in memory instead of loading them on its first requests.
+"""
+import logging
+import time
+
+from django.db import DatabaseError, connections
+
+from .catalog import get_categories
+from .classifier import topic_classifier
+from .leaderboard import leaderboard
+from .models import Category
+from .readiness import readiness
+from .suggestions import suggestion_index
+from .template_cache import template_cache
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Load the in-process caches; returns whether it succeeded"""
+    started = time.perf_counter()
+    if not readiness.check()['ready']:
+        logger.warning('Skipping cache warm-up: %s', readiness.status)
+        return False
+    try:
+        get_categories()
+        categories = list(Category.objects.values_list('id', 'slug'))
+        for category_id, slug in categories:
+            template_cache.get(slug)
+            if suggestion_index.enabled:
+                suggestion_index.for_category(category_id)
+        template_cache.questions()
+        leaderboard.rebuild_all()
+        if topic_classifier.enabled:
+            topic_classifier.model()
+    except DatabaseError as e:
+        logger.warning('Cache warm-up failed: %s', e)
+        return False
+    logger.info('Warmed up caches for %d categories in %.2fs', len(categories), time.perf_counter() - started)
+    return True
+
+
+def open_connections():
+    """Connect the current thread to every database that keeps connections open
+
+    Databases with CONN_MAX_AGE = 0 close their connection at the start of
+    each request anyway, so they are skipped.
+    """
+    opened = []
+    for alias in connections:
+        connection = connections[alias]
+        if not connection.settings_dict.get('CONN_MAX_AGE'):
+            continue
+        try:
+            connection.ensure_connection()
+            opened.append(alias)
+        except DatabaseError as e:
+            logger.warning('Could not connect to database %s: %s', alias, e)
+    return opened
@@ -0,0 +1,97 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py prompt_generator.wsgi
+
+The app is imported once in the master (``preload_app``) and its in-process
+caches are warmed there before any worker forks, so workers share that
+memory copy-on-write and none of them serves its first requests cold. Each
+worker then opens its own database connections before taking traffic.
+
+Worker and thread counts follow the CPUs available to the process, including
+container CPU quotas; ``WEB_CONCURRENCY`` and ``GUNICORN_THREADS`` override
+them.
+"""
+import math
+import os
+import shutil
+import threading
+
+
+def available_cpus():
+    """CPUs this process may use, honouring affinity and a cgroup v2 quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+cpus = available_cpus()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+# One process per core for the GIL, plus one to cover a worker restarting;
+# threads overlap the waits on the database within a process
+workers = int(os.environ.get('WEB_CONCURRENCY', cpus + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', min(8, max(2, 2 * cpus))))
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Counters of the previous run's workers must not be added to this one's
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir and os.path.isdir(multiproc_dir):
+        for name in os.listdir(multiproc_dir):
+            path = os.path.join(multiproc_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before forking
+    from django.db import connections
+    from generator.warmup import warm_up
+
+    if warm_up():
+        server.log.info('In-process caches warmed up')
+    else:
+        server.log.warning('Cache warm-up failed; workers will load caches on demand')
+    # Forked workers must not share the master's sockets
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    from generator.warmup import open_connections
+
+    pool = getattr(worker, 'tpool', None)
+    if pool is None:
+        open_connections()
+        return
+    # Django connections are per thread: hold every pool thread at a barrier
+    # so that each of them opens its own
+    barrier = threading.Barrier(worker.cfg.threads)
+
+    def connect():
+        open_connections()
+        try:
+            barrier.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+
+    for future in [pool.submit(connect) for _ in range(worker.cfg.threads)]:
+        future.result()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
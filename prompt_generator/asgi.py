@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'prompt_generator.settings')
 
 application = get_asgi_application()
+
+# Verify schema and seed data once per worker instead of on every request
+from generator.readiness import readiness  # noqa: E402
+
+readiness.check_at_startup()
@@ -0,0 +1,109 @@
+"""In-memory serving of the small files crawlers fetch from the site root.
+
+Each file is read once, together with its gzip and brotli variants and a
+content hash for the ETag, and only read again when its modification time
+changes. The file is stat'ed at most every ``STAT_INTERVAL`` seconds.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+import brotli
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+from generator.http import accepted_encodings
+
+STAT_INTERVAL = 1.0
+
+
+class _Loaded:
+    __slots__ = ('key', 'etag', 'last_modified', 'variants')
+
+    def __init__(self, key, data, mtime):
+        self.key = key
+        self.etag = hashlib.sha256(data).hexdigest()[:32]
+        self.last_modified = http_date(mtime)
+        # Precompressed bodies by content coding, kept only when smaller
+        self.variants = {'identity': data}
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            self.variants['gzip'] = compressed
+        compressed = brotli.compress(data)
+        if len(compressed) < len(data):
+            self.variants['br'] = compressed
+
+
+class RootFile:
+    """A file served from memory with ETag, Cache-Control and 304 handling
+
+    ``paths`` returns the candidate locations, first existing one wins; it is
+    called on reload so the settings are read at request time.
+    """
+
+    def __init__(self, paths, content_type):
+        self.paths = paths
+        self.content_type = content_type
+        self._loaded = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        for path in self.paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            return path, stat
+        raise FileNotFoundError(f'None of {self.paths()} exists')
+
+    def load(self):
+        loaded = self._loaded
+        if loaded is not None and time.monotonic() - self._checked_at < STAT_INTERVAL:
+            return loaded
+        with self._lock:
+            path, stat = self._stat()
+            key = (path, stat.st_mtime_ns, stat.st_size)
+            if self._loaded is None or self._loaded.key != key:
+                with open(path, 'rb') as f:
+                    self._loaded = _Loaded(key, f.read(), stat.st_mtime)
+            self._checked_at = time.monotonic()
+            return self._loaded
+
+    def response(self, request):
+        try:
+            loaded = self.load()
+        except FileNotFoundError:
+            raise Http404
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        coding = next((c for c in ('br', 'gzip') if c in loaded.variants and c in accepted), 'identity')
+        # Each encoding is a different representation with its own ETag
+        etag = f'"{loaded.etag}"' if coding == 'identity' else f'"{loaded.etag}-{coding}"'
+
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if '*' in if_none_match or etag in (tag.removeprefix('W/') for tag in if_none_match):
+            response = HttpResponseNotModified()
+        else:
+            body = loaded.variants[coding]
+            response = HttpResponse(body, content_type=self.content_type)
+            response['Content-Length'] = str(len(body))
+            if coding != 'identity':
+                response['Content-Encoding'] = coding
+        response['ETag'] = etag
+        response['Last-Modified'] = loaded.last_modified
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'ROOT_FILES_MAX_AGE', 3600)}"
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def _candidates(setting, name):
+    return lambda: [getattr(settings, setting), os.path.join(settings.STATIC_ROOT, name)]
+
+
+robots_txt = RootFile(_candidates('ROBOTS_TXT_PATH', 'robots.txt'), 'text/plain')
+sitemap_xml = RootFile(_candidates('SITEMAP_XML_PATH', 'sitemap.xml'), 'application/xml')
+ads_txt = RootFile(_candidates('ADS_TXT_PATH', 'ads.txt'), 'text/plain')
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config, Csv
 import dj_database_url
 
@@ -44,8 +45,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'generator.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'generator.middleware.AdmissionControlMiddleware',
+    'generator.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,6 +78,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'prompt_generator.wsgi.application'
 
+# Route the JSON APIs to the native async views in generator/async_views.py.
+# Only useful when serving prompt_generator.asgi (see DEPLOYMENT.md).
+ASYNC_API_VIEWS = config('ASYNC_API_VIEWS', default=False, cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -104,6 +112,27 @@ if db_url:
         print(f"Error configuring database from URL: {str(e)}")
         print("Using SQLite database as fallback")
 
+# Read replicas for the read-only views (home, trending and short keyword
+# queries), as a comma-separated list of database URLs. They become the
+# databases "replica1", "replica2", ... and are skipped while unreachable or
+# more than REPLICA_MAX_LAG seconds behind, as probed every
+# REPLICA_HEALTH_CHECK_INTERVAL seconds. A client that wrote reads from the
+# primary for the next REPLICA_PIN_SECONDS; keep it above the popularity
+# flush interval plus the usual lag.
+DATABASE_REPLICAS = []
+for number, replica_url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), 1):
+    replica = dj_database_url.parse(replica_url, conn_max_age=600, conn_health_checks=True)
+    if replica['ENGINE'] == 'django.db.backends.postgresql':
+        replica['OPTIONS'] = {'options': '-c search_path=public'}
+    # Tests read replica queries through the primary's test database
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica{number}'] = replica
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['generator.replicas.ReplicaRouter']
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=10, cast=float)
+REPLICA_HEALTH_CHECK_INTERVAL = config('REPLICA_HEALTH_CHECK_INTERVAL', default=10, cast=float)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -148,9 +177,150 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Whitenoise settings
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-# Serve robots.txt and sitemap.xml from the root URL
+# Serve robots.txt, sitemap.xml and ads.txt from the root URL. They are kept
+# in memory (re-read when the file changes) and may be cached by clients and
+# proxies for ROOT_FILES_MAX_AGE seconds, with gzip and brotli copies
+# prepared once per file version.
 ROBOTS_TXT_PATH = os.path.join(BASE_DIR, 'static', 'robots.txt')
 SITEMAP_XML_PATH = os.path.join(BASE_DIR, 'static', 'sitemap.xml')
+ADS_TXT_PATH = os.path.join(BASE_DIR, 'static', 'ads.txt')
+ROOT_FILES_MAX_AGE = config('ROOT_FILES_MAX_AGE', default=3600, cast=int)
+
+# /sitemap.xml is an index of sitemaps listing the home page, every category
+# and every curated keyword, SITEMAP_URLS_PER_FILE URLs each (at most 50,000).
+# They are cached until that list changes, for up to SITEMAP_CACHE_TIMEOUT
+# seconds; the static SITEMAP_XML_PATH is served while the database is
+# unavailable.
+# URLs start with SITEMAP_BASE_URL, or with the requested host if it is empty.
+SITEMAP_BASE_URL = config('SITEMAP_BASE_URL', default='')
+SITEMAP_URLS_PER_FILE = config('SITEMAP_URLS_PER_FILE', default=50000, cast=int)
+SITEMAP_CACHE_TIMEOUT = config('SITEMAP_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Hot catalog reads (e.g. the home page categories) are cached in the default
+# cache and invalidated on change; the timeout bounds staleness per worker.
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# The default cache is local to each worker process, so a change is only seen
+# at once by the worker that made it. With several workers or hosts, set
+# CACHE_URL to a Redis server they share (requires "pip install redis").
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
+# Read APIs and the home page send ETags derived from the catalog version and
+# answer matching If-None-Match with 304; browsers revalidate after max-age.
+# The version is kept in the database and re-read by each process at most
+# every CATALOG_VERSION_TTL seconds, which bounds how long another worker's
+# write can go unnoticed.
+CATALOG_HTTP_MAX_AGE = config('CATALOG_HTTP_MAX_AGE', default=0, cast=int)
+CATALOG_VERSION_TTL = config('CATALOG_VERSION_TTL', default=2.0, cast=float)
+
+# Keyword suggestions are answered from a per-process trigram index. Set the
+# max age (seconds) to pick up keywords written by other workers; 0 disables
+# periodic rebuilds.
+SUGGESTION_INDEX_ENABLED = config('SUGGESTION_INDEX_ENABLED', default=True, cast=bool)
+SUGGESTION_INDEX_MAX_AGE = config('SUGGESTION_INDEX_MAX_AGE', default=300, cast=int)
+
+# Question prompts requested without a category get one guessed by a
+# per-process naive Bayes classifier over keywords and prompt templates,
+# rebuilt after the max age (seconds) to pick up other workers' changes.
+TOPIC_CLASSIFIER_ENABLED = config('TOPIC_CLASSIFIER_ENABLED', default=True, cast=bool)
+TOPIC_CLASSIFIER_MAX_AGE = config('TOPIC_CLASSIFIER_MAX_AGE', default=300, cast=int)
+
+# /api/trending/ is answered from per-process boards kept up to date with this
+# worker's writes and rebuilt after the max age (seconds) to pick up the
+# others'; 0 disables periodic rebuilds.
+LEADERBOARD_MAX_AGE = config('LEADERBOARD_MAX_AGE', default=300, cast=int)
+
+# When no keyword contains a suggestion query, its words are matched against
+# the category's vocabulary within a small edit distance so typos reuse the
+# existing keyword. Seconds a single lookup may spend; 0 disables. It searches
+# the suggestion index, so it is also off with SUGGESTION_INDEX_ENABLED=False.
+FUZZY_MATCH_TIME_BUDGET = config('FUZZY_MATCH_TIME_BUDGET', default=0.005, cast=float)
+
+# Rendered prompts of requests that name a seed are cached per (category,
+# topic, seed) in an LRU bounded to this many bytes of JSON per process;
+# 0 disables.
+PROMPT_CACHE_MAX_BYTES = config('PROMPT_CACHE_MAX_BYTES', default=8 * 1024 * 1024, cast=int)
+
+# Keyword popularity increments are buffered in memory and written in batches
+# every POPULARITY_FLUSH_INTERVAL seconds (0 writes through on every request),
+# or sooner once POPULARITY_BUFFER_SIZE distinct keywords are pending.
+POPULARITY_FLUSH_INTERVAL = config('POPULARITY_FLUSH_INTERVAL', default=5.0, cast=float)
+POPULARITY_BUFFER_SIZE = config('POPULARITY_BUFFER_SIZE', default=10000, cast=int)
+
+# Items rendered per request to /api/generate-prompts/batch/. Each item counts
+# towards popularity and may create a keyword, so this also bounds what one
+# admitted request can write.
+BATCH_MAX_ITEMS = config('BATCH_MAX_ITEMS', default=50, cast=int)
+
+# Token-bucket admission control for the API endpoints that write keywords.
+# Rates are (requests per second, burst) per client address and for the whole
+# site, keyed by URL name. The 'memory' backend limits each worker process on
+# its own; 'sqlite' shares the buckets between the workers of a host through
+# ADMISSION_CONTROL_SQLITE_PATH, and falls back to per-worker buckets while the
+# file stays locked. Behind a proxy, set the header carrying the client
+# address, e.g. HTTP_X_FORWARDED_FOR.
+ADMISSION_CONTROL_ENABLED = config('ADMISSION_CONTROL_ENABLED', default=True, cast=bool)
+ADMISSION_CONTROL_BACKEND = config('ADMISSION_CONTROL_BACKEND', default='memory')
+ADMISSION_CONTROL_SQLITE_PATH = config(
+    'ADMISSION_CONTROL_SQLITE_PATH',
+    default=os.path.join(tempfile.gettempdir(), 'prompt_generator_admission.sqlite3'),
+)
+ADMISSION_CONTROL_CLIENT_IP_HEADER = config('ADMISSION_CONTROL_CLIENT_IP_HEADER', default='')
+ADMISSION_CONTROL_RATES = {
+    'get_keywords': {'client': (5, 30), 'global': (200, 500)},
+    'generate_prompts': {'client': (1, 10), 'global': (50, 100)},
+    'generate_prompts_batch': {'client': (0.1, 3), 'global': (5, 10)},
+    'generate_question_prompts': {'client': (1, 10), 'global': (50, 100)},
+}
+
+# Each request is broken down into view, database and JSON encoding time.
+# The breakdown is sent as a Server-Timing header, optionally logged as one
+# JSON line per request, and aggregated per view at /internal/timings/,
+# which is served to staff users and to the clients allowed to scrape
+# /metrics (see below) regardless of DEBUG.
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=True, cast=bool)
+SERVER_TIMING_LOG = config('SERVER_TIMING_LOG', default=False, cast=bool)
+
+# Prometheus metrics are served at /metrics. With several worker processes,
+# point PROMETHEUS_MULTIPROC_DIR at a directory the workers share (emptied on
+# every restart) so their counters are aggregated. The endpoint answers 404
+# until METRICS_ALLOWED_IPS lists the scrapers' addresses (as seen in
+# REMOTE_ADDR) or METRICS_TOKEN is set; with a token, scrapes must send
+# "Authorization: Bearer <token>".
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default='')
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    # prometheus_client reads it from the environment when first imported
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', PROMETHEUS_MULTIPROC_DIR)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=Csv())
+
+# Opt-in log of queries slower than SLOW_QUERY_THRESHOLD_MS, sampled at
+# SLOW_QUERY_SAMPLE_RATE, with their parameters, view and EXPLAIN plan.
+# Written as JSON lines to SLOW_QUERY_LOG_PATH by every worker; rotate it
+# with logrotate or similar. Summarize it with "manage.py slow_queries".
+SLOW_QUERY_LOG_ENABLED = config('SLOW_QUERY_LOG_ENABLED', default=False, cast=bool)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float)
+SLOW_QUERY_SAMPLE_RATE = config('SLOW_QUERY_SAMPLE_RATE', default=1.0, cast=float)
+SLOW_QUERY_LOG_PATH = config('SLOW_QUERY_LOG_PATH', default=os.path.join(BASE_DIR, 'slow_queries.jsonl'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'generator.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 # Security settings
 if not DEBUG:
@@ -16,27 +16,25 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.http import FileResponse
-import os
+from django.db import OperationalError, ProgrammingError
+
+from generator.metrics import record_fallback
+from generator.views import sitemap_index
+from .root_files import ads_txt, robots_txt, sitemap_xml
 
 def serve_robots_txt(request):
-    file_path = settings.ROBOTS_TXT_PATH
-    if os.path.exists(file_path):
-        return FileResponse(open(file_path, 'rb'), content_type='text/plain')
-    return FileResponse(open(os.path.join(settings.STATIC_ROOT, 'robots.txt'), 'rb'), content_type='text/plain')
+    return robots_txt.response(request)
 
 def serve_sitemap_xml(request):
-    file_path = settings.SITEMAP_XML_PATH
-    if os.path.exists(file_path):
-        return FileResponse(open(file_path, 'rb'), content_type='application/xml')
-    return FileResponse(open(os.path.join(settings.STATIC_ROOT, 'sitemap.xml'), 'rb'), content_type='application/xml')
+    # Built from the catalog; the static file stands in while the database is unavailable
+    try:
+        return sitemap_index(request)
+    except (OperationalError, ProgrammingError):
+        record_fallback('sitemap')
+        return sitemap_xml.response(request)
 
 def serve_ads_txt(request):
-    file_path = os.path.join(settings.BASE_DIR, 'static', 'ads.txt')
-    if os.path.exists(file_path):
-        return FileResponse(open(file_path, 'rb'), content_type='text/plain')
-    return FileResponse(open(os.path.join(settings.STATIC_ROOT, 'ads.txt'), 'rb'), content_type='text/plain')
+    return ads_txt.response(request)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
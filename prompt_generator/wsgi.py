@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'prompt_generator.settings')
 
 application = get_wsgi_application()
+
+# Verify schema and seed data once per worker instead of on every request
+from generator.readiness import readiness  # noqa: E402
+
+readiness.check_at_startup()
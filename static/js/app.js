@@ -637,4 +637,16 @@ document.addEventListener('DOMContentLoaded', () => {
             console.error('Error clearing recent searches:', e);
         }
     }
-}); 
\ No newline at end of file
+
+    // Open links from the sitemap (/?category=...&topic=...) on that category and topic
+    const params = new URLSearchParams(window.location.search);
+    if (params.has('category')) {
+        const categoryBtn = document.querySelector(`[data-category="${CSS.escape(params.get('category'))}"]`);
+        if (categoryBtn) {
+            categoryBtn.click();
+        }
+    }
+    if (params.has('topic')) {
+        topicInput.value = params.get('topic');
+    }
+});
\ No newline at end of file